@@ -1,11 +1,27 @@
-from typing import Dict, Optional, List
+from typing import Any, Dict, Optional, List, Union
 from typing_extensions import TypedDict
+from threading import Lock
 import os
 import json
 from langgraph.graph import StateGraph, END, START
 from pydantic import BaseModel
 import google.generativeai as genai
 from config import Config
+from prompt.budget import PROMPT_TOKEN_BUDGETS, PromptBuilder
+from prompt.history import build_prompt
+from agent.llm_client import generate_text
+from prompt.serializer import render_fields
+
+# フィードバックグラフの構成
+# - parallel: summarize と evaluate を同時に実行し、facilitate の前で合流する
+# - sequential: summarize → evaluate → facilitate の順に実行する（レイテンシ比較用）
+FEEDBACK_GRAPH_TOPOLOGY = os.getenv("FEEDBACK_GRAPH_TOPOLOGY", "parallel")
+
+# 各ノードで共有する発言履歴のトークン数の上限（ノードごとの予算のうち最大のもの）
+FEEDBACK_HISTORY_MAX_TOKENS = max(
+    PROMPT_TOKEN_BUDGETS[site]
+    for site in ("feedback_summary", "feedback_evaluation", "feedback_facilitator")
+)
 
 # アジェンダ項目の型定義
 class AgendaItem(BaseModel):
@@ -17,7 +33,12 @@ class MeetingInput(BaseModel):
     purpose: str
     agenda: Optional[List[AgendaItem]] = None
     participants: List[str]
-    comment_history: List[Dict]
+    # 発言のリスト、または render_comment_history で描画済みのテキスト
+    comment_history: Union[str, List[Dict]]
+    # 会議の要約。ある場合 comment_history は要約以降の発言
+    rolling_summary: Optional[str] = None
+    # 発言の統計（participation_prompt_fields の戻り値）。参加者の関与度はこの数値で判断する
+    participation: Optional[Dict[str, Any]] = None
     start_at: Optional[str] = None  # ISO 8601形式の文字列 (例: "2024-01-26T10:00:00")
     end_at: Optional[str] = None    # ISO 8601形式の文字列 (例: "2024-01-26T11:00:00")
 
@@ -164,18 +185,20 @@ def create_agenda_node():
             "終了日時": state["meeting_input"].end_at
         }
 
-        response = model.generate_content(
-            str(prompt),
-            generation_config=genai.GenerationConfig(
+        response_text = generate_text(
+            model,
+            system_prompt,
+            PromptBuilder("feedback_agenda").add("会議情報", render_fields(prompt)).build(),
+            dict(
                 temperature=0.7,
                 candidate_count=1,
                 response_mime_type="application/json",
                 response_schema=AGENDA_RESPONSE_SCHEMA
-            )
+            ),
         )
 
         try:
-            result = json.loads(response.text)
+            result = json.loads(response_text)
             # LLMが生成した所要時間付きのアジェンダを使用
             new_agenda = [
                 AgendaItem(
@@ -217,27 +240,32 @@ def create_summary_node():
             "目的": state["meeting_input"].purpose,
             "アジェンダ": state["meeting_input"].agenda,
             "参加者": state["meeting_input"].participants,
-            "発言履歴": state["meeting_input"].comment_history
         }
 
-        response = model.generate_content(
-            str(prompt),
-            generation_config=genai.GenerationConfig(
+        response_text = generate_text(
+            model,
+            system_prompt,
+            build_prompt(
+                "feedback_summary",
+                prompt,
+                state["meeting_input"].comment_history,
+                summary=state["meeting_input"].rolling_summary,
+            ),
+            dict(
                 temperature=0.3,
                 candidate_count=1,
                 response_mime_type="application/json",
                 response_schema=SUMMARY_RESPONSE_SCHEMA
-            )
+            ),
         )
 
+        # evaluateと並列に実行されるため、更新するキーのみを返す
         try:
-            result = json.loads(response.text)
-            state["summary"] = result["要約"]
-            return state
+            result = json.loads(response_text)
+            return {"summary": result["要約"]}
         except Exception as e:
             print(f"Error processing summary: {e}")
-            state["summary"] = ""
-            return state
+            return {"summary": ""}
     
     return summarize
 
@@ -266,6 +294,9 @@ def create_evaluation_node():
 - アジェンダ：会議のアジェンダ
 - 参加者：会議の参加者
 - 発言履歴：会議の発言履歴
+- 発言の統計：参加者ごとの発言回数・文字数・最後の発言からの経過時間と、発言の受け渡し（集計済み）
+
+参加者の関与度は、発言履歴を数え直さずに発言の統計の数値に基づいて評価してください。
 """
 
     model = init_gemini(system_prompt)
@@ -275,31 +306,39 @@ def create_evaluation_node():
             "目的": state["meeting_input"].purpose,
             "アジェンダ": state["meeting_input"].agenda,
             "参加者": state["meeting_input"].participants,
-            "発言履歴": state["meeting_input"].comment_history
+            **(state["meeting_input"].participation or {}),
         }
 
-        response = model.generate_content(
-            str(prompt),
-            generation_config=genai.GenerationConfig(
+        response_text = generate_text(
+            model,
+            system_prompt,
+            build_prompt(
+                "feedback_evaluation",
+                prompt,
+                state["meeting_input"].comment_history,
+                summary=state["meeting_input"].rolling_summary,
+            ),
+            dict(
                 temperature=0.3,
                 candidate_count=1,
                 response_mime_type="application/json",
                 response_schema=EVALUATION_RESPONSE_SCHEMA
-            )
+            ),
         )
 
+        # summarizeと並列に実行されるため、更新するキーのみを返す
         try:
-            result = json.loads(response.text)
-            state["evaluation"] = EvaluationResult(
-                engagement=result["参加者の関与度"],
-                concreteness=result["議論の具体性"],
-                direction=result["議論の方向性"]
-            )
-            return state
+            result = json.loads(response_text)
+            return {
+                "evaluation": EvaluationResult(
+                    engagement=result["参加者の関与度"],
+                    concreteness=result["議論の具体性"],
+                    direction=result["議論の方向性"]
+                )
+            }
         except Exception as e:
             print(f"Error processing evaluation: {e}")
-            state["evaluation"] = None
-            return state
+            return {"evaluation": None}
     
     return evaluate
 
@@ -326,6 +365,7 @@ def create_facilitator_node():
 - 参加者：会議の参加者
 - 発言履歴：会議の発言履歴
 - 評価結果：会議の評価結果
+- 発言の統計：参加者ごとの発言回数・文字数・最後の発言からの経過時間と、発言の受け渡し（集計済み）
 
 出力のルール：
 - 評価結果に基づいて、優先度の高い課題から扱う
@@ -340,22 +380,29 @@ def create_facilitator_node():
             "目的": state["meeting_input"].purpose,
             "アジェンダ": state["meeting_input"].agenda,
             "参加者": state["meeting_input"].participants,
-            "発言履歴": state["meeting_input"].comment_history,
-            "評価結果": state["evaluation"]
+            "評価結果": state["evaluation"],
+            **(state["meeting_input"].participation or {}),
         }
 
-        response = model.generate_content(
-            str(prompt),
-            generation_config=genai.GenerationConfig(
+        response_text = generate_text(
+            model,
+            system_prompt,
+            build_prompt(
+                "feedback_facilitator",
+                prompt,
+                state["meeting_input"].comment_history,
+                summary=state["meeting_input"].rolling_summary,
+            ),
+            dict(
                 temperature=0.7,
                 candidate_count=1,
                 response_mime_type="application/json",
                 response_schema=FACILITATOR_RESPONSE_SCHEMA
-            )
+            ),
         )
 
         try:
-            result = json.loads(response.text)
+            result = json.loads(response_text)
             state["facilitator_message"] = result["次の発言"]
             return state
         except Exception as e:
@@ -366,8 +413,14 @@ def create_facilitator_node():
     return facilitate
 
 
-def create_meeting_feedback_graph():
-    """会議フィードバックのグラフを作成する"""
+def create_meeting_feedback_graph(topology: str = FEEDBACK_GRAPH_TOPOLOGY):
+    """
+    会議フィードバックのグラフを作成する
+
+    Args:
+        topology: "parallel" なら要約と評価を同時に実行して facilitate の前で合流する。
+            "sequential" なら summarize → evaluate → facilitate の順に実行する。
+    """
     # グラフの作成
     workflow = StateGraph(GraphState)
     
@@ -378,32 +431,52 @@ def create_meeting_feedback_graph():
     workflow.add_node("facilitate", create_facilitator_node())
     
     # 条件分岐の関数
-    def should_create_agenda(state: GraphState) -> Dict[str, str]:
+    def should_create_agenda(state: GraphState):
         # アジェンダが空または未設定の場合はアジェンダ生成ノードへ
         if not state["meeting_input"].agenda:
-            return {"next": "create_agenda"}
-        return {"next": "summarize"}
+            return "create_agenda"
+        if topology == "parallel":
+            return ["summarize", "evaluate"]
+        return "summarize"
     
     # エッジの設定
-    workflow.add_node("router", should_create_agenda)
-    workflow.add_edge(START, "router")
     workflow.add_conditional_edges(
-        "router",
-        lambda x: x["next"],
-        {
-            "create_agenda": "create_agenda",
-            "summarize": "summarize"
-        }
+        START,
+        should_create_agenda,
+        ["create_agenda", "summarize", "evaluate"]
     )
     workflow.add_edge("create_agenda", END)
-    workflow.add_edge("summarize", "evaluate")
-    workflow.add_edge("evaluate", "facilitate")
+    if topology == "parallel":
+        # summarize と evaluate の両方が終わってから facilitate を実行
+        workflow.add_edge(["summarize", "evaluate"], "facilitate")
+    else:
+        workflow.add_edge("summarize", "evaluate")
+        workflow.add_edge("evaluate", "facilitate")
     workflow.add_edge("facilitate", END)
     
     # 実行可能なグラフの取得
     return workflow.compile()
 
-def process_meeting_feedback(meeting_input: MeetingInput) -> ProcessMeetingFeedbackResponse:
+# コンパイル済みグラフ（ノードのGeminiモデルを含む）はプロセス内で共有する
+_feedback_graphs = {}
+_feedback_graph_lock = Lock()
+
+def get_meeting_feedback_graph(topology: str = FEEDBACK_GRAPH_TOPOLOGY):
+    """会議フィードバックのグラフを構成ごとに初回利用時に作成し、以降は使い回す"""
+    graph = _feedback_graphs.get(topology)
+    if graph is not None:
+        return graph
+
+    with _feedback_graph_lock:
+        graph = _feedback_graphs.get(topology)
+        if graph is None:
+            graph = create_meeting_feedback_graph(topology)
+            _feedback_graphs[topology] = graph
+    return graph
+
+def process_meeting_feedback(
+    meeting_input: MeetingInput, topology: str = FEEDBACK_GRAPH_TOPOLOGY
+) -> ProcessMeetingFeedbackResponse:
     """会議の状態を受け取り、フィードバックを生成"""
     # 初期状態の設定
     state = GraphState(
@@ -415,7 +488,7 @@ def process_meeting_feedback(meeting_input: MeetingInput) -> ProcessMeetingFeedb
     )
 
     # グラフの実行
-    graph = create_meeting_feedback_graph()
+    graph = get_meeting_feedback_graph(topology)
     final_state = graph.invoke(state)
 
     # アジェンダ生成の場合
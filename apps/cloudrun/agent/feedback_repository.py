@@ -1,17 +1,47 @@
+from typing import Optional
+from google.cloud.firestore_v1.base_query import FieldFilter
+from cache.ttl_cache import MISSING, TTLCache
 from config import Config
 from utils import get_jst_timestamp
 
 db_client = Config.get_db_client()
 
-def post_feedback(meeting_id, message, detail):
+# 会議ごとの最新のフィードバック（履歴のバージョン, フィードバック）のプロセス内キャッシュ
+_latest_feedback = TTLCache(max_size=256, ttl_seconds=3600)
+
+def _feedbacks_ref(meeting_id):
+    return db_client.collection(Config.FIRESTORE_MEETING_COLLECTION).document(
+        meeting_id
+    ).collection(Config.FIRESTORE_FEEDBACKS_COLLECTION)
+
+def post_feedback(meeting_id, message, detail, history_version: Optional[int] = None):
     data = {
         "created_at": get_jst_timestamp(),  # スピーカーを追加
         "message": message,  # メッセージを追加
         "meta": detail,  # AIによる補足情報
+        "history_version": history_version,  # 生成に使った発言履歴のバージョン
     }
 
-    db_client.collection(Config.FIRESTORE_MEETING_COLLECTION).document(
-        meeting_id
-    ).collection(Config.FIRESTORE_FEEDBACKS_COLLECTION).add(data)
+    _feedbacks_ref(meeting_id).add(data)
+    if history_version is not None:
+        _latest_feedback.set(meeting_id, (history_version, data))
 
     return meeting_id
+
+def get_feedback_for_version(meeting_id, history_version: int) -> Optional[dict]:
+    """同じバージョンの発言履歴から生成したフィードバックがあれば返す"""
+    cached = _latest_feedback.get(meeting_id)
+    if cached is not MISSING and cached[0] == history_version:
+        return cached[1]
+
+    docs = (
+        _feedbacks_ref(meeting_id)
+        .where(filter=FieldFilter("history_version", "==", history_version))
+        .limit(1)
+        .get()
+    )
+    if not docs:
+        return None
+    data = docs[0].to_dict()
+    _latest_feedback.set(meeting_id, (history_version, data))
+    return data
@@ -1,34 +1,60 @@
 from typing import Dict, Optional
 from config import Config
-from message.message import get_message_history, post_message
-from agent.feedback_agent import process_meeting_feedback, MeetingInput, AgendaItem as FeedbackAgendaItem
-from agent.feedback_repository import post_feedback
+from message.message import get_history_version, get_participation_stats, post_message
+from message.participation import participation_prompt_fields
+from minutes.rolling_summary import summary_and_recent_history
+from prompt.history import render_comment_history
+from meeting.meeting_cache import get_meeting_data
+from agent.feedback_agent import process_meeting_feedback, MeetingInput, AgendaItem as FeedbackAgendaItem, FEEDBACK_HISTORY_MAX_TOKENS
+from agent.feedback_repository import get_feedback_for_version, post_feedback
 
 FIRESTORE_MEETING_COLLECTION = Config.FIRESTORE_MEETING_COLLECTION
 
 
-def generate_feedback(meeting_id: str) -> Optional[Dict]:
+def _feedback_response(message: str, detail: Dict) -> Dict:
+    evaluation = detail.get("evaluation")
+    return {
+        "message": message,
+        "detail": {
+            "summary": detail.get("summary"),
+            "evaluation": evaluation.model_dump() if hasattr(evaluation, "model_dump") else evaluation
+        }
+    }
+
+
+def generate_feedback(meeting_id: str, force: bool = False) -> Optional[Dict]:
     """
     指定された会議IDに対するエージェントのフィードバックを生成します。
+
+    前回のフィードバックから発言（AI以外）が増えていなければ、保存済みのフィードバックを返します。
     
     Args:
         meeting_id (str): 会議ID
+        force (bool): 発言が増えていなくてもフィードバックを生成し直すか
         
     Returns:
         Optional[Dict]: 会議フィードバック（アジェンダ、要約、評価、改善提案）
         Noneの場合は会議が見つからないか、データ形式が不正
     """
     # 会議の基本情報を取得
-    meeting_ref = Config.get_db_client().collection(FIRESTORE_MEETING_COLLECTION).document(meeting_id)
-    meeting_doc = meeting_ref.get()
+    meeting_data = get_meeting_data(meeting_id)
     
-    if not meeting_doc.exists:
+    if meeting_data is None:
         return None
     
-    meeting_data = meeting_doc.to_dict()
+    # 同じ発言履歴から生成済みのフィードバックがあればそれを返す
+    history_version = get_history_version(meeting_id)
+    if not force:
+        stored = get_feedback_for_version(meeting_id, history_version)
+        if stored is not None:
+            print(f"♻️ [フィードバック] {meeting_id}: 発言が増えていないため保存済みの結果を返します (version={history_version})")
+            return _feedback_response(stored["message"], stored.get("meta") or {})
     
-    # 会話履歴を取得
-    message_history = get_message_history(meeting_id)
+    # 会議の要約と、それ以降の会話履歴を1件ずつ読みながらプロンプト用のテキストにする（グラフの各ノードで共有）
+    rolling_summary, recent_history = summary_and_recent_history(meeting_id)
+    comment_history = render_comment_history(
+        recent_history, max_tokens=FEEDBACK_HISTORY_MAX_TOKENS
+    )
     
     # 日時の変換（JST）
     date = meeting_data["start_date"]
@@ -49,7 +75,11 @@ def generate_feedback(meeting_id: str) -> Optional[Dict]:
             purpose=meeting_data.get("meeting_purpose"),
             agenda=agenda,
             participants=meeting_data.get("participants", []),
-            comment_history=message_history if isinstance(message_history, list) else [message_history],
+            comment_history=comment_history,
+            rolling_summary=rolling_summary or None,
+            participation=participation_prompt_fields(
+                get_participation_stats(meeting_id, meeting_data.get("participants", []))
+            ),
             start_at=start_at,
             end_at=end_at
         )
@@ -63,12 +93,6 @@ def generate_feedback(meeting_id: str) -> Optional[Dict]:
     # AIのフィードバックを発言履歴用DBに保存する
     post_message(meeting_id, Config.get_ai_facilitator_name(), feedback.message, meta={"role": "ai", "type": "feedback"})
     # 補足情報をDBに保存 
-    post_feedback(meeting_id, feedback.message, feedback.detail.model_dump())
+    post_feedback(meeting_id, feedback.message, feedback.detail.model_dump(), history_version=history_version)
     
-    return {
-        "message": feedback.message,
-        "detail": {
-            "summary": feedback.detail.summary,
-            "evaluation": feedback.detail.evaluation.model_dump()
-        }
-    }
+    return _feedback_response(feedback.message, {"summary": feedback.detail.summary, "evaluation": feedback.detail.evaluation})
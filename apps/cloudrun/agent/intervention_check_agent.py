@@ -4,6 +4,8 @@ import os
 import google.generativeai as genai
 from models import MeetingInput
 from config import Config
+from prompt.history import build_prompt
+from agent.llm_client import generate_text
 
 SYSTEM_PROMPT = """あなたは会議のファシリテータとして、会議の進行状況を監視し、介入が必要かどうかを判断します。
 与えられた入力を踏まえた上で、介入の必要性を判断してください。ただし、介入は最小限としたいため、参加者のスタンスが不明なうちは介入しないでください。
@@ -22,7 +24,9 @@ SYSTEM_PROMPT = """あなたは会議のファシリテータとして、会議
 - 目的：会議の目的
 - アジェンダ：会議のアジェンダ
 - 参加者：会議の参加者
-- 発言履歴：会議の発言履歴"""
+- 発言履歴：会議の発言履歴
+- 発言の統計：参加者ごとの発言回数・文字数・最後の発言からの経過時間と、発言の受け渡し（集計済み。発言の偏りはこの数値で判断する）
+- アジェンダの進行：現在のアジェンダの経過時間と予定時間、会議の残り時間、未完了のアジェンダ（計算済み。時間管理の観点はこの数値で判断する）"""
 
 def _init_gemini():
     """Gemini APIの初期化"""
@@ -79,13 +83,21 @@ def should_intervene(meeting_input: MeetingInput) -> Tuple[bool, str]:
             "目的": meeting_input.get("purpose"),
             "アジェンダ": meeting_input.get("agenda"),
             "参加者": meeting_input.get("participants"),
-            "発言履歴": meeting_input.get("comment_history")
+            **(meeting_input.get("participation") or {}),
+            **(meeting_input.get("agenda_progress") or {}),
         }
         
-        # LLMで介入判定
-        response = model.generate_content(
-            str(prompt),
-            generation_config=genai.GenerationConfig(
+        # LLMで介入判定（発言履歴はイテレータのまま読み、予算に収まる新しい発言だけを残す）
+        response_text = generate_text(
+            model,
+            SYSTEM_PROMPT,
+            build_prompt(
+                "intervention_check",
+                prompt,
+                meeting_input.get("comment_history") or [],
+                summary=meeting_input.get("rolling_summary"),
+            ),
+            dict(
                 temperature=0.1,
                 candidate_count=1,
                 response_mime_type="application/json",
@@ -93,11 +105,11 @@ def should_intervene(meeting_input: MeetingInput) -> Tuple[bool, str]:
             ),
         )
         
-        if not response or not response.text:
+        if not response_text:
             return False, None
         
         # JSONレスポンスをパース
-        result = json.loads(response.text)
+        result = json.loads(response_text)
         print(result)
         return result.get("intervention_needed", False), result.get("reason")
         
@@ -0,0 +1,174 @@
+import os
+from threading import Lock
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+
+# LLMでの介入判定の前に、ローカルの兆候検知で絞り込むか
+INTERVENTION_GATE_ENABLED = os.getenv("INTERVENTION_GATE_ENABLED", "true").lower() == "true"
+# 発言の偏り・往復の判定に使う直近の発言数
+INTERVENTION_GATE_WINDOW = int(os.getenv("INTERVENTION_GATE_WINDOW", 20))
+# 発言の偏りを判定するのに必要な発言数
+INTERVENTION_GATE_MIN_MESSAGES = int(os.getenv("INTERVENTION_GATE_MIN_MESSAGES", 8))
+# 直近の発言のうち1人の発言がこの割合以上なら偏りとみなす
+INTERVENTION_GATE_SPEAKER_SHARE = float(os.getenv("INTERVENTION_GATE_SPEAKER_SHARE", 0.7))
+# 現在のアジェンダにかけた時間が予定時間のこの倍率以上なら超過とみなす
+INTERVENTION_GATE_AGENDA_OVERRUN_RATIO = float(
+    os.getenv("INTERVENTION_GATE_AGENDA_OVERRUN_RATIO", 1.0)
+)
+# 残り時間が未完了のアジェンダの予定時間の合計にこの倍率をかけた値より短ければ不足とみなす
+INTERVENTION_GATE_REMAINING_RATIO = float(os.getenv("INTERVENTION_GATE_REMAINING_RATIO", 1.0))
+# 3人以上の会議で、2人だけの発言の往復がこのターン数以上続いたら兆候とみなす
+INTERVENTION_GATE_PING_PONG_TURNS = int(os.getenv("INTERVENTION_GATE_PING_PONG_TURNS", 8))
+# アジェンダの超過・残り時間の不足だけで（LLMで判定せずに）介入するか
+INTERVENTION_TIME_SIGNALS_INTERVENE = (
+    os.getenv("INTERVENTION_TIME_SIGNALS_INTERVENE", "true").lower() == "true"
+)
+
+# 兆候の種類
+SIGNAL_SPEAKER_IMBALANCE = "speaker_imbalance"
+SIGNAL_AGENDA_OVERRUN = "agenda_overrun"
+SIGNAL_TIME_SHORTAGE = "time_shortage"
+SIGNAL_PING_PONG = "ping_pong"
+
+
+
+def _speaker_imbalance(messages: List[dict], participants: List[str]) -> Optional[str]:
+    if len(messages) < INTERVENTION_GATE_MIN_MESSAGES:
+        return None
+    counts: Dict[str, int] = {}
+    for message in messages:
+        speaker = message.get("speaker")
+        counts[speaker] = counts.get(speaker, 0) + 1
+    if max(len(participants), len(counts)) < 2:
+        return None
+    speaker, count = max(counts.items(), key=lambda item: item[1])
+    share = count / len(messages)
+    if share < INTERVENTION_GATE_SPEAKER_SHARE:
+        return None
+    return f"直近{len(messages)}件の発言のうち{speaker}の発言が{share:.0%}"
+
+
+def _ping_pong(messages: List[dict], participants: List[str]) -> Optional[str]:
+    if len(participants) < 3:
+        # 2人の会議では往復が普通のため判定しない
+        return None
+    # 同じ発言者が続けた発言は1ターンにまとめ、末尾から2人だけで続いているターン数を数える
+    turns: List[str] = []
+    for message in messages:
+        speaker = message.get("speaker")
+        if not turns or turns[-1] != speaker:
+            turns.append(speaker)
+    pair = set()
+    length = 0
+    for speaker in reversed(turns):
+        if speaker not in pair and len(pair) == 2:
+            break
+        pair.add(speaker)
+        length += 1
+    if len(pair) < 2 or length < INTERVENTION_GATE_PING_PONG_TURNS:
+        return None
+    a, b = sorted(pair, key=str)
+    return f"{a}と{b}の2人だけの往復が{length}ターン続いている"
+
+
+def _agenda_timing(progress: Dict[str, Any]) -> Dict[str, str]:
+    """現在のアジェンダの超過と、残り時間の不足を判定する"""
+    signals: Dict[str, str] = {}
+    active = progress["active"]
+    if active is None or not progress["started"]:
+        return signals
+    if active["duration"] and active["elapsed_minutes"] >= active["duration"] * INTERVENTION_GATE_AGENDA_OVERRUN_RATIO:
+        signals[SIGNAL_AGENDA_OVERRUN] = (
+            f"アジェンダ「{active['topic']}」に{active['elapsed_minutes']:.0f}分"
+            f"（予定{active['duration']:.0f}分）"
+        )
+    if progress["remaining_minutes"] < progress["remaining_planned_minutes"] * INTERVENTION_GATE_REMAINING_RATIO:
+        signals[SIGNAL_TIME_SHORTAGE] = (
+            f"残り{progress['remaining_minutes']:.0f}分に対して"
+            f"未完了のアジェンダの予定が{progress['remaining_planned_minutes']:.0f}分"
+        )
+    return signals
+
+
+def time_signal_trigger(progress: Dict[str, Any]) -> Tuple[Optional[str], Optional[str]]:
+    """
+    時間の兆候だけで介入する場合の (きっかけ, 理由) を返す。兆候がなければ (None, None)。
+
+    きっかけは同じ状況で介入を繰り返さないためのキーで、超過はアジェンダごと、
+    残り時間の不足は未完了の項目数ごとに1回だけ介入する。
+    """
+    signals = _agenda_timing(progress)
+    if SIGNAL_AGENDA_OVERRUN in signals:
+        return f"{SIGNAL_AGENDA_OVERRUN}:{progress['active']['id']}", signals[SIGNAL_AGENDA_OVERRUN]
+    if SIGNAL_TIME_SHORTAGE in signals:
+        return f"{SIGNAL_TIME_SHORTAGE}:{progress['unfinished']}", signals[SIGNAL_TIME_SHORTAGE]
+    return None, None
+
+
+def detect_signals(
+    meeting_data: dict,
+    recent_messages: Iterable[dict],
+    progress: Optional[Dict[str, Any]] = None,
+) -> Dict[str, str]:
+    """
+    LLMを使わずに介入の兆候を検知する。
+
+    Args:
+        meeting_data: 会議ドキュメント（participants）
+        recent_messages: 直近の発言（AI以外、古い順）
+        progress: `minutes.agenda_tracker.meeting_progress` の戻り値（None なら時間の兆候は判定しない）
+
+    Returns:
+        Dict[str, str]: {兆候の種類: 説明}。兆候がなければ空
+    """
+    messages = list(recent_messages)[-INTERVENTION_GATE_WINDOW:]
+    participants = meeting_data.get("participants") or []
+    signals: Dict[str, str] = {}
+
+    imbalance = _speaker_imbalance(messages, participants)
+    if imbalance:
+        signals[SIGNAL_SPEAKER_IMBALANCE] = imbalance
+    ping_pong = _ping_pong(messages, participants)
+    if ping_pong:
+        signals[SIGNAL_PING_PONG] = ping_pong
+    if progress is not None:
+        signals.update(_agenda_timing(progress))
+    return signals
+
+
+class _GateStats:
+    def __init__(self):
+        self._lock = Lock()
+        self.checks = 0
+        self.escalated = 0
+        self.signals: Dict[str, int] = {}
+
+    def record(self, signals: Dict[str, str]):
+        with self._lock:
+            self.checks += 1
+            if signals:
+                self.escalated += 1
+            for name in signals:
+                self.signals[name] = self.signals.get(name, 0) + 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "enabled": INTERVENTION_GATE_ENABLED,
+                "checks": self.checks,
+                "escalated": self.escalated,
+                # 兆候がなくLLMでの判定を省略した回数
+                "llm_calls_saved": self.checks - self.escalated,
+                "signals": dict(self.signals),
+            }
+
+
+_stats = _GateStats()
+
+
+def record_gate_result(signals: Dict[str, str]):
+    _stats.record(signals)
+
+
+def intervention_gate_stats() -> dict:
+    return _stats.snapshot()
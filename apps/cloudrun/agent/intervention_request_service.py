@@ -2,16 +2,31 @@ from typing import Optional, Tuple
 from datetime import datetime
 import pytz
 from config import Config
-from message.message import get_message_history
+import itertools
+from message.message import get_message_history, get_participation_stats
+from message.participation import participation_prompt_fields
+from minutes.agenda_tracker import meeting_progress, progress_prompt_fields
+from minutes.constants import MinutesFields
+from minutes.minutes_log import read_minutes
+from minutes.rolling_summary import summary_and_recent_history
+from meeting.meeting_cache import get_meeting_data, invalidate_meeting
 from models import InterventionStatus, InterventionRequest, MeetingInput
 from .intervention_check_agent import should_intervene
+from .intervention_gate import (
+    INTERVENTION_GATE_ENABLED,
+    INTERVENTION_GATE_WINDOW,
+    INTERVENTION_TIME_SIGNALS_INTERVENE,
+    detect_signals,
+    record_gate_result,
+    time_signal_trigger,
+)
 import os
 FIRESTORE_MEETING_COLLECTION = Config.FIRESTORE_MEETING_COLLECTION
 
 AGENT_INTERVENTION_SPAN_SECONDS = int(os.getenv("AGENT_INTERVENTION_SPAN_SECONDS", 10))
 
 
-def _create_intervention_request(meeting_id: str, reason: str) -> bool:
+def _create_intervention_request(meeting_id: str, reason: str, trigger: Optional[str] = None) -> bool:
     """介入リクエストを作成する"""
     db = Config.get_db_client()
     doc_ref = db.collection(FIRESTORE_MEETING_COLLECTION).document(meeting_id)
@@ -22,6 +37,7 @@ def _create_intervention_request(meeting_id: str, reason: str) -> bool:
     intervention_request = {
         "status": InterventionStatus.PENDING,
         "reason": reason,
+        "trigger": trigger,  # 時間の兆候だけで介入した場合のきっかけ（同じきっかけでは繰り返さない）
         "created_at": now,
         "updated_at": now
     }
@@ -29,49 +45,83 @@ def _create_intervention_request(meeting_id: str, reason: str) -> bool:
     doc_ref.update({
         "intervention_request": intervention_request
     })
+    invalidate_meeting(meeting_id)
 
 def _get_intervention_request(meeting_id: str) -> Optional[dict]:
-    """介入リクエストを取得する"""
+    """
+    介入リクエストを取得する
+
+    AGENT_INTERVENTION_SPAN_SECONDS の間隔をインスタンスをまたいで守るため、
+    会議ドキュメントのキャッシュは使わずに介入リクエストのフィールドだけを読む。
+    """
     db = Config.get_db_client()
-    doc_ref = db.collection(FIRESTORE_MEETING_COLLECTION).document(meeting_id)
-    doc = doc_ref.get()
-    
+    doc = (
+        db.collection(FIRESTORE_MEETING_COLLECTION)
+        .document(meeting_id)
+        .get(field_paths=["intervention_request"])
+    )
     if not doc.exists:
         return None
-    
-    meeting_data = doc.to_dict()
-    return meeting_data.get("intervention_request")
+    return (doc.to_dict() or {}).get("intervention_request")
 
-def _get_meeting_data_for_intervention(meeting_id: str) -> Optional[MeetingInput]:
+def _get_meeting_data_for_intervention(
+    meeting_id: str, progress: Optional[dict] = None, intervention_data: Optional[dict] = None
+) -> Optional[MeetingInput]:
     """介入のための会議データを取得する"""
-    db = Config.get_db_client()
-    doc_ref = db.collection(FIRESTORE_MEETING_COLLECTION).document(meeting_id)
-    doc = doc_ref.get()
+    meeting_data = get_meeting_data(meeting_id)
     
-    if not doc.exists:
+    if meeting_data is None:
         return None
     
-    meeting_data = doc.to_dict()
-    message_history = get_message_history(meeting_id)
-    if not message_history:
+    # 会議の要約以降の発言はプロンプトを作るときに1件ずつ読む。発言の有無だけ先頭の1件で確認する
+    rolling_summary, message_history = summary_and_recent_history(meeting_id)
+    first_message = next(message_history, None)
+    if first_message is None:
         return None
     
-    # 介入リクエストの取得
-    intervention_data = meeting_data.get("intervention_request")
+    # 介入リクエスト（キャッシュを使わずに読んだもの）
     intervention_request = InterventionRequest(**intervention_data) if intervention_data else None
     
     return MeetingInput(
         purpose=meeting_data.get("meeting_purpose"),
         agenda=meeting_data.get("agenda"),
         participants=meeting_data.get("participants", []),
-        comment_history=message_history if isinstance(message_history, list) else [message_history],
+        comment_history=itertools.chain([first_message], message_history),
+        rolling_summary=rolling_summary or None,
+        participation=participation_prompt_fields(
+            get_participation_stats(meeting_id, meeting_data.get("participants", []))
+        ),
+        agenda_progress=progress_prompt_fields(progress) if progress else None,
         start_at=f"{meeting_data['start_date']} {meeting_data['start_time']}:00",
         end_at=f"{meeting_data['start_date']} {meeting_data['end_time']}:00",
         intervention_request=intervention_request
     )
 
-def _check_if_intervention_needed(meeting_id: str) -> Tuple[bool, Optional[str]]:
-    """介入が必要かどうかを判断する"""
+def _get_agenda_progress(
+    meeting_id: str, meeting_data: dict, minutes: Optional[dict] = None
+) -> Optional[dict]:
+    """
+    議事録のアジェンダに記録した時刻から、アジェンダの進み具合を計算する（LLMは使わない）。
+
+    `minutes` を渡せば議事録を読み直さない。
+    """
+    if minutes is None:
+        minutes, _, _ = read_minutes(meeting_id)
+    agenda = minutes.get(MinutesFields.AGENDA)
+    if not agenda:
+        # 議事録のアジェンダがまだなければ、会議のアジェンダをすべて未完了として扱う
+        agenda = meeting_data.get("agenda") or []
+    return meeting_progress(meeting_data, agenda)
+
+def _check_if_intervention_needed(
+    meeting_id: str, minutes: Optional[dict] = None
+) -> Tuple[bool, Optional[str], Optional[str]]:
+    """
+    介入が必要かどうかを判断する
+
+    Returns:
+        Tuple[bool, Optional[str], Optional[str]]: (介入が必要かどうか, 判断の理由, 介入リクエストに記録する時間の兆候のきっかけ)
+    """
     intervention_request = _get_intervention_request(meeting_id)
     
     if intervention_request:
@@ -86,25 +136,53 @@ def _check_if_intervention_needed(meeting_id: str) -> Tuple[bool, Optional[str]]
         ).total_seconds()
         
         if time_diff < AGENT_INTERVENTION_SPAN_SECONDS:
-            return False, None
+            return False, None, None
+
+    meeting_data = get_meeting_data(meeting_id)
+    if meeting_data is None:
+        return False, None, None
+    progress = _get_agenda_progress(meeting_id, meeting_data, minutes)
+
+    # 兆候がなければLLMでの判定を省略する
+    if INTERVENTION_GATE_ENABLED:
+        signals = detect_signals(
+            meeting_data, get_message_history(meeting_id, INTERVENTION_GATE_WINDOW), progress
+        )
+        record_gate_result(signals)
+        if not signals:
+            print(f"🚦 [介入判定] {meeting_id}: 兆候なしのためLLMでの判定を省略")
+            return False, None, None
+        print(f"🚦 [介入判定] {meeting_id}: 兆候あり {signals}")
+
+    # アジェンダの超過・残り時間の不足は、同じきっかけで介入済みでなければLLMを使わずに介入する
+    if INTERVENTION_TIME_SIGNALS_INTERVENE and progress is not None:
+        trigger, reason = time_signal_trigger(progress)
+        if trigger and trigger != (intervention_request or {}).get("trigger"):
+            print(f"⏱️ [介入判定] {meeting_id}: 時間の兆候で介入 {trigger}")
+            return True, reason, trigger
 
     # 会議データを取得
-    meeting_input = _get_meeting_data_for_intervention(meeting_id)
+    meeting_input = _get_meeting_data_for_intervention(meeting_id, progress, intervention_request)
     if not meeting_input:
-        return False, None
+        return False, None, None
     
     # LLMを使用して介入の必要性を判断
-    return should_intervene(meeting_input)
+    should_intervene_flag, reason = should_intervene(meeting_input)
+    return should_intervene_flag, reason, (intervention_request or {}).get("trigger")
+
+def request_intervention(meeting_id: str, minutes: Optional[dict] = None) -> bool:
+    """
+    メッセージに対する介入処理を行う。
 
-def request_intervention(meeting_id: str) -> bool:
-    """メッセージに対する介入処理を行う"""
-    should_intervene_flag, reason = _check_if_intervention_needed(meeting_id)
+    `minutes` に同じジョブで読んだ議事録（`update_minutes` の戻り値）を渡せば、読み直さない。
+    """
+    should_intervene_flag, reason, trigger = _check_if_intervention_needed(meeting_id, minutes)
     print(should_intervene_flag, reason)
     
     if not should_intervene_flag:
         return False
     
     # 介入リクエストを作成
-    _create_intervention_request(meeting_id, reason)
+    _create_intervention_request(meeting_id, reason, trigger)
     
     return True 
\ No newline at end of file
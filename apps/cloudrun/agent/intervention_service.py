@@ -1,10 +1,13 @@
 from typing import Optional, Dict
 from datetime import datetime
-from agent.feedback_agent import process_meeting_feedback, MeetingInput
+from agent.feedback_agent import process_meeting_feedback, MeetingInput, FEEDBACK_HISTORY_MAX_TOKENS
 from config import Config
-from message.message import get_message_history
+from minutes.rolling_summary import summary_and_recent_history
+from prompt.history import render_comment_history
+from meeting.meeting_cache import get_meeting_data, invalidate_meeting
 from .intervention_request_service import InterventionStatus, InterventionRequest
-from message.message import post_message
+from message.message import get_participation_stats, post_message
+from message.participation import participation_prompt_fields
 import json
 import pytz
 
@@ -22,6 +25,7 @@ def _complete_intervention(meeting_id: str) -> bool:
         "intervention_request.status": InterventionStatus.COMPLETED,
         "intervention_request.updated_at": now
     })
+    invalidate_meeting(meeting_id)
     return True
 
 #TODO main.pyのコメント生成と整合性を取る
@@ -48,16 +52,17 @@ def _generate_feedback(meeting_id: str) -> Optional[Dict]:
         Noneの場合は会議が見つからないか、データ形式が不正
     """
     # 会議の基本情報を取得
-    meeting_ref = Config.get_db_client().collection(FIRESTORE_MEETING_COLLECTION).document(meeting_id)
-    meeting_doc = meeting_ref.get()
+    meeting_data = get_meeting_data(meeting_id)
     
-    if not meeting_doc.exists:
+    if meeting_data is None:
         return None
     
-    meeting_data = meeting_doc.to_dict()
     
-    # 会話履歴を取得
-    message_history = get_message_history(meeting_id)
+    # 会議の要約と、それ以降の会話履歴を1件ずつ読みながらプロンプト用のテキストにする（グラフの各ノードで共有）
+    rolling_summary, recent_history = summary_and_recent_history(meeting_id)
+    comment_history = render_comment_history(
+        recent_history, max_tokens=FEEDBACK_HISTORY_MAX_TOKENS
+    )
     
     # 日時の変換（JST）
     date = meeting_data["start_date"]
@@ -73,7 +78,11 @@ def _generate_feedback(meeting_id: str) -> Optional[Dict]:
             purpose=meeting_data.get("meeting_purpose"),
             agenda=agenda,
             participants=meeting_data.get("participants", []),
-            comment_history=message_history if isinstance(message_history, list) else [message_history],
+            comment_history=comment_history,
+            rolling_summary=rolling_summary or None,
+            participation=participation_prompt_fields(
+                get_participation_stats(meeting_id, meeting_data.get("participants", []))
+            ),
             start_at=start_at,
             end_at=end_at
         )
@@ -0,0 +1,26 @@
+import google.generativeai as genai
+from cache.llm_cache import cached_llm_call, llm_cache_key
+
+def generate_text(
+    model: genai.GenerativeModel,
+    system_instruction: str,
+    prompt: str,
+    generation_config: dict,
+    bypass_cache: bool = False,
+) -> str:
+    """
+    Geminiの応答のテキストを返す
+
+    同じ (モデル, システムプロンプト, 生成設定, プロンプト) の応答はLLMキャッシュから返す。
+    `bypass_cache` が True の場合は常にGeminiに問い合わせる。
+    """
+    key = llm_cache_key(model.model_name, system_instruction, generation_config, prompt)
+    return cached_llm_call(
+        key,
+        lambda: model.generate_content(
+            prompt,
+            generation_config=genai.GenerationConfig(**generation_config),
+        ).text,
+        temperature=generation_config.get("temperature"),
+        bypass=bypass_cache,
+    )
@@ -0,0 +1,84 @@
+from typing import Iterable
+import json
+import os
+import google.generativeai as genai
+from prompt.budget import PromptBuilder
+from prompt.history import comment_lines
+from agent.llm_client import generate_text
+
+SYSTEM_PROMPT = """あなたは進行中の会議の記録係です。
+これまでの要約に新しい発言の内容を取り込み、会議全体の要約を更新してください。
+
+要約のポイント：
+1. 議論された主要なトピックと、参加者ごとの主な意見・立場
+2. 決定事項や合意点
+3. 未解決の課題や対立している論点
+4. これまでの要約にある重要な情報は落とさない
+5. AIの発言内容は除外する
+6. 箇条書きで簡潔にまとめる
+
+入力：
+- これまでの要約：前回までに更新した要約（初回は「なし」）
+- 新しい発言：前回の要約以降の発言"""
+
+RESPONSE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "要約": {
+            "type": "string",
+            "description": "新しい発言を取り込んだ会議全体の要約"
+        }
+    },
+    "required": ["要約"]
+}
+
+def _init_gemini():
+    """Gemini APIの初期化"""
+    api_key = os.getenv("GEMINI_API_KEY")
+    if not api_key:
+        raise ValueError("GEMINI_API_KEY environment variable is not set")
+
+    genai.configure(api_key=api_key)
+    model_name = os.getenv("GEMINI_MODEL", "gemini-1.5-flash-002")
+
+    return genai.GenerativeModel(
+        model_name,
+        system_instruction=[SYSTEM_PROMPT]
+    )
+
+# Geminiの設定
+model = _init_gemini()
+
+def fold_into_summary(summary: str, new_messages: Iterable[dict]) -> str:
+    """
+    これまでの要約に新しい発言を取り込んだ要約を返す
+
+    Args:
+        summary: これまでの要約（初回は空文字）
+        new_messages: 前回の要約以降の発言（古い順）
+
+    Returns:
+        str: 更新した要約。失敗した場合は空文字
+    """
+    prompt = (
+        PromptBuilder("rolling_summary")
+        .add("これまでの要約", summary or "なし", heading="これまでの要約:\n")
+        .add_history("新しい発言", comment_lines(new_messages), heading="新しい発言:\n")
+        .build()
+    )
+    try:
+        response_text = generate_text(
+            model,
+            SYSTEM_PROMPT,
+            prompt,
+            dict(
+                temperature=0.2,
+                candidate_count=1,
+                response_mime_type="application/json",
+                response_schema=RESPONSE_SCHEMA
+            ),
+        )
+        return json.loads(response_text)["要約"]
+    except Exception as e:
+        print(f"Error in rolling summary: {e}")
+        return ""
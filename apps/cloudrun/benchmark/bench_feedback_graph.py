@@ -0,0 +1,36 @@
+"""
+会議フィードバックグラフのリクエストあたりの準備コストを比較するベンチマーク。
+
+- before: リクエストごとに create_meeting_feedback_graph()
+          （genai.configure + GenerativeModel 4つ + StateGraph のコンパイル）
+- after : get_meeting_feedback_graph() でコンパイル済みグラフを取得
+
+LLMへのリクエストは行わない（GEMINI_API_KEY はダミーでよい）。
+
+    cd apps/cloudrun
+    GEMINI_API_KEY=dummy python -m benchmark.bench_feedback_graph
+"""
+
+import time
+
+from agent.feedback_agent import (
+    create_meeting_feedback_graph,
+    get_meeting_feedback_graph,
+)
+
+ITERATIONS = 200
+
+
+def _per_request_ms(fn) -> float:
+    started = time.perf_counter()
+    for _ in range(ITERATIONS):
+        fn()
+    return (time.perf_counter() - started) / ITERATIONS * 1e3
+
+
+if __name__ == "__main__":
+    before_ms = _per_request_ms(create_meeting_feedback_graph)
+    get_meeting_feedback_graph()  # 初回のコンパイルは起動時の1回のみ
+    after_ms = _per_request_ms(get_meeting_feedback_graph)
+    print(f"before (build + compile per request): {before_ms:8.3f} ms/request")
+    print(f"after  (cached compiled graph)      : {after_ms:8.3f} ms/request")
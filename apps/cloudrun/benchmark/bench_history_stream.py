@@ -0,0 +1,87 @@
+"""
+長い会議の発言履歴からプロンプトを作るときのメモリと時間を比較するベンチマーク。
+
+- before: 全発言をフィールドすべての辞書のリストで読み込み、str(dict) でプロンプトにする
+- after : iter_message_history で HISTORY_FIELDS だけをページ単位で読み、1件ずつ描画する
+- iterate: iter_message_history を集計だけに使う場合（プロンプトを作らない）
+
+Firestoreは読まず、同じ内容の発言を生成して比較する。
+
+    cd apps/cloudrun
+    FIRESTORE_EMULATOR_HOST=localhost:8999 GOOGLE_CLOUD_PROJECT=dummy \\
+        python -m benchmark.bench_history_stream
+"""
+
+import time
+import tracemalloc
+
+import message.message as message_module
+from message.message import HISTORY_FIELDS, iter_message_history
+from prompt.history import build_prompt
+
+TRANSCRIPT_LENGTHS = [100, 1000, 5000, 20000]
+PAGE_SIZE = 200
+FIELDS = {"目的": "新機能の方針を決める", "アジェンダ": ["現状共有", "課題"], "参加者": ["A", "B", "C"]}
+
+
+def _full_doc(seq: int) -> dict:
+    return {
+        "seq": seq,
+        "speak_at": f"2025-01-26 10:{seq // 60 % 60:02d}:{seq % 60:02d}",
+        "created_at": f"2025-01-26T01:{seq // 60 % 60:02d}:{seq % 60:02d}.000000+00:00",
+        "speaker": "ABC"[seq % 3],
+        "message": f"発言{seq}: この件は来週までに検討して結果を共有します。",
+        "meta": None,
+        "role": "human",
+    }
+
+
+def _measure(fn):
+    tracemalloc.start()
+    started = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak / 1024, elapsed * 1e3
+
+
+def _before(n: int):
+    history = [_full_doc(seq) for seq in range(1, n + 1)]
+    return str({**FIELDS, "発言履歴": history})
+
+
+def _fake_page(n: int):
+    def query_history_page(meeting_id, after, page_size):
+        start = (after or 0) + 1
+        return [
+            {field: doc[field] for field in HISTORY_FIELDS}
+            for doc in map(_full_doc, range(start, min(start + page_size, n + 1)))
+        ]
+
+    return query_history_page
+
+
+def _after(n: int):
+    return build_prompt("feedback_summary", FIELDS, iter_message_history("bench", page_size=PAGE_SIZE))
+
+
+def _iterate(n: int):
+    speakers = {}
+    for comment in iter_message_history("bench", page_size=PAGE_SIZE):
+        speakers[comment["speaker"]] = speakers.get(comment["speaker"], 0) + 1
+    return speakers
+
+
+if __name__ == "__main__":
+    # ストアに載っていない会議として、ページ読み込みだけを差し替える
+    print(f"{'messages':>8} | {'before KiB':>10} {'ms':>7} | {'after KiB':>10} {'ms':>7} | {'iterate KiB':>11} {'ms':>7}")
+    for n in TRANSCRIPT_LENGTHS:
+        message_module._query_history_page = _fake_page(n)
+        before = _measure(lambda: _before(n))
+        after = _measure(lambda: _after(n))
+        iterate = _measure(lambda: _iterate(n))
+        print(
+            f"{n:>8} | {before[0]:>10.0f} {before[1]:>7.1f} | "
+            f"{after[0]:>10.0f} {after[1]:>7.1f} | {iterate[0]:>11.0f} {iterate[1]:>7.1f}"
+        )
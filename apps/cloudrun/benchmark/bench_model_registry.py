@@ -0,0 +1,57 @@
+"""
+function_calling のモデル準備コストを比較するマイクロベンチマーク。
+
+- before: 呼び出しごとに vertexai.init + Tool / ToolConfig / GenerativeModel を生成
+- after : model_registry.get_model で生成済みモデルを取得
+
+LLMへのリクエストは行わない（ネットワーク不要）。
+
+    cd apps/cloudrun
+    python -m benchmark.bench_model_registry
+"""
+
+import time
+
+import vertexai
+from config import Config
+from function_calling import model_registry
+from function_calling.update_minutes import (
+    MODEL_NAME,
+    determine_update_action_plan,
+    determine_update_agenda_completion,
+    determine_update_decision,
+)
+
+ITERATIONS = 1000
+
+CALLS = [
+    ("us-central1", [determine_update_agenda_completion]),
+    ("europe-west4", [determine_update_decision]),
+    ("us-central1", [determine_update_action_plan]),
+]
+
+
+def _per_call_us(fn) -> float:
+    started = time.perf_counter()
+    for _ in range(ITERATIONS):
+        for location, declarations in CALLS:
+            fn(location, declarations)
+    return (time.perf_counter() - started) / (ITERATIONS * len(CALLS)) * 1e6
+
+
+def before(location, declarations):
+    vertexai.init(project=Config.PROJECT_ID, location=location)
+    return model_registry._build_model(MODEL_NAME, declarations)
+
+
+def after(location, declarations):
+    return model_registry.get_model(MODEL_NAME, location, declarations)
+
+
+if __name__ == "__main__":
+    model_registry.clear_models()
+    before_us = _per_call_us(before)
+    after_us = _per_call_us(after)
+    print(f"before (init + build per call): {before_us:9.1f} us/call")
+    print(f"after  (registry lookup)      : {after_us:9.1f} us/call")
+    print(f"speedup: {before_us / after_us:.0f}x")
@@ -0,0 +1,70 @@
+"""
+フィードバック・介入判定のプロンプトのトークン数（推定）を、str(dict) と
+コンパクトな表現（prompt.serializer）で比較するベンチマーク。
+
+LLMへのリクエストは行わない（GEMINI_API_KEY はダミーでよい）。
+
+    cd apps/cloudrun
+    GEMINI_API_KEY=dummy python -m benchmark.bench_prompt_serialization
+"""
+
+import json
+import os
+
+from agent.feedback_agent import AgendaItem, EvaluationResult
+from prompt.budget import estimate_tokens
+from prompt.history import render_comment_history
+from prompt.serializer import render_fields
+
+DATA_PATH = os.path.join(os.path.dirname(__file__), "..", "test", "data", "test_agent_1_input.json")
+HISTORY_LENGTHS = [4, 50, 200]
+
+
+def _comments(sample: list, n: int) -> list:
+    """サンプルの発言を繰り返して n 件にする（Firestoreから読んだ発言と同じフィールドを持たせる）"""
+    comments = []
+    for seq in range(1, n + 1):
+        comment = sample[(seq - 1) % len(sample)]
+        comments.append(
+            {
+                "seq": seq,
+                "speak_at": f"2025-01-26 10:{seq // 60 % 60:02d}:{seq % 60:02d}",
+                "speaker": comment["speaker"] if seq % 5 else "A",  # 同じ発言者が続く発言を混ぜる
+                "message": comment["message"],
+                "meta": None,
+            }
+        )
+    return comments
+
+
+def _fields() -> dict:
+    return {
+        "目的": "プロダクトのアイデアを決める",
+        "アジェンダ": [
+            AgendaItem(topic="参加者からデザインのアイデアを募る", duration=10),
+            AgendaItem(topic="参加者同士でデザインのアイデアを評価", duration=15),
+            AgendaItem(topic="最も評価のよいものに決定", duration=5),
+        ],
+        "参加者": ["A", "B", "C"],
+        "評価結果": EvaluationResult(
+            engagement="Bさんの発言が少ない",
+            concreteness="抽象的な表現が多い",
+            direction="目的から外れていない",
+        ),
+    }
+
+
+if __name__ == "__main__":
+    with open(DATA_PATH, encoding="utf-8") as f:
+        sample = json.load(f)["comment_history"]
+
+    print(f"{'messages':>8} | {'str(dict)':>10} | {'compact':>8} | {'削減率':>6}")
+    for n in HISTORY_LENGTHS:
+        comments = _comments(sample, n)
+        before = str({**_fields(), "発言履歴": comments})
+        after = f"{render_fields(_fields())}\n\n発言履歴:\n{render_comment_history(comments)}"
+        before_tokens, after_tokens = estimate_tokens(before), estimate_tokens(after)
+        print(
+            f"{n:>8} | {before_tokens:>10} | {after_tokens:>8} | "
+            f"{1 - after_tokens / before_tokens:>6.1%}"
+        )
@@ -0,0 +1,194 @@
+import copy
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from threading import Lock
+from typing import Any, Callable, Dict, Optional, Sequence
+
+from cache.ttl_cache import MISSING, TTLCache
+
+# LLMの応答をキャッシュするか
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+# キャッシュの実装（memory: プロセス内 / sqlite: ローカルのSQLiteファイル）
+LLM_CACHE_BACKEND = os.getenv("LLM_CACHE_BACKEND", "memory")
+LLM_CACHE_SQLITE_PATH = os.getenv("LLM_CACHE_SQLITE_PATH", "/tmp/llm_cache.sqlite3")
+LLM_CACHE_TTL_SECONDS = float(os.getenv("LLM_CACHE_TTL_SECONDS", 600))
+LLM_CACHE_MAX_SIZE = int(os.getenv("LLM_CACHE_MAX_SIZE", 1024))
+# temperature がこの値より大きい呼び出しはキャッシュしない（既定は 0 で、決定的な呼び出しだけをキャッシュする。
+# 空にすると temperature によらずキャッシュする）
+LLM_CACHE_MAX_TEMPERATURE = (
+    float(os.getenv("LLM_CACHE_MAX_TEMPERATURE", "0"))
+    if os.getenv("LLM_CACHE_MAX_TEMPERATURE", "0")
+    else None
+)
+
+
+def llm_cache_key(
+    model_name: str,
+    system_instruction: Optional[str],
+    generation_config: Optional[dict],
+    prompt: str,
+    tools: Sequence[str] = (),
+) -> str:
+    """(モデル, システムプロンプト, 生成設定, ツール, プロンプト) のハッシュ"""
+    payload = json.dumps(
+        [model_name, system_instruction, generation_config, list(tools), prompt],
+        ensure_ascii=False,
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class MemoryLLMCache:
+    """プロセス内のキャッシュ（LRU + TTL）"""
+
+    def __init__(self, max_size: int, ttl_seconds: float):
+        self._cache = TTLCache(max_size, ttl_seconds)
+
+    def get(self, key: str) -> Any:
+        # 呼び出し側で変更してもキャッシュに影響しないようコピーを返す
+        value = self._cache.get(key)
+        return value if value is MISSING else copy.deepcopy(value)
+
+    def set(self, key: str, value: Any):
+        self._cache.set(key, copy.deepcopy(value))
+
+    def stats(self) -> Dict[str, Any]:
+        return self._cache.stats()
+
+
+class SQLiteLLMCache:
+    """
+    SQLiteファイルに永続化するキャッシュ（LRU + TTL）。
+
+    1コンテナ内の複数プロセス（gunicornのワーカー）で共有でき、再起動しても残る。
+    値はJSONで保存する。
+    """
+
+    def __init__(self, path: str, max_size: int, ttl_seconds: float):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = Lock()
+        self._conn = sqlite3.connect(
+            path, timeout=30, isolation_level=None, check_same_thread=False
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS llm_cache (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                expires_at REAL NOT NULL,
+                used_at REAL NOT NULL
+            )
+            """)
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS llm_cache_used_at ON llm_cache (used_at)"
+        )
+
+    def get(self, key: str) -> Any:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM llm_cache WHERE key = ? AND expires_at > ?",
+                (key, now),
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return MISSING
+            self._conn.execute(
+                "UPDATE llm_cache SET used_at = ? WHERE key = ?", (now, key)
+            )
+            self.hits += 1
+        return json.loads(row[0])
+
+    def set(self, key: str, value: Any):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, value, expires_at, used_at) "
+                "VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value, ensure_ascii=False), now + self.ttl_seconds, now),
+            )
+            self._conn.execute("DELETE FROM llm_cache WHERE expires_at <= ?", (now,))
+            # 件数上限を超えた分は最も使われていないものから消す
+            removed = self._conn.execute(
+                "DELETE FROM llm_cache WHERE key IN ("
+                "SELECT key FROM llm_cache ORDER BY used_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_size,),
+            ).rowcount
+            self.evictions += max(0, removed)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            size = self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+            total = self.hits + self.misses
+            return {
+                "size": size,
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / total, 3) if total else None,
+            }
+
+
+def create_llm_cache(backend: str = LLM_CACHE_BACKEND):
+    if backend == "sqlite":
+        return SQLiteLLMCache(LLM_CACHE_SQLITE_PATH, LLM_CACHE_MAX_SIZE, LLM_CACHE_TTL_SECONDS)
+    if backend == "memory":
+        return MemoryLLMCache(LLM_CACHE_MAX_SIZE, LLM_CACHE_TTL_SECONDS)
+    raise ValueError(f"Unknown LLM_CACHE_BACKEND: {backend}")
+
+
+llm_cache = create_llm_cache()
+
+_bypass_lock = Lock()
+_bypasses = 0
+
+
+def cached_llm_call(
+    key: str,
+    generate: Callable[[], Any],
+    temperature: Optional[float] = None,
+    bypass: bool = False,
+) -> Any:
+    """
+    同じキーの応答がキャッシュにあればそれを返し、なければ `generate` を呼んで保存する。
+
+    - `generate` はJSONにできる値（応答のテキストや関数呼び出しの引数）を返すこと。
+    - `generate` が例外を投げた場合は保存しない。
+    - `bypass` が True、または temperature が `LLM_CACHE_MAX_TEMPERATURE` を超える場合は
+      キャッシュを使わない。
+    """
+    global _bypasses
+    if (
+        not LLM_CACHE_ENABLED
+        or bypass
+        or (
+            LLM_CACHE_MAX_TEMPERATURE is not None
+            and temperature is not None
+            and temperature > LLM_CACHE_MAX_TEMPERATURE
+        )
+    ):
+        with _bypass_lock:
+            _bypasses += 1
+        return generate()
+
+    cached = llm_cache.get(key)
+    if cached is not MISSING:
+        return cached
+    value = generate()
+    llm_cache.set(key, value)
+    return value
+
+
+def llm_cache_stats() -> Dict[str, Any]:
+    with _bypass_lock:
+        bypasses = _bypasses
+    return {"backend": LLM_CACHE_BACKEND, "bypasses": bypasses, **llm_cache.stats()}
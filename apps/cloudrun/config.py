@@ -13,7 +13,13 @@ class Config:
     FIRESTORE_COMMENT_COLLECTION = "comments"
     FIRESTORE_MINUTES_COLLECTION = "minutes"
     FIRESTORE_ALL_MINUTES_DOCUMENT = "all_minutes"
+    # 議事録の変更操作のログ（all_minutes はこのログを取り込んだスナップショット）
+    FIRESTORE_MINUTES_OPS_COLLECTION = "minutes_ops"
     FIRESTORE_FEEDBACKS_COLLECTION = "feedbacks"
+    # 会議ごとの集計値（発言のシーケンス番号など）。会議ドキュメントを購読している
+    # フロントエンドに発言のたびに通知が飛ばないよう、会議ドキュメントとは分けて持つ
+    FIRESTORE_STATS_COLLECTION = "stats"
+    FIRESTORE_MESSAGE_STATS_DOCUMENT = "messages"
 
     # GCPのPROJECT_ID
     PROJECT_ID = os.getenv("PROJECT_ID")
@@ -0,0 +1,63 @@
+from threading import Lock
+from typing import Dict, List, Tuple
+
+import vertexai
+from config import Config
+from vertexai.preview.generative_models import (
+    FunctionDeclaration,
+    GenerativeModel,
+    Tool,
+    ToolConfig,
+)
+
+# (モデル名, リージョン, 関数宣言の組) -> 準備済みモデル
+# 関数宣言はモジュール定数として定義したものを渡す前提で、同一性で比較する
+# （to_dict() での名前取得は呼び出しごとのコストが大きいため使わない）
+_models: Dict[Tuple[str, str, Tuple[FunctionDeclaration, ...]], GenerativeModel] = {}
+_models_lock = Lock()
+
+
+def _build_model(
+    model_name: str, function_declarations: List[FunctionDeclaration]
+) -> GenerativeModel:
+    tool = Tool(function_declarations=function_declarations)
+    return GenerativeModel(
+        model_name,
+        tools=[tool],
+        tool_config=ToolConfig(
+            function_calling_config=ToolConfig.FunctionCallingConfig(
+                mode=ToolConfig.FunctionCallingConfig.Mode.ANY
+            )
+        ),
+    )
+
+
+def get_model(
+    model_name: str, location: str, function_declarations: List[FunctionDeclaration]
+) -> GenerativeModel:
+    """
+    (モデル名, リージョン, ツール群) ごとに1つだけ生成したモデルを返す。
+
+    GenerativeModel は生成時点の `vertexai.init` のリージョンを保持するため、
+    グローバル設定の切り替えとモデル生成をロック内で行い、以降は使い回す。
+    リクエスト処理中に `vertexai.init` を呼ばないので、複数スレッドから
+    異なるリージョンのモデルを同時に使っても安全。
+    """
+    key = (model_name, location, tuple(function_declarations))
+    model = _models.get(key)
+    if model is not None:
+        return model
+
+    with _models_lock:
+        model = _models.get(key)
+        if model is None:
+            vertexai.init(project=Config.PROJECT_ID, location=location)
+            model = _build_model(model_name, function_declarations)
+            _models[key] = model
+    return model
+
+
+def clear_models():
+    """生成済みモデルを破棄する（テスト・ベンチマーク用）"""
+    with _models_lock:
+        _models.clear()
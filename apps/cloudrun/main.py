@@ -1,16 +1,27 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, g
 from typing import Dict
 
 from flask_cors import CORS
 
-from message.message import post_message
+from message.message import get_participation_stats, post_message, message_store
 from meeting.meeting import create_meeting, AgendaItem as MeetingAgendaItem
+from meeting.meeting_cache import (
+    begin_request_scope,
+    end_request_scope,
+    get_meeting_data,
+    meeting_cache_stats,
+)
 from config import Config
 from agent.intervention_service import generate_intervention_message
-from agent.intervention_request_service import request_intervention
 from agent.feedback_service import generate_feedback
 import json
-from minutes.minutes import set_agenda_in_minutes, update_minutes
+from minutes.minutes import agenda_check_stats, extraction_stats, set_agenda_in_minutes
+from minutes.message_classifier import message_classifier_stats
+from minutes.minutes_log import ops_since, read_minutes
+from pipeline.message_pipeline import enqueue_message_processing, get_pipeline
+from prompt.budget import prompt_usage_stats
+from agent.intervention_gate import intervention_gate_stats
+from cache.llm_cache import llm_cache_stats
 
 
 app = Flask(__name__)
@@ -22,6 +33,19 @@ CORS(
 )
 
 
+@app.before_request
+def _begin_meeting_cache_scope():
+    # 1リクエスト内では同じ会議ドキュメントを1回だけ読む
+    g.meeting_cache_token = begin_request_scope()
+
+
+@app.teardown_request
+def _end_meeting_cache_scope(exc):
+    token = g.pop("meeting_cache_token", None)
+    if token is not None:
+        end_request_scope(token)
+
+
 @app.route("/")
 def hello_world():
     return "Hello Cloud Run!"
@@ -68,10 +92,14 @@ def get_meeting_feedback(meeting_id: str) -> Dict:
     Args:
         meeting_id (str): 会議ID
 
+    Query Parameters:
+        force (str): "true" の場合、発言が増えていなくてもフィードバックを生成し直す
+
     Returns:
         Dict: 会議フィードバック（アジェンダ、要約、評価、改善提案）
     """
-    feedback = generate_feedback(meeting_id)
+    force = request.args.get("force", "false").lower() == "true"
+    feedback = generate_feedback(meeting_id, force=force)
     if feedback is None:
         return jsonify({"error": "Meeting not found or invalid data format"}), 404
 
@@ -87,11 +115,78 @@ def message():
 
     post_message(meeting_id, speaker, message)
 
-    update_minutes(meeting_id)
-    # TODO これ自体を別のendpointに分離したい気分ではある
-    request_intervention(meeting_id)
+    # 議事録の更新と介入判定はバックグラウンドで処理する
+    job_id = enqueue_message_processing(meeting_id)
+
+    return jsonify({"data": {"job_id": job_id}}), 202
+
+
+@app.route("/pipeline/stats", methods=["GET"])
+def pipeline_stats():
+    """バックグラウンド処理のキュー長・処理件数・レイテンシを返す"""
+    return jsonify({"data": get_pipeline().stats()}), 200
 
-    return jsonify({"data": "OK"}), 201
+
+@app.route("/cache/stats", methods=["GET"])
+def cache_stats():
+    """キャッシュのヒット・ミス回数を返す"""
+    stats = {
+        "meeting": meeting_cache_stats(),
+        "messages": message_store.stats(),
+        "llm": llm_cache_stats(),
+    }
+    return jsonify({"data": stats}), 200
+
+
+@app.route("/meeting/<meeting_id>/stats", methods=["GET"])
+def meeting_stats(meeting_id: str):
+    """発言者ごとの発言回数・文字数・沈黙時間と、発言者間の受け渡しの回数を返す（LLMは使わない）"""
+    meeting_data = get_meeting_data(meeting_id)
+    if meeting_data is None:
+        return jsonify({"error": "Meeting not found"}), 404
+    return jsonify({"data": get_participation_stats(meeting_id, meeting_data.get("participants", []))}), 200
+
+
+@app.route("/meeting/<meeting_id>/minutes", methods=["GET"])
+def meeting_minutes(meeting_id: str):
+    """
+    議事録を返す。
+
+    - `since` なし: スナップショットに未取り込みの操作を適用した議事録と、そのバージョン
+    - `since=<バージョン>`: そのバージョンより後の操作（差分）と、最新のバージョン
+    """
+    since = request.args.get("since")
+    if since:
+        ops, version = ops_since(meeting_id, since)
+        return jsonify({"data": {"ops": ops, "version": version}}), 200
+    minutes, version, _ = read_minutes(meeting_id)
+    return jsonify({"data": {"minutes": minutes, "version": version}}), 200
+
+
+@app.route("/prompt/stats", methods=["GET"])
+def prompt_stats():
+    """呼び出し箇所ごとのプロンプトのトークン数（推定）と予算を返す"""
+    return jsonify({"data": prompt_usage_stats()}), 200
+
+
+@app.route("/minutes/stats", methods=["GET"])
+def minutes_stats():
+    """アジェンダの完了判定（会議ごと）と発言の分類器による、議事録の抽出の実行・省略回数と、抽出のタイムアウト回数を返す"""
+    return jsonify(
+        {
+            "data": {
+                "agenda_checks": agenda_check_stats(),
+                "classifier": message_classifier_stats(),
+                "extraction": extraction_stats(),
+            }
+        }
+    ), 200
+
+
+@app.route("/intervention/stats", methods=["GET"])
+def intervention_stats():
+    """介入判定の前段（ローカルの兆候検知）の判定回数と、省略したLLM呼び出しの回数を返す"""
+    return jsonify({"data": intervention_gate_stats()}), 200
 
 
 @app.route("/meeting/<meeting_id>/intervention", methods=["GET"])
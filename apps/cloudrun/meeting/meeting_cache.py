@@ -0,0 +1,91 @@
+import copy
+import os
+from contextlib import contextmanager
+from contextvars import ContextVar
+from threading import Lock
+from typing import Dict, Optional
+
+from cache.ttl_cache import MISSING, TTLCache
+from config import Config
+
+# プロセス内キャッシュの有効期限（秒）と件数上限
+MEETING_CACHE_TTL_SECONDS = float(os.getenv("MEETING_CACHE_TTL_SECONDS", 60))
+MEETING_CACHE_MAX_SIZE = int(os.getenv("MEETING_CACHE_MAX_SIZE", 256))
+
+# プロセス内で共有するキャッシュ（LRU + TTL）
+_process_cache = TTLCache(MEETING_CACHE_MAX_SIZE, MEETING_CACHE_TTL_SECONDS)
+
+# リクエスト（またはジョブ）単位のキャッシュ。スコープ外では None
+_request_cache: ContextVar[Optional[Dict[str, Optional[dict]]]] = ContextVar(
+    "meeting_request_cache", default=None
+)
+
+_stats_lock = Lock()
+_request_hits = 0
+
+
+def _fetch_meeting(meeting_id: str) -> Optional[dict]:
+    doc = (
+        Config.get_db_client()
+        .collection(Config.FIRESTORE_MEETING_COLLECTION)
+        .document(meeting_id)
+        .get()
+    )
+    return doc.to_dict() if doc.exists else None
+
+
+@contextmanager
+def request_scope():
+    """このスコープ内では同じ会議ドキュメントを1回しか読まない"""
+    token = _request_cache.set({})
+    try:
+        yield
+    finally:
+        _request_cache.reset(token)
+
+
+def begin_request_scope():
+    return _request_cache.set({})
+
+
+def end_request_scope(token):
+    _request_cache.reset(token)
+
+
+def get_meeting_data(meeting_id: str) -> Optional[dict]:
+    """
+    会議ドキュメント（meetings/<id>）の内容を返す。存在しなければ None。
+
+    リクエスト単位のキャッシュ → プロセス内キャッシュ → Firestore の順に参照する。
+    呼び出し側で変更しても影響しないようコピーを返す。
+    """
+    global _request_hits
+    request_cache = _request_cache.get()
+    if request_cache is not None and meeting_id in request_cache:
+        with _stats_lock:
+            _request_hits += 1
+        return copy.deepcopy(request_cache[meeting_id])
+
+    meeting_data = _process_cache.get(meeting_id)
+    if meeting_data is MISSING:
+        meeting_data = _fetch_meeting(meeting_id)
+        if meeting_data is not None:
+            _process_cache.set(meeting_id, meeting_data)
+
+    if request_cache is not None:
+        request_cache[meeting_id] = meeting_data
+    return copy.deepcopy(meeting_data)
+
+
+def invalidate_meeting(meeting_id: str):
+    """自分で会議ドキュメントを書き換えたときに呼ぶ"""
+    _process_cache.invalidate(meeting_id)
+    request_cache = _request_cache.get()
+    if request_cache is not None:
+        request_cache.pop(meeting_id, None)
+
+
+def meeting_cache_stats() -> dict:
+    with _stats_lock:
+        request_hits = _request_hits
+    return {"request_hits": request_hits, **_process_cache.stats()}
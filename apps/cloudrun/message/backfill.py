@@ -0,0 +1,40 @@
+"""
+連番（seq）と role を付ける前に書き込まれた発言に、連番と role を付ける移行用のコマンド。
+発言者ごとの統計も全発言から作り直す。
+
+    cd apps/cloudrun
+    python -m message.backfill [会議ID ...]
+
+会議IDを省略するとすべての会議が対象になる。何度実行しても結果は変わらない。
+"""
+
+import sys
+from typing import List
+
+from google.cloud import firestore
+
+from config import Config
+from message.message import backfill_message_seq
+from minutes.constants import MinutesFields
+from minutes.minutes_log import minutes_doc_ref
+
+
+def _all_meeting_ids() -> List[str]:
+    meetings = Config.get_db_client().collection(Config.FIRESTORE_MEETING_COLLECTION)
+    return [ref.id for ref in meetings.list_documents()]
+
+
+def main(argv: List[str]):
+    meeting_ids = argv or _all_meeting_ids()
+    for meeting_id in meeting_ids:
+        renumbered, shifted = backfill_message_seq(meeting_id)
+        if shifted:
+            # 会議の要約は連番で取り込み済みの位置を持つため、作り直させる
+            summary_ref = minutes_doc_ref(meeting_id)
+            if summary_ref.get(field_paths=[MinutesFields.ROLLING_SUMMARY]).exists:
+                summary_ref.update({MinutesFields.ROLLING_SUMMARY: firestore.DELETE_FIELD})
+        print(f"🔢 [連番] {meeting_id}: {renumbered}件を更新" + ("（既存の連番を振り直し）" if shifted else ""))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -1,50 +1,441 @@
+import os
 from config import Config
-from typing import Optional
+from typing import Iterator, List, Optional, Tuple
 
-from utils import get_jst_timestamp
+from google.cloud import firestore
+from google.cloud.firestore_v1.base_query import FieldFilter
+
+from message.message_store import MessageStore
+from message.participation import (
+    apply_deltas,
+    participation_deltas,
+    summarize_participation,
+)
+from utils import count_io, get_jst_timestamp
+
+# メモリ上に発言を保持する会議数の上限（超えたら最も使われていない会議から追い出す）
+MESSAGE_STORE_MAX_MEETINGS = int(os.getenv("MESSAGE_STORE_MAX_MEETINGS", 100))
+# 会議ごとに保持する直近の発言数（MESSAGE_STORE_KEEP_FULL_LOG が false の場合）
+MESSAGE_STORE_TAIL_SIZE = int(os.getenv("MESSAGE_STORE_TAIL_SIZE", 50))
+# 会議の全発言をメモリ上に保持するか（既定では直近の発言だけを保持し、会議ごとのメモリを一定にする）
+MESSAGE_STORE_KEEP_FULL_LOG = (
+    os.getenv("MESSAGE_STORE_KEEP_FULL_LOG", "false").lower() == "true"
+)
+# ストアに揃っていない履歴をFirestoreから順に読む場合の1ページの件数
+MESSAGE_HISTORY_PAGE_SIZE = int(os.getenv("MESSAGE_HISTORY_PAGE_SIZE", 200))
+# 1回のトランザクションで連番を付ける発言数の上限
+MESSAGE_SEQ_BATCH_SIZE = int(os.getenv("MESSAGE_SEQ_BATCH_SIZE", 200))
+# 連番を振り直す（backfill_message_seq）ときに1回のバッチで書き込む発言数（Firestoreの上限は500）
+MESSAGE_BACKFILL_CHUNK_SIZE = int(os.getenv("MESSAGE_BACKFILL_CHUNK_SIZE", 400))
 
 db_client = Config.get_db_client()
 
+message_store = MessageStore(
+    max_meetings=MESSAGE_STORE_MAX_MEETINGS,
+    tail_size=MESSAGE_STORE_TAIL_SIZE,
+    keep_full_log=MESSAGE_STORE_KEEP_FULL_LOG,
+)
+
+
+# 発言の送り手（トップレベルの role フィールドに保存し、クエリで絞り込む）
+ROLE_HUMAN = "human"
+ROLE_AI = "ai"
+
+# 発言履歴として読むフィールド（プロンプトで使うものだけ）
+HISTORY_FIELDS = ["seq", "speak_at", "speaker", "message"]
+# 連番を付けるときに読むフィールド
+_SEQUENCE_FIELDS = HISTORY_FIELDS + ["role"]
+
+
+def _is_ai_message(data: dict) -> bool:
+    meta = data.get("meta")
+    return meta is not None and meta.get("role", "") == "ai"
+
+
+def _comments_ref(meeting_id: str):
+    return (
+        db_client.collection(Config.FIRESTORE_MEETING_COLLECTION)
+        .document(meeting_id)
+        .collection(Config.FIRESTORE_COMMENT_COLLECTION)
+    )
+
+
+def _message_stats_ref(meeting_id: str):
+    return (
+        db_client.collection(Config.FIRESTORE_MEETING_COLLECTION)
+        .document(meeting_id)
+        .collection(Config.FIRESTORE_STATS_COLLECTION)
+        .document(Config.FIRESTORE_MESSAGE_STATS_DOCUMENT)
+    )
+
+
+def _history_entry(data: dict) -> dict:
+    """発言履歴として返す形にする（Firestoreの select と同じフィールドに絞る）"""
+    return {field: data[field] for field in HISTORY_FIELDS if field in data}
+
 
 def post_message(meeting_id, speaker, message, meta=None):
+    """
+    発言を書き込む。
+
+    連番（seq）は付けずにドキュメントを1件追加するだけで、会議ごとのドキュメントを
+    更新するトランザクションは行わない。連番は `assign_message_seq` がまとめて付ける。
+    """
     data = {
-        "speak_at": get_jst_timestamp(),
+        "speak_at": get_jst_timestamp(),  # 表示用（フロントエンドはこの順に並べる）
+        "created_at": firestore.SERVER_TIMESTAMP,
         "speaker": speaker,  # スピーカーを追加
         "message": message,  # メッセージを追加
         "meta": meta,  # AIによる補足情報
+        "seq": None,  # assign_message_seq が付ける
     }
+    data["role"] = ROLE_AI if _is_ai_message(data) else ROLE_HUMAN
 
-    db_client.collection(Config.FIRESTORE_MEETING_COLLECTION).document(
-        meeting_id
-    ).collection(Config.FIRESTORE_COMMENT_COLLECTION).add(data)
+    _comments_ref(meeting_id).add(data)
 
     return meeting_id
 
 
-def get_message_history(meeting_id: str, limit_to_last: Optional[int] = None):
+def _participation_increments(deltas: dict) -> dict:
+    """統計の差分を、変わったフィールドだけを加算する書き込みにする（統計全体は書き直さない）"""
+    increments = {
+        "speakers": {
+            key: {
+                "name": row["name"],
+                "turns": firestore.Increment(row["turns"]),
+                "chars": firestore.Increment(row["chars"]),
+                "last_spoke_at": row["last_spoke_at"],
+                "first_seq": firestore.Minimum(row["first_seq"]),
+            }
+            for key, row in deltas["speakers"].items()
+        },
+        "last_speaker": deltas["last_speaker"],
+    }
+    # 空のマップは既存の値を消してしまうため、受け渡しがなければ書かない
+    if deltas["transitions"]:
+        increments["transitions"] = {
+            source: {target: firestore.Increment(count) for target, count in targets.items()}
+            for source, targets in deltas["transitions"].items()
+        }
+    return increments
+
+
+@firestore.transactional
+def _assign_seq_batch(transaction, meeting_id: str) -> List[Tuple[str, dict]]:
+    """
+    連番のない発言に、書き込まれた順（created_at）に連番を付ける（最大 MESSAGE_SEQ_BATCH_SIZE 件）。
+
+    発言（AI以外）があれば、最新の発言の連番（last_human_seq）と発言者ごとの統計も
+    同じトランザクションで更新する。
+    連番を付けた (ドキュメントID, 発言) を連番順に返す。
+    """
+    stats_ref = _message_stats_ref(meeting_id)
+    stats = stats_ref.get(transaction=transaction).to_dict() or {}
+    if stats.get("backfilling"):
+        # 連番の振り直し中は付けない（振り直しが終わった後のジョブで付ける）
+        return []
+    query = (
+        _comments_ref(meeting_id)
+        .where(filter=FieldFilter("seq", "==", None))
+        .select(_SEQUENCE_FIELDS)
+        .order_by("created_at")
+        .limit(MESSAGE_SEQ_BATCH_SIZE)
+    )
+    docs = list(transaction.get(query))
+    if not docs:
+        return []
+
+    seq = stats.get("last_seq", 0)
+    update = {}
+    assigned = []
+    human_messages = []
+    for doc in docs:
+        seq += 1
+        data = {**doc.to_dict(), "seq": seq}
+        transaction.update(doc.reference, {"seq": seq})
+        if data.get("role") == ROLE_HUMAN:
+            update["last_human_seq"] = seq
+            human_messages.append(data)
+        assigned.append((doc.id, data))
+    update["last_seq"] = seq
+
+    if human_messages:
+        last_speaker = (stats.get("participation") or {}).get("last_speaker")
+        update["participation"] = _participation_increments(
+            participation_deltas(human_messages, last_speaker)
+        )
+    transaction.set(stats_ref, update, merge=True)
+    return assigned
+
+
+def assign_message_seq(meeting_id: str) -> int:
+    """
+    連番のない発言に会議ごとの連番をまとめて付け、付けた件数を返す。
+
+    発言ごとではなく、バックグラウンド処理のジョブごとに1回のトランザクションで採番するため、
+    発言が続いても会議ごとのドキュメントの更新は競合しにくい。他のインスタンスに届いた発言にも付ける。
+    連番を付けた発言はメモリ上の発言履歴にも反映する（write-through）。
+    """
+    total = 0
+    while True:
+        assigned = _assign_seq_batch(db_client.transaction(), meeting_id)
+        for doc_id, data in assigned:
+            message_store.append(
+                meeting_id, doc_id, _history_entry(data), keep=data.get("role") == ROLE_HUMAN
+            )
+        total += len(assigned)
+        if len(assigned) < MESSAGE_SEQ_BATCH_SIZE:
+            return total
+
+
+def backfill_order(records: List[Tuple[str, dict]]) -> List[Tuple[str, dict]]:
+    """
+    連番を振り直すときの発言の順序を返す。
+
+    1. 連番を付ける前に書き込まれた発言（seq フィールドがない）: speak_at の順
+    2. 連番のある発言: 連番の順
+    3. まだ連番のない発言（seq が null）: created_at の順
+    """
+
+    def key(record):
+        doc_id, data = record
+        if "seq" not in data:
+            return (0, data.get("speak_at") or "", doc_id)
+        if data["seq"] is not None:
+            return (1, data["seq"], doc_id)
+        created_at = data.get("created_at")
+        return (2, created_at.timestamp() if created_at else 0.0, doc_id)
+
+    return sorted(records, key=key)
+
+
+@firestore.transactional
+def _start_backfill(transaction, meeting_id: str):
+    # 採番と同じドキュメントを読むトランザクションで印を付け、振り直しの間は採番を止める
+    stats_ref = _message_stats_ref(meeting_id)
+    stats_ref.get(transaction=transaction)
+    transaction.set(stats_ref, {"backfilling": True}, merge=True)
+
+
+def _backfill_records(meeting_id: str) -> List[Tuple[str, dict]]:
+    """連番を振り直す発言（まだ連番のない発言を除く）を、振り直す順に返す"""
+    query = _comments_ref(meeting_id).select(_SEQUENCE_FIELDS + ["meta", "created_at"])
+    records = [(doc.id, doc.to_dict()) for doc in query.stream()]
+    # まだ連番のない発言は、振り直しの後に assign_message_seq が続きの連番を付ける
+    return backfill_order(
+        [(doc_id, data) for doc_id, data in records if "seq" not in data or data["seq"] is not None]
+    )
+
+
+def backfill_message_seq(meeting_id: str) -> Tuple[int, bool]:
+    """
+    会議の全発言に連番と role を付け直し、発言者ごとの統計を作り直す（移行用）。
+
+    連番を付ける前（seq と role がない）に書き込まれた発言は履歴のクエリに含まれないため、
+    デプロイ後に一度実行する。振り直しの間は統計のドキュメントの印（backfilling）で
+    `assign_message_seq` を止めるため、運用中に実行しても採番と競合しない。
+
+    発言は MESSAGE_BACKFILL_CHUNK_SIZE 件ずつのバッチで、連番の大きい方から書き込む。
+    途中で失敗しても、書き込んだ発言は書き込んでいない発言より後ろに並んだままなので、
+    もう一度実行すれば続きから同じ結果になる。統計は最後に1回だけ書き込む。
+
+    Returns:
+        Tuple[int, bool]: (更新した発言数, 既存の連番が変わったか)
+    """
+    _start_backfill(db_client.transaction(), meeting_id)
+    records = _backfill_records(meeting_id)
+
+    writes = []
+    human_messages = []
+    last_human_seq = 0
+    shifted = False
+    for seq, (doc_id, data) in enumerate(records, start=1):
+        update = {}
+        if data.get("seq") != seq:
+            update["seq"] = seq
+            shifted = shifted or data.get("seq") is not None
+        if "role" not in data:
+            data["role"] = update["role"] = ROLE_AI if _is_ai_message(data) else ROLE_HUMAN
+        if update:
+            writes.append((doc_id, update))
+        if data["role"] == ROLE_HUMAN:
+            last_human_seq = seq
+            human_messages.append({**data, "seq": seq})
+
+    writes.reverse()
+    for start in range(0, len(writes), MESSAGE_BACKFILL_CHUNK_SIZE):
+        batch = db_client.batch()
+        for doc_id, update in writes[start:start + MESSAGE_BACKFILL_CHUNK_SIZE]:
+            batch.update(_comments_ref(meeting_id).document(doc_id), update)
+        batch.commit()
+
+    _message_stats_ref(meeting_id).update({
+        "last_seq": len(records),
+        "last_human_seq": last_human_seq,
+        "participation": apply_deltas(None, participation_deltas(human_messages, None)),
+        "backfilling": firestore.DELETE_FIELD,
+    })
+    return len(writes), shifted
+
+
+def get_participation_stats(meeting_id: str, participants: Optional[List[str]] = None) -> dict:
+    """
+    発言者ごとの発言回数・文字数・最後の発言からの経過秒数と、発言者間の受け渡しの回数を返す。
+
+    `assign_message_seq` で更新済みの集計を1回読むだけで、発言履歴は読まない。
+    """
+    snapshot = _message_stats_ref(meeting_id).get(field_paths=["participation"])
+    state = (snapshot.to_dict() or {}).get("participation") if snapshot.exists else None
+    return summarize_participation(state, participants)
+
+
+def _history_query(meeting_id: str):
+    """
+    発言（AI以外）を連番順に読むクエリ。
+
+    AIの発言はクエリで除外し、`HISTORY_FIELDS` だけを読む（role と seq の複合インデックスが必要）。
+    まだ連番のない発言（seq が null）は含めない。
+    """
+    return (
+        _comments_ref(meeting_id)
+        .where(filter=FieldFilter("role", "==", ROLE_HUMAN))
+        .where(filter=FieldFilter("seq", ">", 0))
+        .select(HISTORY_FIELDS)
+        .order_by("seq")
+    )
+
+
+def _query_message_history(
+    meeting_id: str,
+    limit_to_last: Optional[int] = None,
+    since: Optional[int] = None,
+    io_counts: Optional[dict] = None,
+) -> List[Tuple[str, dict]]:
+    """
+    Firestoreから発言（AI以外）を連番順に読む。`since` より後の発言だけに絞れる。
+
+    (ドキュメントID, 発言) のリストを返す。
+    """
+    query = _history_query(meeting_id)
+    if since is not None:
+        query = query.start_after({"seq": since})
+    if limit_to_last is not None:
+        query = query.limit_to_last(limit_to_last)
+    comments = query.get()
+    count_io(io_counts, reads=max(len(comments), 1))
+
+    return [(comment.id, comment.to_dict()) for comment in comments]
+
+
+def _load_message_history(meeting_id: str, io_counts: Optional[dict] = None):
+    """Firestoreから発言履歴を読み込み、メモリ上のストアに登録する"""
+    message_store.start_loading(meeting_id)
+    load_limit = message_store.load_limit
+    try:
+        messages = _query_message_history(meeting_id, load_limit, io_counts=io_counts)
+    except Exception:
+        message_store.discard(meeting_id)
+        raise
+
+    truncated = load_limit is not None and len(messages) >= load_limit
+    message_store.finish_loading(meeting_id, messages, truncated)
+
+
+def _resync_message_history(meeting_id: str, since: int, io_counts: Optional[dict] = None):
+    """他のインスタンスに届いた発言を、差分だけFirestoreから読んでストアに反映する"""
+    messages = _query_message_history(meeting_id, since=since, io_counts=io_counts)
+    message_store.merge(meeting_id, since, messages)
+
+
+def _refresh_message_store(meeting_id: str, io_counts: Optional[dict] = None):
+    """ストアが読めない状態なら、差分の読み直しか全体の読み込みを行う"""
+    resync_since = message_store.resync_cursor(meeting_id)
+    if resync_since is not None:
+        _resync_message_history(meeting_id, resync_since, io_counts)
+    else:
+        _load_message_history(meeting_id, io_counts)
+
+
+def get_message_history(
+    meeting_id: str,
+    limit_to_last: Optional[int] = None,
+    since: Optional[int] = None,
+    io_counts: Optional[dict] = None,
+):
     """
     発言を時系列順（古いものが先）に取得する。
 
     - `limit_to_last` を指定すると、最新 N 件のみを取得。
     - 指定しない場合は、すべての発言を取得。
+    - `since` に取得済みの最後の発言の `seq` を渡すと、それより後の発言だけを取得。
+    - メモリ上のストアに保持していればFirestoreを読まない。
+      コールドスタート時や保持件数が足りない場合はFirestoreから読み込み、
+      他のインスタンスに届いた発言があれば差分だけを読み込む。
+    - 会議全体を順に処理するだけなら `iter_message_history` を使う。
+    - `io_counts` を渡すと、Firestoreから読んだドキュメント数を加える（ストアから返せば0）。
     """
+    message_history = message_store.get(meeting_id, limit_to_last, since)
+    if message_history is not None:
+        return message_history
 
-    comments_ref = (
-        db_client.collection(Config.FIRESTORE_MEETING_COLLECTION)
-        .document(meeting_id)
-        .collection(Config.FIRESTORE_COMMENT_COLLECTION)
-        .order_by("speak_at")
-        .limit_to_last(limit_to_last)
-    )
+    _refresh_message_store(meeting_id, io_counts)
+    message_history = message_store.get(meeting_id, limit_to_last, since)
+    if message_history is not None:
+        return message_history
+
+    # ストアの保持件数を超える履歴が必要な場合は直接読む
+    messages = _query_message_history(meeting_id, limit_to_last, since, io_counts)
+    return [data for _, data in messages]
+
+
+def get_history_version(meeting_id: str) -> int:
+    """
+    発言履歴のバージョン（最新の発言（AI以外）の連番。発言がなければ 0）。
+
+    AIの発言では変わらないため、生成結果が同じ履歴から作られたかの判定に使える。
+    他のインスタンスで連番が付いた発言も反映されるよう、メモリ上のストアではなく
+    `assign_message_seq` が更新する `last_human_seq` をFirestoreから1回読む。
+    """
+    snapshot = _message_stats_ref(meeting_id).get(field_paths=["last_human_seq"])
+    return (snapshot.to_dict() or {}).get("last_human_seq", 0) if snapshot.exists else 0
+
+
+def _query_history_page(meeting_id: str, after: Optional[int], page_size: int) -> List[dict]:
+    """`after` より後の発言（AI以外）を連番順に最大 `page_size` 件読む"""
+    query = _history_query(meeting_id).limit(page_size)
+    if after is not None:
+        query = query.start_after({"seq": after})
+    return [comment.to_dict() for comment in query.stream()]
 
-    comments = comments_ref.get()
 
-    message_history = []
-    for comment in comments:
-        data = comment.to_dict()
-        # AIの発言以外をフィルタリング
-        meta = data.get("meta")
-        if meta is None or meta.get("role", "") != "ai":
-            message_history.append(data)
+def iter_message_history(
+    meeting_id: str,
+    since: Optional[int] = None,
+    page_size: int = MESSAGE_HISTORY_PAGE_SIZE,
+) -> Iterator[dict]:
+    """
+    発言を時系列順（古いものが先）に1件ずつ返すジェネレータ。
+
+    - 会議全体をリストにせずに処理するため、長い会議でも呼び出し側のメモリは増えない。
+    - メモリ上のストアに揃っていればそこから1件ずつコピーして返す。
+      他のインスタンスで連番が付いた発言があれば、差分だけ読み直してからストアを使う。
+    - ストアに載っていない会議は、ストアに全体を読み込まずに `page_size` 件ずつ
+      Firestoreから読む（`HISTORY_FIELDS` のみ）。
+    """
+    messages = message_store.iter(meeting_id, since)
+    if messages is None:
+        resync_since = message_store.resync_cursor(meeting_id)
+        if resync_since is not None:
+            _resync_message_history(meeting_id, resync_since)
+            messages = message_store.iter(meeting_id, since)
+    if messages is not None:
+        yield from messages
+        return
 
-    return message_history
+    after = since
+    while True:
+        page = _query_history_page(meeting_id, after, page_size)
+        yield from page
+        if len(page) < page_size:
+            return
+        after = page[-1]["seq"]
@@ -0,0 +1,215 @@
+from collections import OrderedDict, deque
+from threading import Lock
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# (FirestoreのドキュメントID, 発言データ)
+StoredMessage = Tuple[str, dict]
+
+
+class _MeetingLog:
+    def __init__(self, max_messages: Optional[int]):
+        # 直近の発言（max_messages が None なら会議の全発言）
+        self.messages: "deque[StoredMessage]" = deque(maxlen=max_messages)
+        # 古い発言を保持していない（リングバッファから溢れた・一部だけ読み込んだ）か
+        self.truncated = False
+        # Firestoreから読み込み中か。読み込み中に書き込まれた発言は pending に貯める
+        self.loading = True
+        self.pending: List[StoredMessage] = []
+        # これまでに見た最大のシーケンス番号（AIの発言を含む）
+        self.last_seq = 0
+        # シーケンス番号の飛び（他のインスタンスに届いた発言）を検出したときの差分の起点
+        self.resync_since: Optional[int] = None
+        # 最後に検出した飛びの直前のシーケンス番号と、読み直し中の差分が含むはずの範囲
+        self.last_gap_after = 0
+        self.resync_upto = 0
+
+
+def _seq(stored: StoredMessage) -> int:
+    return stored[1].get("seq", 0)
+
+
+class MessageStore:
+    """
+    会議ごとの発言（AI以外）をメモリ上に保持するストア。
+
+    - `keep_full_log` が False の場合は直近 `tail_size` 件だけをリングバッファで保持する。
+    - 保持する会議数は `max_meetings` までで、最も使われていない会議から追い出す。
+    - 未読み込みの会議（コールドスタート・追い出し後）は `get` が None を返すので、
+      呼び出し側はFirestoreから読み込んで `finish_loading` で登録する。
+    - 書き込んだ発言のシーケンス番号が飛んでいたら、`resync_cursor` 以降の差分を
+      `merge` で反映するまで `get` は None を返す。
+    """
+
+    def __init__(self, max_meetings: int, tail_size: int, keep_full_log: bool):
+        self.max_meetings = max_meetings
+        self.tail_size = tail_size
+        self.keep_full_log = keep_full_log
+        self._meetings: "OrderedDict[str, _MeetingLog]" = OrderedDict()
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def load_limit(self) -> Optional[int]:
+        """コールドスタート時にFirestoreから読み込む件数（None なら全件）"""
+        return None if self.keep_full_log else self.tail_size
+
+    def _touch(self, meeting_id: str, log: _MeetingLog):
+        self._meetings[meeting_id] = log
+        self._meetings.move_to_end(meeting_id)
+        while len(self._meetings) > self.max_meetings:
+            self._meetings.popitem(last=False)
+            self.evictions += 1
+
+    @staticmethod
+    def _replace(log: _MeetingLog, messages: List[StoredMessage], truncated: bool):
+        messages = sorted(messages, key=_seq)
+        log.messages.clear()
+        log.messages.extend(messages)
+        log.truncated = truncated or len(messages) > len(log.messages)
+        log.last_seq = max([log.last_seq] + [_seq(m) for m in messages])
+
+    def append(self, meeting_id: str, doc_id: str, message: dict, keep: bool = True):
+        """
+        書き込んだ発言を反映する（未読み込みの会議なら何もしない）。
+
+        `keep` が False の発言（AIの発言）は保持せず、シーケンス番号だけを進める。
+        """
+        with self._lock:
+            log = self._meetings.get(meeting_id)
+            if log is None:
+                return
+            if log.loading:
+                if keep:
+                    log.pending.append((doc_id, message))
+                return
+            seq = message.get("seq", 0)
+            if seq > log.last_seq + 1:
+                if log.resync_since is None:
+                    log.resync_since = log.last_seq
+                log.last_gap_after = log.last_seq
+            log.last_seq = max(log.last_seq, seq)
+            if keep:
+                if len(log.messages) == log.messages.maxlen:
+                    log.truncated = True
+                log.messages.append((doc_id, message))
+            self._meetings.move_to_end(meeting_id)
+
+    def _select(
+        self, meeting_id: str, limit_to_last: Optional[int], since: Optional[int]
+    ) -> Optional[List[dict]]:
+        """保持している発言（コピーしない）を古い順に返す。必要な発言が揃っていなければ None"""
+        with self._lock:
+            log = self._meetings.get(meeting_id)
+            if log is None or log.loading or log.resync_since is not None:
+                self.misses += 1
+                return None
+            messages = list(log.messages)
+            if since is not None:
+                messages = [m for m in messages if _seq(m) > since]
+            covered = not log.truncated
+            if since is not None and log.messages:
+                # 保持している最古の発言が cursor の直後以前なら、その後はすべて揃っている
+                covered = covered or _seq(log.messages[0]) <= since + 1
+            if limit_to_last is not None and len(messages) >= limit_to_last:
+                covered = True
+            if not covered:
+                self.misses += 1
+                return None
+            self._meetings.move_to_end(meeting_id)
+            self.hits += 1
+        if limit_to_last is not None:
+            messages = messages[-limit_to_last:] if limit_to_last > 0 else []
+        return [message for _, message in messages]
+
+    def get(
+        self,
+        meeting_id: str,
+        limit_to_last: Optional[int],
+        since: Optional[int] = None,
+    ) -> Optional[List[dict]]:
+        """
+        保持している発言のコピーを古い順に返す。
+
+        `since` を指定した場合はシーケンス番号がそれより大きい発言だけを返す。
+        必要な発言をすべて保持していなければ None を返す。
+        """
+        messages = self._select(meeting_id, limit_to_last, since)
+        if messages is None:
+            return None
+        return [dict(message) for message in messages]
+
+    def iter(
+        self, meeting_id: str, since: Optional[int] = None
+    ) -> Optional[Iterator[dict]]:
+        """`get` と同じ発言を1件ずつコピーして返すイテレータ。揃っていなければ None"""
+        messages = self._select(meeting_id, None, since)
+        if messages is None:
+            return None
+        return (dict(message) for message in messages)
+
+    def resync_cursor(self, meeting_id: str) -> Optional[int]:
+        """差分の読み直しが必要なら、その起点となるシーケンス番号を返す"""
+        with self._lock:
+            log = self._meetings.get(meeting_id)
+            if log is None or log.loading or log.resync_since is None:
+                return None
+            # これから読む差分には、少なくとも現時点の last_seq までが含まれる
+            log.resync_upto = log.last_seq
+            return log.resync_since
+
+    def start_loading(self, meeting_id: str):
+        """Firestoreからの読み込みを始める前に呼ぶ（読み込み中の書き込みを取りこぼさないため）"""
+        with self._lock:
+            if (
+                meeting_id not in self._meetings
+                or not self._meetings[meeting_id].loading
+            ):
+                max_messages = None if self.keep_full_log else self.tail_size
+                self._touch(meeting_id, _MeetingLog(max_messages))
+
+    def finish_loading(
+        self, meeting_id: str, messages: List[StoredMessage], truncated: bool
+    ):
+        """Firestoreから読み込んだ発言を登録する"""
+        with self._lock:
+            log = self._meetings.get(meeting_id)
+            if log is None:
+                return
+            loaded_ids = {doc_id for doc_id, _ in messages}
+            merged = messages + [p for p in log.pending if p[0] not in loaded_ids]
+            self._replace(log, merged, truncated)
+            log.pending = []
+            log.loading = False
+
+    def merge(self, meeting_id: str, since: int, messages: List[StoredMessage]):
+        """`resync_cursor` で得た起点 `since` 以降の差分をFirestoreから読み込んで反映する"""
+        with self._lock:
+            log = self._meetings.get(meeting_id)
+            if log is None or log.loading:
+                return
+            known_ids = {doc_id for doc_id, _ in log.messages}
+            merged = list(log.messages) + [m for m in messages if m[0] not in known_ids]
+            self._replace(log, merged, log.truncated)
+            if log.resync_since is None or log.resync_since != since:
+                return
+            if log.last_gap_after < log.resync_upto:
+                log.resync_since = None
+            else:
+                # 差分の読み込み中にさらに飛びを検出した場合はその手前から読み直す
+                log.resync_since = log.resync_upto
+
+    def discard(self, meeting_id: str):
+        with self._lock:
+            self._meetings.pop(meeting_id, None)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "meetings": len(self._meetings),
+                "messages": sum(len(log.messages) for log in self._meetings.values()),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
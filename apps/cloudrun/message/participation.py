@@ -0,0 +1,182 @@
+import copy
+import hashlib
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+import pytz
+
+# 発言の統計は発言の連番と同じドキュメント（meetings/<id>/stats/messages）の participation に保存する。
+# 発言者ごとのフィールドに分け、連番を付けるたびに変わったフィールドだけを加算（Increment）する。
+# 発言者名はフィールド名に使えない文字を含みうるため、キーには名前のハッシュを使う。
+#
+#   speakers:     {キー: {name, turns, chars, last_spoke_at, first_seq}}
+#                 turns / chars: 発言回数 / 文字数の合計、first_seq: 最初の発言の連番（並び順に使う）
+#   transitions:  {発言者のキー: {次に発言した発言者のキー: 回数}}
+#   last_speaker: 直前の発言者のキー（まだ発言がなければ None）
+
+_TZ_JAPAN = pytz.timezone("Asia/Tokyo")
+_TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+# プロンプトに入れる「最後の発言からの経過時間」の区切り（分）。
+# 経過時間は呼び出すたびに変わるため、区切りにまとめてプロンプト（LLMのキャッシュのキー）を変わりにくくする
+_SILENCE_BUCKETS_MINUTES = (5, 15, 30)
+
+
+def empty_participation() -> Dict[str, Any]:
+    return {"speakers": {}, "transitions": {}, "last_speaker": None}
+
+
+def speaker_key(speaker: Optional[str]) -> str:
+    return "s" + hashlib.sha1(str(speaker or "").encode("utf-8")).hexdigest()[:12]
+
+
+def participation_deltas(messages: Iterable[dict], last_speaker: Optional[str]) -> Dict[str, Any]:
+    """
+    連番順の発言（AI以外）から、統計に加算する値を計算する。
+
+    `last_speaker` は直前の発言者のキー（前回までの統計の last_speaker）。
+    発言者と受け渡しの組ごとの差分だけを返すので、書き込む量は会議の長さや発言者数によらない。
+    """
+    deltas = empty_participation()
+    speakers = deltas["speakers"]
+    for message in messages:
+        key = speaker_key(message.get("speaker"))
+        row = speakers.setdefault(
+            key,
+            {"name": message.get("speaker"), "turns": 0, "chars": 0, "first_seq": message.get("seq", 0)},
+        )
+        row["turns"] += 1
+        row["chars"] += len(message.get("message") or "")
+        row["last_spoke_at"] = message.get("speak_at")
+        if last_speaker is not None:
+            targets = deltas["transitions"].setdefault(last_speaker, {})
+            targets[key] = targets.get(key, 0) + 1
+        last_speaker = key
+    deltas["last_speaker"] = last_speaker
+    return deltas
+
+
+def apply_deltas(state: Optional[Dict[str, Any]], deltas: Dict[str, Any]) -> Dict[str, Any]:
+    """`participation_deltas` の結果を統計に反映した結果を返す（`state` は変更しない）"""
+    state = copy.deepcopy(state) if state else empty_participation()
+    for key, delta in deltas["speakers"].items():
+        row = state["speakers"].setdefault(
+            key, {"name": delta["name"], "turns": 0, "chars": 0, "first_seq": delta["first_seq"]}
+        )
+        row["turns"] += delta["turns"]
+        row["chars"] += delta["chars"]
+        row["first_seq"] = min(row["first_seq"], delta["first_seq"])
+        row["last_spoke_at"] = delta["last_spoke_at"]
+    for source, targets in deltas["transitions"].items():
+        row = state["transitions"].setdefault(source, {})
+        for target, count in targets.items():
+            row[target] = row.get(target, 0) + count
+    if deltas["last_speaker"] is not None:
+        state["last_speaker"] = deltas["last_speaker"]
+    return state
+
+
+def _silence_seconds(last_spoke_at: Optional[str], now: datetime) -> Optional[int]:
+    if not last_spoke_at:
+        return None
+    try:
+        spoke_at = _TZ_JAPAN.localize(datetime.strptime(last_spoke_at, _TIME_FORMAT))
+    except ValueError:
+        return None
+    return max(int((now - spoke_at).total_seconds()), 0)
+
+
+def summarize_participation(
+    state: Optional[Dict[str, Any]],
+    participants: Optional[List[str]] = None,
+    now: Optional[datetime] = None,
+) -> Dict[str, Any]:
+    """
+    保存した統計を発言者ごとの数値にする。
+
+    `participants` を渡すと、まだ発言していない参加者も発言回数 0 として含める。
+    """
+    state = state or empty_participation()
+    now = now or datetime.now(_TZ_JAPAN)
+    ordered = sorted(state["speakers"].values(), key=lambda row: row.get("first_seq", 0))
+    names = {key: row["name"] for key, row in state["speakers"].items()}
+    total_turns = sum(row["turns"] for row in ordered)
+    total_chars = sum(row["chars"] for row in ordered)
+
+    rows = []
+    for row in ordered:
+        rows.append({
+            "speaker": row["name"],
+            "turns": row["turns"],
+            "chars": row["chars"],
+            "turn_share": row["turns"] / total_turns if total_turns else 0.0,
+            "char_share": row["chars"] / total_chars if total_chars else 0.0,
+            "silence_seconds": _silence_seconds(row.get("last_spoke_at"), now),
+        })
+    spoken = set(names.values())
+    for participant in participants or []:
+        if participant not in spoken:
+            rows.append({
+                "speaker": participant,
+                "turns": 0,
+                "chars": 0,
+                "turn_share": 0.0,
+                "char_share": 0.0,
+                "silence_seconds": None,
+            })
+
+    transitions = {
+        names[source]: {
+            names[target]: count
+            for target, count in targets.items()
+            if count and target in names
+        }
+        for source, targets in state["transitions"].items()
+        if source in names
+    }
+    return {
+        "total_turns": total_turns,
+        "total_chars": total_chars,
+        "speakers": rows,
+        "transitions": {k: v for k, v in transitions.items() if v},
+    }
+
+
+def _silence_label(silence_seconds: Optional[float]) -> str:
+    if silence_seconds is None:
+        return "未発言"
+    minutes = silence_seconds / 60
+    lower = 0
+    for upper in _SILENCE_BUCKETS_MINUTES:
+        if minutes < upper:
+            return f"最後の発言から{upper}分未満" if lower == 0 else f"最後の発言から{lower}〜{upper}分"
+        lower = upper
+    return f"最後の発言から{lower}分以上"
+
+
+def participation_prompt_fields(summary: Dict[str, Any], max_transitions: int = 5) -> Dict[str, Any]:
+    """
+    プロンプトに入れる発言の統計（集計済みの数値）を返す。
+
+    参加者の関与度は発言履歴を読み直さず、この数値で判断させる。
+    """
+    if not summary["total_turns"]:
+        return {}
+    per_speaker = {}
+    for row in summary["speakers"]:
+        per_speaker[row["speaker"]] = (
+            f"発言{row['turns']}回（{row['turn_share']:.0%}）・{row['chars']}文字（{row['char_share']:.0%}）・"
+            + _silence_label(row["silence_seconds"])
+        )
+    pairs = sorted(
+        (
+            (count, source, target)
+            for source, targets in summary["transitions"].items()
+            for target, count in targets.items()
+            if source != target
+        ),
+        key=lambda item: (-item[0], item[1], item[2]),
+    )[:max_transitions]
+    return {
+        "発言の統計": per_speaker,
+        "発言の受け渡し": [f"{source}→{target} {count}回" for count, source, target in pairs],
+    }
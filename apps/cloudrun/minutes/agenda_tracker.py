@@ -0,0 +1,167 @@
+import re
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import pytz
+
+# 議事録のアジェンダの各項目に記録する時刻（speak_at と同じ形式）
+# - started_at: 項目が現在のアジェンダになった時刻（前の項目が完了した時刻）
+# - completed_at: update_minutes が完了にした時刻
+# 最初の項目には started_at を記録せず、会議の開始時刻から始まったとみなす。
+
+_TZ_JAPAN = pytz.timezone("Asia/Tokyo")
+_TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+def parse_meeting_time(date: str, time: str) -> datetime:
+    """会議の日付（YYYY-MM-DD）と時刻（HH:MM）をJSTの日時にする"""
+    return _TZ_JAPAN.localize(datetime.strptime(f"{date} {time}", "%Y-%m-%d %H:%M"))
+
+
+def _parse_timestamp(value: Optional[str]) -> Optional[datetime]:
+    if not value:
+        return None
+    try:
+        return _TZ_JAPAN.localize(datetime.strptime(value, _TIME_FORMAT))
+    except ValueError:
+        return None
+
+
+def _minutes_between(start: datetime, end: datetime) -> float:
+    return max((end - start).total_seconds() / 60, 0.0)
+
+
+def mark_agenda_completed(agenda: List[dict], completed_ids: List[str], now: str) -> bool:
+    """
+    `completed_ids` の項目を完了にし、完了した時刻と次の項目が始まった時刻を記録する。
+
+    変更があれば True を返す。
+    """
+    changed = False
+    for item in agenda:
+        if str(item["id"]) in completed_ids and not item.get("completed"):
+            item["completed"] = True
+            item["completed_at"] = now
+            changed = True
+            print(f"✅ [完了] アジェンダ ID: {item['id']} | {item.get('topic')}")
+    if changed:
+        for item in agenda:
+            if not item.get("completed"):
+                item.setdefault("started_at", now)
+                break
+    return changed
+
+
+def agenda_progress(
+    agenda: List[dict], start_at: datetime, end_at: datetime, now: Optional[datetime] = None
+) -> Dict[str, Any]:
+    """
+    アジェンダの進み具合をLLMを使わずに計算する。
+
+    現在のアジェンダは最初の未完了の項目で、`started_at` がなければ直前の項目の
+    `completed_at`、それもなければ会議の開始時刻から始まったとみなす。
+
+    Returns:
+        Dict[str, Any]:
+            - started: 会議が始まっているか
+            - active: 現在のアジェンダ（id, topic, duration, elapsed_minutes）。すべて完了していれば None
+            - completed: 完了した項目数
+            - unfinished: 未完了の項目数
+            - remaining_minutes: 会議の残り時間（分）
+            - remaining_planned_minutes: 未完了の項目の残りの予定時間の合計（分）
+    """
+    now = now or datetime.now(_TZ_JAPAN)
+    progress: Dict[str, Any] = {
+        "started": now >= start_at,
+        "active": None,
+        "completed": 0,
+        "unfinished": 0,
+        "remaining_minutes": _minutes_between(max(now, start_at), end_at),
+        "remaining_planned_minutes": 0.0,
+    }
+    previous_completed_at = None
+    for item in agenda:
+        duration = float(item.get("duration") or 0)
+        if item.get("completed"):
+            progress["completed"] += 1
+            previous_completed_at = _parse_timestamp(item.get("completed_at")) or previous_completed_at
+            continue
+        progress["unfinished"] += 1
+        if progress["active"] is None:
+            started = (
+                _parse_timestamp(item.get("started_at"))
+                or previous_completed_at
+                or start_at
+            )
+            elapsed = _minutes_between(started, now) if now > start_at else 0.0
+            progress["active"] = {
+                "id": item.get("id"),
+                "topic": item.get("topic"),
+                "duration": duration,
+                "elapsed_minutes": elapsed,
+            }
+            progress["remaining_planned_minutes"] += max(duration - elapsed, 0.0)
+        else:
+            progress["remaining_planned_minutes"] += duration
+    return progress
+
+
+def meeting_progress(
+    meeting_data: dict, agenda: List[dict], now: Optional[datetime] = None
+) -> Optional[Dict[str, Any]]:
+    """会議ドキュメントの開始・終了時刻から `agenda_progress` を計算する（時刻が不正なら None）"""
+    try:
+        start_at = parse_meeting_time(meeting_data["start_date"], meeting_data["start_time"])
+        end_at = parse_meeting_time(meeting_data["start_date"], meeting_data["end_time"])
+    except (KeyError, TypeError, ValueError):
+        return None
+    return agenda_progress(agenda, start_at, end_at, now)
+
+
+def progress_prompt_fields(progress: Dict[str, Any]) -> Dict[str, Any]:
+    """介入判定のプロンプトに入れるアジェンダの進み具合（計算済みの数値）を返す"""
+    active = progress["active"]
+    if active is None:
+        return {"アジェンダの進行": "すべてのアジェンダが完了"}
+    return {
+        "アジェンダの進行": {
+            "現在のアジェンダ": active["topic"],
+            "現在のアジェンダの経過時間": f"{active['elapsed_minutes']:.0f}分（予定{active['duration']:.0f}分）",
+            "会議の残り時間": f"{progress['remaining_minutes']:.0f}分",
+            "未完了のアジェンダ": f"{progress['unfinished']}件（残りの予定{progress['remaining_planned_minutes']:.0f}分）",
+        }
+    }
+
+
+# 議題の区切りを示す表現（これを含まない発言ではアジェンダの完了判定を行わない）
+AGENDA_CLOSING_CUES = re.compile(
+    r"次(の|は|に|へ)|移(り|ろう|る|って)|進(み|め|も|ん)|以上|終わ|おわ|完了|済み|決ま|決定|結論|"
+    r"まとめ|合意|締め|クローズ|ここまで|十分|問題な|異論|OK|ok|オッケー|了解"
+)
+
+
+def agenda_candidates(agenda: List[dict]) -> List[dict]:
+    """完了判定の対象（現在のアジェンダと次のアジェンダ）を返す。すべて完了していれば空"""
+    return [item for item in agenda if not item.get("completed")][:2]
+
+
+def _bigrams(text: str) -> set:
+    text = "".join(text.split())
+    return {text[i:i + 2] for i in range(len(text) - 1)}
+
+
+def may_close_agenda(message: str, candidates: List[dict]) -> bool:
+    """
+    発言がアジェンダの項目を完了させうるかを、LLMを使わずに判定する。
+
+    議題の区切りを示す表現を含むか、対象の項目の議題に触れている（議題の文字2-gramの
+    半分以上を含む）場合に True を返す。
+    """
+    if AGENDA_CLOSING_CUES.search(message):
+        return True
+    message_bigrams = _bigrams(message)
+    for item in candidates:
+        topic_bigrams = _bigrams(str(item.get("topic") or ""))
+        if topic_bigrams and len(topic_bigrams & message_bigrams) * 2 >= len(topic_bigrams):
+            return True
+    return False
@@ -3,6 +3,8 @@ class MinutesFields:
     AGENDA = "agenda"  # アジェンダのリスト
     DECISIONS = "decisions"  # 決定事項のリスト
     ACTION_PLAN = "action_plan"  # アクションプランのリスト
+    ROLLING_SUMMARY = "rolling_summary"  # 会議の要約（text, last_seq, updated_at）
+    VERSION = "version"  # スナップショットに取り込んだ最後の操作のID（操作ログ minutes_ops）
 
 
 class ActionPlanFields:
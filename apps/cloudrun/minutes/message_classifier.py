@@ -0,0 +1,269 @@
+"""
+議事録の抽出（決定事項・アクションプラン・アジェンダ）の前に、発言がどの抽出に関係しそうかを
+LLMを使わずに判定する分類器。
+
+- ルール: 日本語のキーワード・正規表現
+- モデル（任意）: 文字 n-gram のナイーブベイズ。ログに記録した発言と、そのときの抽出結果から学習する
+
+学習と評価（適合率・再現率）:
+
+    cd apps/cloudrun
+    python -m minutes.message_classifier train <ログ(JSONL)> <モデルの出力先(JSON)>
+    python -m minutes.message_classifier evaluate <ログ(JSONL)> [モデル(JSON)]
+"""
+
+import json
+import math
+import os
+import re
+import sys
+from threading import Lock
+from typing import Dict, Iterable, List, Optional, Set
+
+from minutes.agenda_tracker import AGENDA_CLOSING_CUES
+
+# 分類器で抽出を絞り込むか（false なら従来どおり短い発言以外はすべての抽出を行う）
+MESSAGE_CLASSIFIER_ENABLED = os.getenv("MESSAGE_CLASSIFIER_ENABLED", "true").lower() == "true"
+# 学習済みモデルのパス（指定した場合はルールとモデルのどちらかが該当すれば抽出する）
+MESSAGE_CLASSIFIER_MODEL_PATH = os.getenv("MESSAGE_CLASSIFIER_MODEL_PATH", "")
+# モデルで該当とみなす確率の下限
+MESSAGE_CLASSIFIER_THRESHOLD = float(os.getenv("MESSAGE_CLASSIFIER_THRESHOLD", 0.5))
+# 発言と抽出結果を学習用に記録するファイル（JSONL）。空なら記録しない
+MESSAGE_CLASSIFIER_LOG_PATH = os.getenv("MESSAGE_CLASSIFIER_LOG_PATH", "")
+# 分類結果にかかわらずすべての抽出を行い、分類の当たり外れだけを記録するか（再現率の計測用）
+MESSAGE_CLASSIFIER_SHADOW = os.getenv("MESSAGE_CLASSIFIER_SHADOW", "false").lower() == "true"
+
+# 分類のラベル（should_update_minutes の結果のキーと対応する）
+LABEL_DECISION = "decision"
+LABEL_ACTION = "action"
+LABEL_AGENDA = "agenda"
+LABELS = (LABEL_DECISION, LABEL_ACTION, LABEL_AGENDA)
+
+RULES = {
+    LABEL_DECISION: re.compile(
+        r"決定|決め|決ま|合意|結論|確定|採用|承認|却下|見送|方針|"
+        r"(それ|これ|その案|この案)で(いき|行き|いこ|行こ|進め|お願い|決|OK|ok|いい)|"
+        r"に(しま|しよ)う|とします|ことにし|で行きましょう|でいきましょう"
+    ),
+    LABEL_ACTION: re.compile(
+        r"お願い|担当|やります|やっておき|対応し(ます|ておき)|までに|期限|締め切|締切|宿題|タスク|"
+        r"(確認|調査|調べ|作成|準備|共有|連絡|送付|修正|検討)し?て?おき|"
+        r"(確認|調査|作成|準備|共有|連絡|送付|修正)します|送ります|作ります|"
+        r"来週|明日|明後日|今週中|月末|次回まで"
+    ),
+    LABEL_AGENDA: AGENDA_CLOSING_CUES,
+}
+
+
+def _ngrams(text: str, sizes=(1, 2, 3)) -> List[str]:
+    text = "".join(text.split())
+    return [text[i:i + n] for n in sizes for i in range(len(text) - n + 1)]
+
+
+class NaiveBayesClassifier:
+    """
+    ラベルごとに「該当する / しない」を判定する文字 n-gram の多項ナイーブベイズ。
+
+    1つの発言が複数のラベルに該当しうるため、ラベルごとに独立した2クラス分類器を持つ。
+    """
+
+    def __init__(self, counts: Optional[Dict[str, list]] = None, docs: Optional[Dict[str, list]] = None):
+        # counts[label] = [該当しない発言の n-gram 出現回数, 該当する発言の n-gram 出現回数]
+        self.counts: Dict[str, List[Dict[str, int]]] = counts or {}
+        # docs[label] = [該当しない発言数, 該当する発言数]
+        self.docs: Dict[str, List[int]] = docs or {}
+        self._totals = {
+            label: [sum(c.values()) for c in class_counts] for label, class_counts in self.counts.items()
+        }
+        self._vocab = {
+            label: len(set(class_counts[0]) | set(class_counts[1]))
+            for label, class_counts in self.counts.items()
+        }
+
+    @classmethod
+    def train(cls, records: Iterable[dict]) -> "NaiveBayesClassifier":
+        """`outcomes` が記録されたラベルだけを使って学習する（抽出しなかったラベルは不明として扱う）"""
+        counts: Dict[str, List[Dict[str, int]]] = {}
+        docs: Dict[str, List[int]] = {}
+        for record in records:
+            grams = _ngrams(record["message"])
+            for label, outcome in (record.get("outcomes") or {}).items():
+                if outcome is None:
+                    continue
+                class_counts = counts.setdefault(label, [{}, {}])[int(bool(outcome))]
+                for gram in grams:
+                    class_counts[gram] = class_counts.get(gram, 0) + 1
+                docs.setdefault(label, [0, 0])[int(bool(outcome))] += 1
+        return cls(counts, docs)
+
+    def probability(self, message: str, label: str) -> Optional[float]:
+        """発言がラベルに該当する確率。学習データがなければ None"""
+        docs = self.docs.get(label)
+        if not docs or not all(docs):
+            return None
+        grams = _ngrams(message)
+        vocab = self._vocab[label] + 1
+        scores = []
+        for c in (0, 1):
+            counts = self.counts[label][c]
+            total = self._totals[label][c]
+            score = math.log(docs[c] / sum(docs))
+            for gram in grams:
+                score += math.log((counts.get(gram, 0) + 1) / (total + vocab))
+            scores.append(score)
+        # log-sum-exp で正規化する
+        top = max(scores)
+        return math.exp(scores[1] - top) / sum(math.exp(s - top) for s in scores)
+
+    def predict(self, message: str, threshold: float = MESSAGE_CLASSIFIER_THRESHOLD) -> Set[str]:
+        labels = set()
+        for label in self.counts:
+            probability = self.probability(message, label)
+            if probability is not None and probability >= threshold:
+                labels.add(label)
+        return labels
+
+    def to_dict(self) -> dict:
+        return {"counts": self.counts, "docs": self.docs}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "NaiveBayesClassifier":
+        return cls(data["counts"], data["docs"])
+
+
+def load_model(path: str) -> Optional[NaiveBayesClassifier]:
+    if not path or not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        return NaiveBayesClassifier.from_dict(json.load(f))
+
+
+class MessageClassifier:
+    """ルールと（あれば）学習済みモデルのどちらかが該当したラベルを返す"""
+
+    def __init__(self, model: Optional[NaiveBayesClassifier] = None):
+        self.model = model
+
+    def classify(self, message: str) -> Set[str]:
+        labels = {label for label, pattern in RULES.items() if pattern.search(message)}
+        if self.model is not None:
+            labels |= self.model.predict(message)
+        return labels
+
+
+class _ClassifierStats:
+    def __init__(self):
+        self._lock = Lock()
+        self.messages = 0
+        self.extractor_calls_saved = 0
+        # ラベルごとの当たり外れ（抽出を行ったラベルについてのみ数えられる）
+        self.confusion = {label: {"tp": 0, "fp": 0, "fn": 0} for label in LABELS}
+
+    def record(self, predicted: Set[str], skipped: int, outcomes: Dict[str, Optional[bool]]):
+        with self._lock:
+            self.messages += 1
+            self.extractor_calls_saved += skipped
+            for label, outcome in outcomes.items():
+                if outcome is None or label not in self.confusion:
+                    continue
+                if label in predicted:
+                    self.confusion[label]["tp" if outcome else "fp"] += 1
+                elif outcome:
+                    self.confusion[label]["fn"] += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "enabled": MESSAGE_CLASSIFIER_ENABLED,
+                "shadow": MESSAGE_CLASSIFIER_SHADOW,
+                "messages": self.messages,
+                "extractor_calls_saved": self.extractor_calls_saved,
+                "labels": {
+                    label: {**counts, **_precision_recall(counts)}
+                    for label, counts in self.confusion.items()
+                },
+            }
+
+
+def _precision_recall(counts: Dict[str, int]) -> Dict[str, Optional[float]]:
+    predicted = counts["tp"] + counts["fp"]
+    actual = counts["tp"] + counts["fn"]
+    return {
+        "precision": counts["tp"] / predicted if predicted else None,
+        "recall": counts["tp"] / actual if actual else None,
+    }
+
+
+message_classifier = MessageClassifier(load_model(MESSAGE_CLASSIFIER_MODEL_PATH))
+_stats = _ClassifierStats()
+_log_lock = Lock()
+
+
+def extraction_outcomes(updates: dict, ran: Iterable[str]) -> Dict[str, Optional[bool]]:
+    """
+    抽出結果から、発言が各ラベルに該当したか（議事録の変更につながる判定が出たか）を返す。
+
+    抽出を行わなかったラベルは None（不明）。
+    """
+    decisions = updates.get("decisions_update") or {}
+    actions = updates.get("actions_update") or {}
+    agenda = updates.get("agenda_update") or {}
+    outcomes = {
+        LABEL_DECISION: any(decisions.get(k) for k in ("add_decision", "update_decision", "delete_decision")),
+        LABEL_ACTION: any(actions.get(k) for k in ("add_action_plan", "update_action_plan", "delete_action_plan")),
+        LABEL_AGENDA: bool(agenda.get("completed_agenda_ids")),
+    }
+    ran = set(ran)
+    return {label: outcome if label in ran else None for label, outcome in outcomes.items()}
+
+
+def record_classification(
+    message: str, predicted: Set[str], skipped: int, outcomes: Dict[str, Optional[bool]]
+):
+    """分類結果と抽出結果を集計し、ログのパスが設定されていれば学習用に記録する"""
+    _stats.record(predicted, skipped, outcomes)
+    if not MESSAGE_CLASSIFIER_LOG_PATH:
+        return
+    record = {"message": message, "predicted": sorted(predicted), "outcomes": outcomes}
+    try:
+        with _log_lock, open(MESSAGE_CLASSIFIER_LOG_PATH, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+    except OSError as e:
+        print(f"Error writing classifier log: {e}")
+
+
+def message_classifier_stats() -> dict:
+    return _stats.snapshot()
+
+
+def evaluate(classifier: MessageClassifier, records: Iterable[dict]) -> Dict[str, dict]:
+    """記録された抽出結果を正解として、ラベルごとの適合率・再現率を計算する"""
+    stats = _ClassifierStats()
+    for record in records:
+        stats.record(classifier.classify(record["message"]), 0, record.get("outcomes") or {})
+    return stats.snapshot()["labels"]
+
+
+def _read_records(path: str) -> List[dict]:
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def main(argv: List[str]):
+    if len(argv) >= 3 and argv[0] == "train":
+        records = _read_records(argv[1])
+        model = NaiveBayesClassifier.train(records)
+        with open(argv[2], "w", encoding="utf-8") as f:
+            json.dump(model.to_dict(), f, ensure_ascii=False)
+        print(f"学習した発言数: {len(records)} → {argv[2]}")
+        print(json.dumps(evaluate(MessageClassifier(model), records), ensure_ascii=False, indent=2))
+    elif len(argv) >= 2 and argv[0] == "evaluate":
+        model = load_model(argv[2]) if len(argv) >= 3 else None
+        results = evaluate(MessageClassifier(model), _read_records(argv[1]))
+        print(json.dumps(results, ensure_ascii=False, indent=2))
+    else:
+        print(__doc__)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -1,65 +1,254 @@
-from typing import List
+import os
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from threading import Lock
+from typing import Callable, Dict, List, Optional, Tuple
 from function_calling.update_minutes import (
     update_action_plan,
     update_agenda,
     update_decision,
+    update_minutes_combined,
 )
 from message.message import get_message_history
-from config import Config
+from minutes.agenda_tracker import agenda_candidates, may_close_agenda
 from minutes.constants import MinutesFields
+from minutes.message_classifier import (
+    LABEL_ACTION,
+    LABEL_AGENDA,
+    LABEL_DECISION,
+    LABELS,
+    MESSAGE_CLASSIFIER_ENABLED,
+    MESSAGE_CLASSIFIER_SHADOW,
+    extraction_outcomes,
+    message_classifier,
+    record_classification,
+)
+from minutes.minutes_log import (
+    MINUTES_SNAPSHOT_INTERVAL_OPS,
+    append_ops,
+    compact_minutes,
+    read_minutes,
+    reset_minutes,
+)
+from minutes.minutes_ops import diff_ops
+from minutes.minutes_updater import apply_minutes_updates
+from minutes.similarity_index import get_similarity_index
+from prompt.budget import PromptBuilder
+from prompt.history import comment_lines
 from meeting.meeting import AgendaItem
-from google.cloud import firestore
-from uuid import uuid4
 
-# 更新対象外にする文字列数
+# 更新対象外にする文字列数（MESSAGE_CLASSIFIER_ENABLED が false の場合）
 MIN_MESSAGE_LENGTH = 10
 
-db_client = Config.get_db_client()
+# 議事録の抽出（決定事項・アクションプラン・アジェンダ）を並列に実行するか
+MINUTES_EXTRACTION_CONCURRENT = (
+    os.getenv("MINUTES_EXTRACTION_CONCURRENT", "true").lower() == "true"
+)
+# 議事録の抽出方式
+# - separate: 決定事項・アクションプラン・アジェンダを個別のLLM呼び出しで判定
+# - combined: 3つの判定を1回のLLM呼び出しにまとめる
+MINUTES_EXTRACTION_MODE = os.getenv("MINUTES_EXTRACTION_MODE", "separate")
+# 抽出1件あたりのタイムアウト（秒）。スレッドの空きを待つ時間は含めず、実行が始まってから数える。
+# 超過した抽出の結果は捨て、回数を extraction_stats に記録する
+MINUTES_EXTRACTION_TIMEOUT_SECONDS = float(
+    os.getenv("MINUTES_EXTRACTION_TIMEOUT_SECONDS", 20)
+)
+# 抽出に使うスレッド数の上限（プロセス全体で共有）。既定はパイプラインのワーカー数 × 抽出の種類数で、
+# 同時に処理されるジョブの抽出が空きを待たずに実行される
+MINUTES_EXTRACTION_MAX_WORKERS = int(
+    os.getenv(
+        "MINUTES_EXTRACTION_MAX_WORKERS",
+        int(os.getenv("PIPELINE_WORKERS", 4)) * len(LABELS),
+    )
+)
+
+_extraction_executor = ThreadPoolExecutor(
+    max_workers=MINUTES_EXTRACTION_MAX_WORKERS,
+    thread_name_prefix="minutes-extraction",
+)
+
+# タイムアウトした抽出の回数（結果のキーごと）
+_extraction_timeouts: Dict[str, int] = {}
+_extraction_timeouts_lock = Lock()
+
+# アジェンダの完了判定の結果の種類
+AGENDA_CHECKED = "checked"  # LLMで判定した
+AGENDA_SKIPPED_ALL_COMPLETED = "skipped_all_completed"  # すべて完了済みのため省略
+AGENDA_SKIPPED_NO_CUE = "skipped_no_cue"  # 議題の区切りを示す発言ではないため省略
+
+# 完了判定の回数を記録する会議数の上限（超えたら最も古い会議から消す）
+AGENDA_CHECK_STATS_MAX_MEETINGS = 256
+_agenda_check_stats: "OrderedDict[str, Dict[str, int]]" = OrderedDict()
+_agenda_check_lock = Lock()
+
+
+def _record_agenda_check(meeting_id: Optional[str], outcome: str):
+    if meeting_id is None:
+        return
+    with _agenda_check_lock:
+        counts = _agenda_check_stats.pop(meeting_id, None) or {
+            AGENDA_CHECKED: 0,
+            AGENDA_SKIPPED_ALL_COMPLETED: 0,
+            AGENDA_SKIPPED_NO_CUE: 0,
+        }
+        counts[outcome] += 1
+        _agenda_check_stats[meeting_id] = counts
+        while len(_agenda_check_stats) > AGENDA_CHECK_STATS_MAX_MEETINGS:
+            _agenda_check_stats.popitem(last=False)
+
+
+def agenda_check_stats() -> Dict[str, dict]:
+    """会議ごとの、アジェンダの完了判定をLLMで行った回数と省略した回数"""
+    with _agenda_check_lock:
+        return {
+            meeting_id: {
+                **counts,
+                "llm_calls_saved": counts[AGENDA_SKIPPED_ALL_COMPLETED] + counts[AGENDA_SKIPPED_NO_CUE],
+            }
+            for meeting_id, counts in _agenda_check_stats.items()
+        }
+
+
+def _agenda_check(latest_message: dict, candidates: List[dict], classified: bool = False) -> str:
+    """
+    アジェンダの完了判定をLLMで行うかを決める（対象は現在と次のアジェンダだけ）
+
+    `classified` は分類器が発言をアジェンダに該当すると判定したか。
+    """
+    if not candidates:
+        return AGENDA_SKIPPED_ALL_COMPLETED
+    if not classified and not may_close_agenda(latest_message.get("message", ""), candidates):
+        return AGENDA_SKIPPED_NO_CUE
+    return AGENDA_CHECKED
+
+
+def _restrict_agenda_update(agenda_update: dict, candidates: List[dict]) -> dict:
+    """判定対象外の項目を完了にしないよう、結果を現在と次のアジェンダに絞る"""
+    candidate_ids = {str(item.get("id")) for item in candidates}
+    completed_ids = [
+        agenda_id
+        for agenda_id in agenda_update.get("completed_agenda_ids") or []
+        if str(agenda_id) in candidate_ids
+    ]
+    return {**agenda_update, "completed_agenda_ids": completed_ids} if completed_ids else {}
 
 
 def get_existing_minutes(meeting_id: str) -> dict:
-    doc_ref = (
-        db_client.collection(Config.FIRESTORE_MEETING_COLLECTION)
-        .document(meeting_id)
-        .collection(Config.FIRESTORE_MINUTES_COLLECTION)
-        .document(Config.FIRESTORE_ALL_MINUTES_DOCUMENT)
-    )
-    doc = doc_ref.get()
-    return (
-        doc.to_dict()
-        if doc.exists
-        else {
-            MinutesFields.AGENDA: [],
-            MinutesFields.DECISIONS: [],
-            MinutesFields.ACTION_PLAN: [],
+    """スナップショットに、まだ取り込んでいない操作を適用した現在の議事録を返す"""
+    minutes, _, _ = read_minutes(meeting_id)
+    return minutes
+
+
+def _timed_extract(
+    extractor: Callable[[str], dict], message: str
+) -> Tuple[dict, float]:
+    """抽出関数を実行し、結果と所要時間（秒）を返す。失敗時は {} を返す"""
+    started = time.perf_counter()
+    try:
+        result = extractor(message)
+    except Exception as e:
+        print(f"Error in {extractor.__name__}: {e}")
+        result = {}
+    return result, time.perf_counter() - started
+
+
+def _record_extraction_timeout(key: str):
+    with _extraction_timeouts_lock:
+        _extraction_timeouts[key] = _extraction_timeouts.get(key, 0) + 1
+
+
+def extraction_stats() -> dict:
+    """抽出のスレッド数と、タイムアウトした抽出の回数"""
+    with _extraction_timeouts_lock:
+        return {
+            "max_workers": MINUTES_EXTRACTION_MAX_WORKERS,
+            "timeout_seconds": MINUTES_EXTRACTION_TIMEOUT_SECONDS,
+            "timeouts": dict(_extraction_timeouts),
         }
-    )
 
 
-def should_update_minutes(message_history: list, existing_minutes: dict) -> dict:
+def run_extractors(tasks: Dict[str, Tuple[Callable[[str], dict], str]]) -> dict:
+    """
+    議事録の抽出関数をまとめて実行する。
+
+    - `tasks` は {結果のキー: (抽出関数, プロンプト)} の辞書。
+    - 並列モードでは共有スレッドプールで同時に実行する。タイムアウトは抽出の実行が
+      始まってから数え、タイムアウトした抽出は結果を {} にして `timed_out` にキーを入れる
+      （「変更なし」の判定とは区別する）。失敗した抽出は {} として返す。
+      どちらも他の抽出の結果には影響しない。
+    - 各抽出の所要時間（秒）を `timings` に格納する。
+    """
+    results = {}
+    timings = {}
+    timed_out = []
+
+    if not MINUTES_EXTRACTION_CONCURRENT:
+        for key, (extractor, message) in tasks.items():
+            results[key], timings[key] = _timed_extract(extractor, message)
+        results["timings"] = timings
+        results["timed_out"] = timed_out
+        return results
+
+    started = time.perf_counter()
+    started_at: Dict[str, float] = {}
+
+    def run(key: str, extractor: Callable[[str], dict], message: str) -> Tuple[dict, float]:
+        started_at[key] = time.perf_counter()
+        return _timed_extract(extractor, message)
+
+    futures = {
+        key: _extraction_executor.submit(run, key, extractor, message)
+        for key, (extractor, message) in tasks.items()
+    }
+    for key, future in futures.items():
+        while True:
+            task_started = started_at.get(key)
+            remaining = (
+                MINUTES_EXTRACTION_TIMEOUT_SECONDS
+                if task_started is None
+                else task_started + MINUTES_EXTRACTION_TIMEOUT_SECONDS - time.perf_counter()
+            )
+            try:
+                results[key], timings[key] = future.result(timeout=max(0.0, remaining))
+                break
+            except FutureTimeoutError:
+                if task_started is None:
+                    # スレッドの空きを待っていた（待ち時間はタイムアウトに含めない）
+                    continue
+                print(
+                    f"⏱ [タイムアウト] {key} ({MINUTES_EXTRACTION_TIMEOUT_SECONDS}秒)。抽出結果を破棄します"
+                )
+                _record_extraction_timeout(key)
+                timed_out.append(key)
+                results[key], timings[key] = {}, time.perf_counter() - started
+                break
+    results["timings"] = timings
+    results["timed_out"] = timed_out
+    return results
+
+
+def should_update_minutes(
+    message_history: list, existing_minutes: dict, meeting_id: Optional[str] = None
+) -> dict:
 
     latest_message = message_history[-1]  # 最新の発言
-    print(latest_message.get("message"))
-    if len(latest_message.get("message", "")) <= MIN_MESSAGE_LENGTH:
-        print(f"発言が短いので更新対象外")
-        return {}
+    message_text = latest_message.get("message", "")
+    print(message_text)
+    if MESSAGE_CLASSIFIER_ENABLED:
+        # 発言がどの抽出に関係しそうかをLLMを使わずに判定する（シャドーモードでは判定だけ記録してすべて抽出する）
+        predicted = message_classifier.classify(message_text)
+        routed = set(LABELS) if MESSAGE_CLASSIFIER_SHADOW else predicted
+        print(f"🏷️ [分類] {sorted(predicted) or 'none'}")
+    else:
+        if len(message_text) <= MIN_MESSAGE_LENGTH:
+            print(f"発言が短いので更新対象外")
+            return {}
+        predicted = routed = set(LABELS)
     past_messages = message_history[:-1]  # それ以前の履歴
 
-    formatted_history = (
-        "\n".join(
-            [
-                f"{msg.get('speak_at', '不明な時間')} - {msg.get('speaker', '不明な発言者')}: {msg.get('message', '発言なし')}"
-                for msg in past_messages
-            ]
-        )
-        or "なし"
-    )
-
-    latest_message_text = (
-        f"{latest_message.get('speak_at', '不明な時間')} - {latest_message.get('speaker', '不明な発言者')}: {latest_message.get('message', '発言なし')}"
-        if latest_message
-        else "なし"
-    )
+    history_lines = list(comment_lines(past_messages))
+    latest_message_text = next(comment_lines([latest_message]), "なし")
 
     existing_decisions = (
         "\n".join(
@@ -81,231 +270,143 @@ def should_update_minutes(message_history: list, existing_minutes: dict) -> dict
         or "なし"
     )
 
+    # アジェンダの完了判定は現在と次のアジェンダだけを対象にし、判定が不要ならLLMを呼ばない
+    candidates = agenda_candidates(existing_minutes.get(MinutesFields.AGENDA, []))
+    agenda_check = _agenda_check(
+        latest_message, candidates, MESSAGE_CLASSIFIER_ENABLED and LABEL_AGENDA in routed
+    )
+    _record_agenda_check(meeting_id, agenda_check)
+    check_agenda = agenda_check == AGENDA_CHECKED
+    if not check_agenda:
+        print(f"⏭️ [アジェンダ] 完了判定を省略 ({agenda_check})")
+
     existing_agenda = (
         "\n".join(
             [
-                f"- {a.get('title', '不明なアジェンダ')} (ID: {a.get('id', '不明')}, 完了: {a.get('completed', '不明')})"
-                for a in existing_minutes.get(MinutesFields.AGENDA, [])
+                f"- {a.get('topic', '不明なアジェンダ')} (ID: {a.get('id', '不明')}, {label})"
+                for label, a in zip(("現在のアジェンダ", "次のアジェンダ"), candidates)
             ]
         )
         or "なし"
     )
 
-    full_action_message = f"""
-    ## 最新の発言:
-    {latest_message_text}
-
-    ## 過去の会話履歴:
-    {formatted_history}
-
-    ## 既存のアクションプラン:
-    {existing_actions}
-    """
+    def build_prompt(*existing_sections: Tuple[str, str], instruction: str = "") -> str:
+        """最新の発言・予算に収めた会話履歴・既存の議事録の順にプロンプトを作る"""
+        builder = (
+            PromptBuilder("minutes")
+            .add("最新の発言", latest_message_text, heading="## 最新の発言:\n")
+            .add_history("過去の会話履歴", history_lines, heading="## 過去の会話履歴:\n")
+        )
+        for name, text in existing_sections:
+            builder.add(name, text, heading=f"## {name}:\n")
+        if instruction:
+            builder.add("指示", instruction)
+        return builder.build()
+
+    # 分類器で該当したラベル（とアジェンダの完了判定が必要な場合）の抽出だけを行う
+    extractions = {
+        LABEL_DECISION: ("decisions_update", update_decision, "決定事項", ("既存の決定事項", existing_decisions)),
+        LABEL_ACTION: ("actions_update", update_action_plan, "アクションプラン", ("既存のアクションプラン", existing_actions)),
+        LABEL_AGENDA: ("agenda_update", update_agenda, "アジェンダ完了", ("判定対象のアジェンダ", existing_agenda)),
+    }
+    run_labels = [
+        label
+        for label in LABELS
+        if (check_agenda if label == LABEL_AGENDA else label in routed)
+    ]
+    # 分類器で省略した抽出の数（アジェンダの完了判定の省略は _record_agenda_check で数える）
+    skipped = sum(1 for label in LABELS if label != LABEL_AGENDA and label not in run_labels)
+    if not run_labels:
+        print("⏭️ [議事録] 該当する抽出がないため更新対象外")
+        if MESSAGE_CLASSIFIER_ENABLED:
+            record_classification(message_text, predicted, skipped, {})
+        return {}
 
-    full_decision_message = f"""
-    ## 最新の発言:
-    {latest_message_text}
+    if MINUTES_EXTRACTION_MODE == "combined":
+        names = "・".join(extractions[label][2] for label in run_labels)
+        full_message = build_prompt(
+            *(extractions[label][3] for label in run_labels),
+            instruction=f"{names}のそれぞれについて、対応する関数を呼び出してください。",
+        )
+        results = run_extractors({"combined": (update_minutes_combined, full_message)})
+        updates = {**results["combined"], "timings": results["timings"]}
+        timed_out_labels = run_labels if results["timed_out"] else []
+    else:
+        updates = run_extractors(
+            {
+                extractions[label][0]: (extractions[label][1], build_prompt(extractions[label][3]))
+                for label in run_labels
+            }
+        )
+        timed_out_labels = [
+            label for label in run_labels if extractions[label][0] in updates["timed_out"]
+        ]
+    for label in LABELS:
+        if label not in run_labels:
+            updates[extractions[label][0]] = {}
+    if check_agenda:
+        updates["agenda_update"] = _restrict_agenda_update(updates.get("agenda_update") or {}, candidates)
+    if MESSAGE_CLASSIFIER_ENABLED:
+        # タイムアウトした抽出は「該当しなかった」ではなく不明として記録する
+        record_classification(
+            message_text,
+            predicted,
+            skipped,
+            extraction_outcomes(updates, [label for label in run_labels if label not in timed_out_labels]),
+        )
+    print(
+        "⏱ [抽出時間] "
+        + ", ".join(f"{k}: {v:.2f}s" for k, v in updates["timings"].items())
+    )
+    return updates
 
-    ## 過去の会話履歴:
-    {formatted_history}
 
-    ## 既存の決定事項:
-    {existing_decisions}
+def update_minutes(meeting_id: str) -> Tuple[dict, dict]:
     """
+    最新の発言から議事録を更新する。
 
-    full_agenda_message = f"""
-    ## 最新の発言:
-    {latest_message_text}
-
-    ## 過去の会話履歴:
-    {formatted_history}
+    変更はメモリ上でまとめて計算し、変更した項目ごとの操作（追加・更新・削除・完了）を
+    操作ログに1回の書き込みで追記する（変更がなければ書き込まない）。配列全体を書き換えないため、
+    同時に処理された発言の変更も失われない。取り込んでいない操作が
+    MINUTES_SNAPSHOT_INTERVAL_OPS 件以上になったらスナップショット（all_minutes）を作り直す。
 
-    ## 既存のアジェンダ:
-    {existing_agenda}
+    Returns:
+        Tuple[dict, dict]: (更新後の議事録, このメッセージで発生したFirestoreの読み取り・書き込み回数)
+            回数は課金されるドキュメント数で、スナップショットの作り直しを含む。
+            更新後の議事録は、同じジョブの介入判定で読み直さずに使う。
     """
+    io_counts = {"reads": 0, "writes": 0}
+    message_history = get_message_history(meeting_id, 10, io_counts=io_counts)
+    existing_minutes, _, pending_ops = read_minutes(meeting_id, io_counts)
 
-    return {
-        "decisions_update": update_decision(full_decision_message),
-        "actions_update": update_action_plan(full_action_message),
-        "agenda_update": update_agenda(full_agenda_message),
-    }
-
-
-def update_minutes(meeting_id: str):
-    message_history = get_message_history(meeting_id, 10)
-    existing_minutes = get_existing_minutes(meeting_id)
     # 決定事項とアクションプランの更新情報を取得
-    updates = should_update_minutes(message_history, existing_minutes)
-
-    action_decisions = updates.get("decisions_update", {})
-    action_actions = updates.get("actions_update", {})
-    action_agenda = updates.get("agenda_update", {})
-
-    doc_ref = (
-        db_client.collection(Config.FIRESTORE_MEETING_COLLECTION)
-        .document(meeting_id)
-        .collection(Config.FIRESTORE_MINUTES_COLLECTION)
-        .document(Config.FIRESTORE_ALL_MINUTES_DOCUMENT)
+    updates = should_update_minutes(message_history, existing_minutes, meeting_id)
+    new_minutes, changed_fields = apply_minutes_updates(
+        existing_minutes, updates, index=get_similarity_index(meeting_id)
     )
 
-    if not doc_ref.get().exists:
-        doc_ref.set(
-            {
-                MinutesFields.AGENDA: [],
-                MinutesFields.DECISIONS: [],
-                MinutesFields.ACTION_PLAN: [],
-            }
-        )
-
-    # --- 決定事項の追加 ---
-    if action_decisions.get("add_decision"):
-        add_decision_text = action_decisions.get("add_decision_text")
-        if add_decision_text:
-            existing_decisions = existing_minutes.get(MinutesFields.DECISIONS, [])
-
-            if any(d["text"] == add_decision_text for d in existing_decisions):
-                print(f"⚠️ [スキップ] 同じ決定事項が既に存在: {add_decision_text}")
-            else:
-                new_decision = {
-                    "id": f"decision_{uuid4().hex}",
-                    "text": add_decision_text,
-                }
-                print(f"✅ [追加] 新しい決定事項: {new_decision}")
-                doc_ref.update(
-                    {MinutesFields.DECISIONS: firestore.ArrayUnion([new_decision])}
-                )
+    ops = diff_ops(existing_minutes, new_minutes) if changed_fields else []
+    if ops:
+        append_ops(meeting_id, ops)
+        io_counts["writes"] += len(ops)
+        pending_ops += len(ops)
 
-    # --- 決定事項の更新 ---
-    if action_decisions.get("update_decision"):
-        target_id = action_decisions["decision_id"]
-        new_decision_text = action_decisions.get("new_decision_text")
-        if new_decision_text:
-            print(f"🛠 [更新開始] 決定事項 ID: {target_id}")
-            decisions = existing_minutes.get(MinutesFields.DECISIONS, [])
-            for decision in decisions:
-                if decision["id"] == target_id:
-                    if decision["txet"] == new_decision_text:
-                        break
-                    old_text = decision["text"]
-                    decision["text"] = new_decision_text
-                    print(
-                        f"🔄 [更新完了] ID: {target_id} | 旧: '{old_text}' → 新: '{decision['text']}'"
-                    )
-                    break
-            else:
-                print(
-                    f"❌ [エラー] 更新対象の決定事項 (ID: {target_id}) が見つかりません"
-                )
-            doc_ref.update({MinutesFields.DECISIONS: decisions})
-
-    # --- 決定事項の削除 ---
-    if action_decisions.get("delete_decision"):
-        decision_id_to_delete = action_decisions.get("decision_id_to_delete")
-        decisions_before = existing_minutes.get(MinutesFields.DECISIONS, [])
-        decisions = [d for d in decisions_before if d["id"] != decision_id_to_delete]
-        if len(decisions_before) == len(decisions):
-            print(
-                f"❌ [エラー] 削除対象の決定事項 (ID: {decision_id_to_delete}) が見つかりません"
-            )
-        else:
-            print(f"✅ [削除完了] 決定事項 ID: {decision_id_to_delete}")
-        doc_ref.update({MinutesFields.DECISIONS: decisions})
-
-    ### アクションプランの処理 ###
-    # --- アクションプランの追加 ---
-    if action_actions.get("add_action_plan"):
-        new_action_text = action_actions.get("add_action_plan_text")
-        if new_action_text:
-            existing_actions = existing_minutes.get(MinutesFields.ACTION_PLAN, [])
-            if any(a["task"] == new_action_text for a in existing_actions):
-                print(f"⚠️ [スキップ] 同じアクションプランが既に存在: {new_action_text}")
-            else:
-                new_action = {
-                    "id": f"action_{uuid4().hex}",
-                    "task": new_action_text,
-                    "assigned_to": action_actions.get("add_assigned_to", "未設定"),
-                    "due_date": action_actions.get("add_due_date", "未設定"),
-                }
-                print(f"✅ [追加] 新しいアクションプラン: {new_action}")
-                doc_ref.update(
-                    {MinutesFields.ACTION_PLAN: firestore.ArrayUnion([new_action])}
-                )
+    if pending_ops and pending_ops >= MINUTES_SNAPSHOT_INTERVAL_OPS:
+        compacted = compact_minutes(meeting_id, io_counts)
+        print(f"🗜️ [議事録] スナップショットに操作を{compacted}件取り込み")
 
-    # --- アクションプランの更新 ---
-    if action_actions.get("update_action_plan"):
-        target_action_id = action_actions["action_id"]
-        new_action_text = action_actions.get("new_action_text")
-        if new_action_text:
-            print(f"🛠 [更新開始] アクションプラン ID: {target_action_id}")
-            actions = existing_minutes.get(MinutesFields.ACTION_PLAN, [])
-            for action in actions:
-                if action["id"] == target_action_id:
-                    if action["task"] == new_decision_text:
-                        break
-                    old_action = action.copy()  # 旧値を記録
-                    action.update(
-                        {
-                            "task": new_action_text,
-                            "assigned_to": action_actions.get(
-                                "new_assigned_to", action["assigned_to"]
-                            ),
-                            "due_date": action_actions.get(
-                                "new_due_date", action["due_date"]
-                            ),
-                        }
-                    )
-                    print(
-                        f"🔄 [更新完了] ID: {target_action_id} | 旧: {old_action} → 新: {action}"
-                    )
-                    break
-            else:
-                print(
-                    f"❌ [エラー] 更新対象のアクションプラン (ID: {target_action_id}) が見つかりません"
-                )
-            doc_ref.update({MinutesFields.ACTION_PLAN: actions})
-
-    # --- アクションプランの削除 ---
-    if action_actions.get("delete_action_plan"):
-        action_id_to_delete = action_actions.get("action_id_to_delete")
-        actions_before = existing_minutes.get(MinutesFields.ACTION_PLAN, [])
-        actions = [a for a in actions_before if a["id"] != action_id_to_delete]
-        if len(actions_before) == len(actions):
-            print(
-                f"❌ [エラー] 削除対象のアクションプラン (ID: {action_id_to_delete}) が見つかりません"
-            )
-        else:
-            print(f"✅ [削除完了] アクションプラン ID: {action_id_to_delete}")
-        doc_ref.update({MinutesFields.ACTION_PLAN: actions})
-
-    ### **アジェンダの完了処理** ###
-    if action_agenda.get("completed_agenda_ids"):
-        completed_agenda_ids = action_agenda["completed_agenda_ids"]
-        agendas = existing_minutes.get(MinutesFields.AGENDA, [])
-
-        updated = False
-        for agenda in agendas:
-            if str(agenda["id"]) in completed_agenda_ids and not agenda["completed"]:
-                agenda["completed"] = True
-                updated = True
-                print(
-                    f"✅ [完了] アジェンダ ID: {agenda['id']} | {agenda.get('topic')}"
-                )
-
-        if updated:
-            doc_ref.update({MinutesFields.AGENDA: agendas})
+    print(
+        f"📝 [議事録] reads={io_counts['reads']}, writes={io_counts['writes']}, "
+        f"ops={[(op['op'], op['target']) for op in ops]}"
+    )
+    return new_minutes, io_counts
 
 
 def set_agenda_in_minutes(meeting_id: str, agenda: List[AgendaItem]):
     """アジェンダを議事録DBに書き込む"""
 
-    doc_ref = (
-        db_client.collection(Config.FIRESTORE_MEETING_COLLECTION)
-        .document(meeting_id)
-        .collection(Config.FIRESTORE_MINUTES_COLLECTION)
-        .document(Config.FIRESTORE_ALL_MINUTES_DOCUMENT)
-    )
-
-    doc_ref.set(
+    reset_minutes(
+        meeting_id,
         {
             MinutesFields.AGENDA: [
                 {"id": ind + 1, "completed": False, **ele}
@@ -313,5 +414,5 @@ def set_agenda_in_minutes(meeting_id: str, agenda: List[AgendaItem]):
             ],
             MinutesFields.DECISIONS: [],
             MinutesFields.ACTION_PLAN: [],
-        }
+        },
     )
@@ -0,0 +1,166 @@
+import os
+from typing import List, Optional, Tuple
+
+from google.api_core.exceptions import Conflict, FailedPrecondition
+from google.cloud import firestore
+
+from config import Config
+from minutes.constants import MinutesFields
+from minutes.minutes_ops import TARGETS, apply_ops, empty_minutes
+from utils import count_io
+
+# 議事録の変更は操作ログ（meetings/<id>/minutes_ops）に追記し、all_minutes は
+# 「ある時点までの操作を適用したスナップショット」として扱う。
+# - 書き込みは新しいドキュメントの追加だけなので、同時に書き込んでも変更が失われない
+# - スナップショットの version は、取り込んだ最後の操作のドキュメントID
+# - 操作は created_at（コミット時刻）の順に読む。コミット時刻は読み取りの可視性と一致するため、
+#   読んだ最後の操作より後にコミットされた操作は、必ずそれより後ろに並ぶ
+
+# 取り込んでいない操作がこの件数に達したらスナップショット（all_minutes）を作り直す。
+# 読み取り（フロントエンドを含む）はスナップショットに以降の操作を適用するため、作り直しは読み取りを
+# 速くするためだけのもので、変更のたびに行う必要はない
+MINUTES_SNAPSHOT_INTERVAL_OPS = int(os.getenv("MINUTES_SNAPSHOT_INTERVAL_OPS", 50))
+
+db_client = Config.get_db_client()
+
+
+def minutes_doc_ref(meeting_id: str):
+    """議事録のスナップショット（meetings/<id>/minutes/all_minutes）。会議の要約などもこのドキュメントに持つ"""
+    return (
+        db_client.collection(Config.FIRESTORE_MEETING_COLLECTION)
+        .document(meeting_id)
+        .collection(Config.FIRESTORE_MINUTES_COLLECTION)
+        .document(Config.FIRESTORE_ALL_MINUTES_DOCUMENT)
+    )
+
+
+def _ops_ref(meeting_id: str):
+    return (
+        db_client.collection(Config.FIRESTORE_MEETING_COLLECTION)
+        .document(meeting_id)
+        .collection(Config.FIRESTORE_MINUTES_OPS_COLLECTION)
+    )
+
+
+def append_ops(meeting_id: str, ops: List[dict]) -> List[str]:
+    """操作を1回の書き込み（バッチ）で操作ログに追記し、追加したドキュメントIDを返す"""
+    batch = db_client.batch()
+    op_ids = []
+    for op in ops:
+        op_ref = _ops_ref(meeting_id).document()
+        batch.create(op_ref, {**op, "created_at": firestore.SERVER_TIMESTAMP})
+        op_ids.append(op_ref.id)
+    batch.commit()
+    return op_ids
+
+
+def _ops_after(
+    meeting_id: str, version: Optional[str], io_counts: Optional[dict] = None
+) -> List[Tuple[str, dict]]:
+    """`version`（操作のドキュメントID）より後の操作を古い順に返す。None なら全件"""
+    query = _ops_ref(meeting_id).order_by("created_at")
+    if version:
+        cursor = _ops_ref(meeting_id).document(version).get()
+        count_io(io_counts, reads=1)
+        if cursor.exists:
+            query = query.start_after(cursor)
+    docs = query.get()
+    count_io(io_counts, reads=max(len(docs), 1))
+    return [(doc.id, doc.to_dict()) for doc in docs]
+
+
+def _snapshot(doc) -> Tuple[dict, Optional[str]]:
+    data = doc.to_dict() if doc.exists else None
+    if not data:
+        return empty_minutes(), None
+    minutes = {target: data.get(target) or [] for target in TARGETS}
+    return minutes, data.get(MinutesFields.VERSION)
+
+
+def read_minutes(
+    meeting_id: str, io_counts: Optional[dict] = None
+) -> Tuple[dict, Optional[str], int]:
+    """
+    スナップショットと、それ以降の操作（tail）を適用した現在の議事録を返す。
+
+    `io_counts` を渡すと、読んだドキュメント数（スナップショット・version の操作・tail の操作）を加える。
+
+    Returns:
+        Tuple[dict, Optional[str], int]: (議事録, 最後に適用した操作のID, スナップショットに取り込んでいない操作数)
+    """
+    minutes, version = _snapshot(
+        minutes_doc_ref(meeting_id).get(field_paths=list(TARGETS) + [MinutesFields.VERSION])
+    )
+    count_io(io_counts, reads=1)
+    tail = _ops_after(meeting_id, version, io_counts)
+    if tail:
+        minutes = apply_ops(minutes, [op for _, op in tail])
+        version = tail[-1][0]
+    return minutes, version, len(tail)
+
+
+def ops_since(meeting_id: str, version: str) -> Tuple[List[dict], Optional[str]]:
+    """`version` より後の操作と、最後の操作のIDを返す（差分の取得用）"""
+    tail = _ops_after(meeting_id, version)
+    ops = [{"op_id": op_id, **{k: v for k, v in op.items() if k != "created_at"}} for op_id, op in tail]
+    return ops, tail[-1][0] if tail else version
+
+
+def compact_minutes(meeting_id: str, io_counts: Optional[dict] = None) -> int:
+    """
+    スナップショット（all_minutes）に取り込んでいない操作を取り込む。
+
+    トランザクションは使わず、読んだ時点からドキュメントが変わっていなければ書き込む
+    （更新時刻の前提条件）。rolling_summary の書き込みや他のインスタンスの作り直しと競合したら
+    何もしない。取り込まなかった操作は読み取り時に適用され、次の作り直しで取り込まれる。
+    取り込んだ操作数を返す。`io_counts` を渡すと、読み書きしたドキュメント数を加える。
+    """
+    doc_ref = minutes_doc_ref(meeting_id)
+    doc = doc_ref.get(field_paths=list(TARGETS) + [MinutesFields.VERSION])
+    count_io(io_counts, reads=1)
+    minutes, version = _snapshot(doc)
+    tail = _ops_after(meeting_id, version, io_counts)
+    if not tail:
+        return 0
+
+    data = {**apply_ops(minutes, [op for _, op in tail]), MinutesFields.VERSION: tail[-1][0]}
+    count_io(io_counts, writes=1)
+    try:
+        if doc.exists:
+            # rolling_summary など他のフィールドは残す
+            doc_ref.update(data, option=db_client.write_option(last_update_time=doc.update_time))
+        else:
+            doc_ref.create(data)
+    except (FailedPrecondition, Conflict):
+        print(f"⚠️ [議事録] 作り直し中にスナップショットが更新されたため、次の機会に取り込みます: {meeting_id}")
+        return 0
+    return len(tail)
+
+
+@firestore.transactional
+def _reset(transaction, meeting_id: str, minutes: dict):
+    # 最後の操作の読み取りと置き換えを1つのトランザクションで行い、その間に追記された操作を
+    # 「取り込んだこと」にしない
+    last_op = transaction.get(
+        _ops_ref(meeting_id).order_by("created_at", direction=firestore.Query.DESCENDING).limit(1)
+    )
+    last_op_ids = [doc.id for doc in last_op]
+    # 議事録の項目と version だけを置き換え、rolling_summary など他のフィールドは残す
+    fields = list(TARGETS) + [MinutesFields.VERSION]
+    transaction.set(
+        minutes_doc_ref(meeting_id),
+        {
+            **{target: minutes.get(target) or [] for target in TARGETS},
+            MinutesFields.VERSION: last_op_ids[0] if last_op_ids else None,
+        },
+        merge=fields,
+    )
+
+
+def reset_minutes(meeting_id: str, minutes: dict):
+    """
+    議事録を `minutes` で置き換える（アジェンダの設定時など）。
+
+    それまでの操作を取り込んだことにするため、最後の操作をスナップショットの version にする。
+    """
+    _reset(db_client.transaction(), meeting_id, minutes)
@@ -0,0 +1,86 @@
+import copy
+from typing import Dict, List
+
+from minutes.constants import MinutesFields
+
+# 議事録の変更操作（操作ログの1件）
+#   op:     add / update / delete / complete
+#   target: MinutesFields.DECISIONS / ACTION_PLAN / AGENDA
+#   id:     対象の項目のID
+#   data:   add は項目全体、update / complete は変更したフィールドだけ
+OP_ADD = "add"
+OP_UPDATE = "update"
+OP_DELETE = "delete"
+OP_COMPLETE = "complete"
+
+TARGETS = (MinutesFields.AGENDA, MinutesFields.DECISIONS, MinutesFields.ACTION_PLAN)
+
+
+def empty_minutes() -> dict:
+    return {target: [] for target in TARGETS}
+
+
+def diff_ops(old_minutes: dict, new_minutes: dict) -> List[dict]:
+    """
+    2つの議事録の差分を操作のリストにする。
+
+    1回の差分では1つの項目に対する操作は1件だけなので、同じ差分の操作は順不同で適用できる。
+    """
+    ops: List[dict] = []
+    for target in TARGETS:
+        old_items = {item["id"]: item for item in old_minutes.get(target) or []}
+        new_items = {item["id"]: item for item in new_minutes.get(target) or []}
+        for item_id, item in new_items.items():
+            old = old_items.get(item_id)
+            if old is None:
+                ops.append({"op": OP_ADD, "target": target, "id": item_id, "data": item})
+                continue
+            changed = {key: value for key, value in item.items() if old.get(key) != value}
+            if not changed:
+                continue
+            op = OP_COMPLETE if changed.get("completed") is True else OP_UPDATE
+            ops.append({"op": op, "target": target, "id": item_id, "data": changed})
+        for item_id in old_items:
+            if item_id not in new_items:
+                ops.append({"op": OP_DELETE, "target": target, "id": item_id, "data": {}})
+    return ops
+
+
+def apply_ops(minutes: dict, ops: List[dict]) -> dict:
+    """
+    議事録に操作を順に適用した結果を返す（`minutes` は変更しない）。
+
+    同じ操作を2回適用しても結果は変わらない（追加済みのIDの追加や、存在しないIDの更新・削除は無視する）。
+    """
+    minutes = copy.deepcopy(minutes)
+    for target in TARGETS:
+        minutes.setdefault(target, [])
+    positions: Dict[str, Dict[str, int]] = {
+        target: {item["id"]: i for i, item in enumerate(minutes[target])} for target in TARGETS
+    }
+
+    for op in ops:
+        target = op.get("target")
+        if target not in positions:
+            continue
+        items = minutes[target]
+        index = positions[target]
+        item_id = op.get("id")
+        kind = op.get("op")
+        if kind == OP_ADD:
+            if item_id not in index:
+                index[item_id] = len(items)
+                items.append(dict(op.get("data") or {}))
+        elif kind in (OP_UPDATE, OP_COMPLETE):
+            if item_id in index:
+                items[index[item_id]].update(op.get("data") or {})
+                if kind == OP_COMPLETE:
+                    items[index[item_id]]["completed"] = True
+        elif kind == OP_DELETE:
+            position = index.pop(item_id, None)
+            if position is not None:
+                del items[position]
+                for other_id, other in index.items():
+                    if other > position:
+                        index[other_id] = other - 1
+    return minutes
@@ -0,0 +1,218 @@
+import copy
+from typing import Dict, Optional, Set, Tuple
+from uuid import uuid4
+
+from minutes.agenda_tracker import mark_agenda_completed
+from minutes.constants import ActionPlanFields, MinutesFields
+from minutes.similarity_index import MinutesSimilarityIndex, NgramIndex
+from utils import get_jst_timestamp
+
+
+def _apply_decision_updates(
+    decisions: Dict[str, dict], action_decisions: dict, changed: Set[str], index: NgramIndex
+):
+    # --- 決定事項の追加 ---
+    if action_decisions.get("add_decision"):
+        add_decision_text = action_decisions.get("add_decision_text")
+        if add_decision_text:
+            duplicate = index.find_duplicate(add_decision_text)
+            if duplicate:
+                print(
+                    f"⚠️ [スキップ] 似た決定事項が既に存在 (ID: {duplicate[0]}, 類似度: {duplicate[1]:.2f}): {add_decision_text}"
+                )
+            else:
+                new_decision = {
+                    "id": f"decision_{uuid4().hex}",
+                    "text": add_decision_text,
+                }
+                print(f"✅ [追加] 新しい決定事項: {new_decision}")
+                decisions[new_decision["id"]] = new_decision
+                index.add(new_decision["id"], add_decision_text)
+                changed.add(MinutesFields.DECISIONS)
+
+    # --- 決定事項の更新 ---
+    if action_decisions.get("update_decision"):
+        target_id = action_decisions.get("decision_id")
+        new_decision_text = action_decisions.get("new_decision_text")
+        if new_decision_text:
+            print(f"🛠 [更新開始] 決定事項 ID: {target_id}")
+            decision = decisions.get(target_id)
+            if decision is None:
+                print(
+                    f"❌ [エラー] 更新対象の決定事項 (ID: {target_id}) が見つかりません"
+                )
+            elif decision["text"] != new_decision_text:
+                old_text = decision["text"]
+                decision["text"] = new_decision_text
+                index.add(target_id, new_decision_text)
+                changed.add(MinutesFields.DECISIONS)
+                print(
+                    f"🔄 [更新完了] ID: {target_id} | 旧: '{old_text}' → 新: '{decision['text']}'"
+                )
+
+    # --- 決定事項の削除 ---
+    if action_decisions.get("delete_decision"):
+        decision_id_to_delete = action_decisions.get("decision_id_to_delete")
+        if decisions.pop(decision_id_to_delete, None) is None:
+            print(
+                f"❌ [エラー] 削除対象の決定事項 (ID: {decision_id_to_delete}) が見つかりません"
+            )
+        else:
+            print(f"✅ [削除完了] 決定事項 ID: {decision_id_to_delete}")
+            index.remove(decision_id_to_delete)
+            changed.add(MinutesFields.DECISIONS)
+
+
+def _is_unset(value) -> bool:
+    """担当者・期限が未設定か（空文字・None・「未設定」）"""
+    return value in (None, "", "未設定")
+
+
+def _merge_action(existing: dict, action_actions: dict) -> bool:
+    """似たアクションプランに、未設定だった担当者・期限を補う。補った場合は True"""
+    merged = False
+    for field, key in (
+        (ActionPlanFields.ASSIGNED_TO, "add_assigned_to"),
+        (ActionPlanFields.DUE_DATE, "add_due_date"),
+    ):
+        value = action_actions.get(key)
+        if not _is_unset(value) and _is_unset(existing.get(field)):
+            existing[field] = value
+            merged = True
+    return merged
+
+
+def _apply_action_plan_updates(
+    actions: Dict[str, dict], action_actions: dict, changed: Set[str], index: NgramIndex
+):
+    # --- アクションプランの追加 ---
+    if action_actions.get("add_action_plan"):
+        new_action_text = action_actions.get("add_action_plan_text")
+        if new_action_text:
+            duplicate = index.find_duplicate(new_action_text)
+            if duplicate:
+                existing = actions[duplicate[0]]
+                if _merge_action(existing, action_actions):
+                    changed.add(MinutesFields.ACTION_PLAN)
+                    print(
+                        f"🔗 [統合] 似たアクションプランに担当・期限を反映 (ID: {duplicate[0]}, 類似度: {duplicate[1]:.2f}): {existing}"
+                    )
+                else:
+                    print(
+                        f"⚠️ [スキップ] 似たアクションプランが既に存在 (ID: {duplicate[0]}, 類似度: {duplicate[1]:.2f}): {new_action_text}"
+                    )
+            else:
+                new_action = {
+                    "id": f"action_{uuid4().hex}",
+                    "task": new_action_text,
+                    "assigned_to": action_actions.get("add_assigned_to", "未設定"),
+                    "due_date": action_actions.get("add_due_date", "未設定"),
+                }
+                print(f"✅ [追加] 新しいアクションプラン: {new_action}")
+                actions[new_action["id"]] = new_action
+                index.add(new_action["id"], new_action_text)
+                changed.add(MinutesFields.ACTION_PLAN)
+
+    # --- アクションプランの更新 ---
+    if action_actions.get("update_action_plan"):
+        target_action_id = action_actions.get("action_id")
+        new_action_text = action_actions.get("new_action_text")
+        if new_action_text:
+            print(f"🛠 [更新開始] アクションプラン ID: {target_action_id}")
+            action = actions.get(target_action_id)
+            if action is None:
+                print(
+                    f"❌ [エラー] 更新対象のアクションプラン (ID: {target_action_id}) が見つかりません"
+                )
+            else:
+                old_action = action.copy()  # 旧値を記録
+                action.update(
+                    {
+                        "task": new_action_text,
+                        "assigned_to": action_actions.get(
+                            "new_assigned_to", action.get("assigned_to")
+                        ),
+                        "due_date": action_actions.get(
+                            "new_due_date", action.get("due_date")
+                        ),
+                    }
+                )
+                if action != old_action:
+                    index.add(target_action_id, new_action_text)
+                    changed.add(MinutesFields.ACTION_PLAN)
+                    print(
+                        f"🔄 [更新完了] ID: {target_action_id} | 旧: {old_action} → 新: {action}"
+                    )
+
+    # --- アクションプランの削除 ---
+    if action_actions.get("delete_action_plan"):
+        action_id_to_delete = action_actions.get("action_id_to_delete")
+        if actions.pop(action_id_to_delete, None) is None:
+            print(
+                f"❌ [エラー] 削除対象のアクションプラン (ID: {action_id_to_delete}) が見つかりません"
+            )
+        else:
+            print(f"✅ [削除完了] アクションプラン ID: {action_id_to_delete}")
+            index.remove(action_id_to_delete)
+            changed.add(MinutesFields.ACTION_PLAN)
+
+
+def _apply_agenda_updates(minutes: dict, action_agenda: dict, changed: Set[str], now: str):
+    ### **アジェンダの完了処理** ###
+    completed_agenda_ids = action_agenda.get("completed_agenda_ids")
+    if not completed_agenda_ids:
+        return
+
+    # 完了した時刻と、次の項目が始まった時刻も記録する（アジェンダごとの経過時間の計算に使う）
+    if mark_agenda_completed(minutes[MinutesFields.AGENDA], completed_agenda_ids, now):
+        changed.add(MinutesFields.AGENDA)
+
+
+def apply_minutes_updates(
+    existing_minutes: dict,
+    updates: dict,
+    now: Optional[str] = None,
+    index: Optional[MinutesSimilarityIndex] = None,
+) -> Tuple[dict, Set[str]]:
+    """
+    LLMの判定結果を議事録に反映した結果をメモリ上で計算する。
+
+    Args:
+        existing_minutes: 現在の議事録（変更しない）
+        updates: `should_update_minutes` の戻り値
+        now: アジェンダの完了時刻として記録する時刻（省略時は現在時刻）
+        index: 会議の決定事項・アクションプランの類似度インデックス（省略時はこの議事録から作る）
+
+    Returns:
+        Tuple[dict, Set[str]]: (更新後の議事録, 変更があったフィールド名)
+            変更がなければフィールド名は空になる。
+    """
+    minutes = copy.deepcopy(existing_minutes)
+    for field in (
+        MinutesFields.AGENDA,
+        MinutesFields.DECISIONS,
+        MinutesFields.ACTION_PLAN,
+    ):
+        minutes.setdefault(field, [])
+
+    # 追加する決定事項・アクションプランは、既存の項目と言い換えでないかを類似度で確かめる
+    index = index or MinutesSimilarityIndex()
+    index.sync(minutes)
+
+    # ID での検索・追加・削除は、呼び出しごとに1回だけ作る {ID: 項目} で行う（並び順は保たれる）
+    decisions = {d["id"]: d for d in minutes[MinutesFields.DECISIONS]}
+    actions = {a["id"]: a for a in minutes[MinutesFields.ACTION_PLAN]}
+
+    changed: Set[str] = set()
+    _apply_decision_updates(
+        decisions, updates.get("decisions_update", {}), changed, index.decisions
+    )
+    _apply_action_plan_updates(
+        actions, updates.get("actions_update", {}), changed, index.actions
+    )
+    minutes[MinutesFields.DECISIONS] = list(decisions.values())
+    minutes[MinutesFields.ACTION_PLAN] = list(actions.values())
+    _apply_agenda_updates(
+        minutes, updates.get("agenda_update", {}), changed, now or get_jst_timestamp()
+    )
+    return minutes, changed
@@ -0,0 +1,91 @@
+import os
+from typing import Iterator, Tuple
+
+from google.cloud import firestore
+
+from agent.rolling_summary_agent import fold_into_summary
+from cache.ttl_cache import MISSING, TTLCache
+from message.message import get_message_history, iter_message_history
+from minutes.constants import MinutesFields
+from minutes.minutes_log import minutes_doc_ref
+
+# 会議の要約をパイプラインで更新するか
+ROLLING_SUMMARY_ENABLED = os.getenv("ROLLING_SUMMARY_ENABLED", "true").lower() == "true"
+# 要約に取り込んでいない発言がこの件数（直近の発言を除く）を超えたら要約を更新する
+ROLLING_SUMMARY_MIN_NEW_MESSAGES = int(os.getenv("ROLLING_SUMMARY_MIN_NEW_MESSAGES", 20))
+# 要約に取り込まずに発言のまま残す直近の発言数（プロンプトでは要約 + この発言を使う）
+ROLLING_SUMMARY_KEEP_RECENT = int(os.getenv("ROLLING_SUMMARY_KEEP_RECENT", 10))
+# 要約のプロセス内キャッシュの有効期限（秒）。自分で更新した要約は即座に反映する
+ROLLING_SUMMARY_CACHE_TTL_SECONDS = float(
+    os.getenv("ROLLING_SUMMARY_CACHE_TTL_SECONDS", 60)
+)
+
+_summary_cache = TTLCache(max_size=256, ttl_seconds=ROLLING_SUMMARY_CACHE_TTL_SECONDS)
+
+
+def _empty_summary() -> dict:
+    return {"text": "", "last_seq": 0}
+
+
+def get_rolling_summary(meeting_id: str) -> dict:
+    """
+    会議の要約を返す（議事録ドキュメントの rolling_summary）。
+
+    - text: 要約。まだ要約していなければ空文字
+    - last_seq: 要約に取り込んだ最後の発言の連番
+    """
+    summary = _summary_cache.get(meeting_id)
+    if summary is MISSING:
+        doc = minutes_doc_ref(meeting_id).get(field_paths=[MinutesFields.ROLLING_SUMMARY])
+        stored = (doc.to_dict() or {}).get(MinutesFields.ROLLING_SUMMARY) if doc.exists else None
+        summary = {
+            "text": stored.get("text", ""),
+            "last_seq": stored.get("last_seq", 0),
+        } if stored else _empty_summary()
+        _summary_cache.set(meeting_id, summary)
+    return dict(summary)
+
+
+def summary_and_recent_history(meeting_id: str) -> Tuple[str, Iterator[dict]]:
+    """プロンプト用に、会議の要約とそれ以降の発言（イテレータ）を返す"""
+    summary = get_rolling_summary(meeting_id)
+    since = summary["last_seq"] or None
+    return summary["text"], iter_message_history(meeting_id, since=since)
+
+
+def update_rolling_summary(meeting_id: str) -> bool:
+    """
+    要約に取り込んでいない発言が溜まっていれば、その分だけを要約に取り込む。
+
+    直近 `ROLLING_SUMMARY_KEEP_RECENT` 件は発言のまま残す。
+    更新した場合は True を返す。
+    """
+    if not ROLLING_SUMMARY_ENABLED:
+        return False
+
+    summary = get_rolling_summary(meeting_id)
+    new_messages = get_message_history(meeting_id, since=summary["last_seq"])
+    if len(new_messages) < ROLLING_SUMMARY_MIN_NEW_MESSAGES + ROLLING_SUMMARY_KEEP_RECENT:
+        return False
+
+    to_fold = new_messages[: len(new_messages) - ROLLING_SUMMARY_KEEP_RECENT]
+    text = fold_into_summary(summary["text"], to_fold)
+    if not text:
+        return False
+
+    updated = {"text": text, "last_seq": to_fold[-1]["seq"]}
+    minutes_doc_ref(meeting_id).set(
+        {
+            MinutesFields.ROLLING_SUMMARY: {
+                **updated,
+                "updated_at": firestore.SERVER_TIMESTAMP,
+            }
+        },
+        merge=True,
+    )
+    _summary_cache.set(meeting_id, updated)
+    print(
+        f"📚 [要約] {meeting_id}: {len(to_fold)}件を取り込み "
+        f"(last_seq={updated['last_seq']}, {len(text)}文字)"
+    )
+    return True
@@ -0,0 +1,166 @@
+import os
+import re
+import unicodedata
+import zlib
+from collections import OrderedDict
+from threading import Lock
+from typing import Dict, FrozenSet, List, Optional, Tuple
+
+import numpy as np
+
+from minutes.constants import ActionPlanFields, MinutesFields
+
+# 文字 n-gram をハッシュして割り当てるベクトルの次元数
+MINUTES_SIMILARITY_DIM = int(os.getenv("MINUTES_SIMILARITY_DIM", 2048))
+# コサイン類似度がこの値以上で、数字・名前・選択肢が同じなら同じ内容（言い換え）とみなす。
+# 「予算は100万円」と「予算は200万円」のように要点だけが違う文も類似度は 0.7〜0.9 になるため、
+# 類似度だけでは判定しない
+MINUTES_DUPLICATE_THRESHOLD = float(os.getenv("MINUTES_DUPLICATE_THRESHOLD", 0.8))
+# インデックスを保持する会議数の上限（超えたら最も使われていない会議から追い出す）
+MINUTES_SIMILARITY_MAX_MEETINGS = int(os.getenv("MINUTES_SIMILARITY_MAX_MEETINGS", 100))
+
+NGRAM_SIZES = (2, 3)
+# 類似度に影響しない空白・記号
+_IGNORED = re.compile(r"[\s、。,.!?！？・「」『』（）()【】\[\]:：;；\"'“”‘’]+")
+# 要点になりやすい語: 数字（金額・日付など）、英字（A案・B案、製品名など）、敬称の付いた名前
+_KEY_FACTS = re.compile(
+    r"\d+(?:\.\d+)?|[a-z]+|[\u4e00-\u9fffァ-ヶー]+(?=さん|氏|くん|ちゃん)"
+)
+
+
+def key_facts(text: str) -> FrozenSet[str]:
+    """文の要点になる語（数字・英字・名前）の集合。全角・半角の違いは無視する"""
+    return frozenset(_KEY_FACTS.findall(unicodedata.normalize("NFKC", text).lower()))
+
+
+def _vectorize(text: str, dim: int) -> np.ndarray:
+    """文字 n-gram の出現回数をハッシュで dim 次元に割り当て、長さ1に正規化したベクトル"""
+    text = _IGNORED.sub("", unicodedata.normalize("NFKC", text)).lower()
+    vector = np.zeros(dim, dtype=np.float32)
+    grams = [text[i:i + n] for n in NGRAM_SIZES for i in range(len(text) - n + 1)] or [text]
+    for gram in grams:
+        vector[zlib.crc32(gram.encode("utf-8")) % dim] += 1.0
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+class NgramIndex:
+    """
+    文字 n-gram ベクトルのコサイン類似度で、最も近い項目を探すインデックス。
+
+    ベクトルは行列の行として持ち、検索は行列とベクトルの積1回で行う。
+    削除は最後の行を空いた行に移して O(1) で行う。
+    """
+
+    def __init__(self, dim: int = MINUTES_SIMILARITY_DIM):
+        self.dim = dim
+        self._matrix = np.zeros((8, dim), dtype=np.float32)
+        self._ids: List[str] = []
+        self._rows: Dict[str, int] = {}
+        self._texts: Dict[str, str] = {}
+        self._facts: Dict[str, FrozenSet[str]] = {}
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __contains__(self, item_id: str) -> bool:
+        return item_id in self._rows
+
+    def add(self, item_id: str, text: str):
+        """項目を追加する（既にあれば内容を置き換える）"""
+        if item_id in self._rows:
+            if self._texts[item_id] != text:
+                self._matrix[self._rows[item_id]] = _vectorize(text, self.dim)
+                self._texts[item_id] = text
+                self._facts[item_id] = key_facts(text)
+            return
+        if len(self._ids) == len(self._matrix):
+            self._matrix = np.vstack([self._matrix, np.zeros_like(self._matrix)])
+        row = len(self._ids)
+        self._matrix[row] = _vectorize(text, self.dim)
+        self._ids.append(item_id)
+        self._rows[item_id] = row
+        self._texts[item_id] = text
+        self._facts[item_id] = key_facts(text)
+
+    def remove(self, item_id: str):
+        row = self._rows.pop(item_id, None)
+        if row is None:
+            return
+        del self._texts[item_id]
+        del self._facts[item_id]
+        last = len(self._ids) - 1
+        if row != last:
+            moved = self._ids[last]
+            self._matrix[row] = self._matrix[last]
+            self._ids[row] = moved
+            self._rows[moved] = row
+        self._ids.pop()
+
+    def sync(self, items: Dict[str, str]):
+        """{ID: 内容} に合わせる（変わった項目だけベクトルを作り直す）"""
+        for item_id in [i for i in self._ids if i not in items]:
+            self.remove(item_id)
+        for item_id, text in items.items():
+            self.add(item_id, text)
+
+    def most_similar(self, text: str) -> Optional[Tuple[str, float]]:
+        """最も類似度の高い項目の (ID, 類似度)。項目がなければ None"""
+        if not self._ids:
+            return None
+        scores = self._matrix[: len(self._ids)] @ _vectorize(text, self.dim)
+        row = int(np.argmax(scores))
+        return self._ids[row], float(scores[row])
+
+    def find_duplicate(
+        self, text: str, threshold: float = MINUTES_DUPLICATE_THRESHOLD
+    ) -> Optional[Tuple[str, float]]:
+        """
+        類似度が `threshold` 以上で、要点（数字・英字・名前）が同じ項目があれば、
+        最も類似度の高いものの (ID, 類似度) を返す
+        """
+        if not self._ids:
+            return None
+        scores = self._matrix[: len(self._ids)] @ _vectorize(text, self.dim)
+        facts = key_facts(text)
+        for row in np.argsort(-scores):
+            if scores[row] < threshold:
+                break
+            item_id = self._ids[row]
+            if self._facts[item_id] == facts:
+                return item_id, float(scores[row])
+        return None
+
+
+class MinutesSimilarityIndex:
+    """会議ごとの決定事項・アクションプランのインデックス"""
+
+    def __init__(self, dim: int = MINUTES_SIMILARITY_DIM):
+        self.decisions = NgramIndex(dim)
+        self.actions = NgramIndex(dim)
+
+    def sync(self, minutes: dict):
+        """議事録（正）の内容に合わせる。他のインスタンスによる更新もここで反映される"""
+        self.decisions.sync(
+            {d["id"]: d.get("text", "") for d in minutes.get(MinutesFields.DECISIONS) or []}
+        )
+        self.actions.sync(
+            {
+                a["id"]: a.get(ActionPlanFields.TASK, "")
+                for a in minutes.get(MinutesFields.ACTION_PLAN) or []
+            }
+        )
+
+
+_indexes: "OrderedDict[str, MinutesSimilarityIndex]" = OrderedDict()
+_indexes_lock = Lock()
+
+
+def get_similarity_index(meeting_id: str) -> MinutesSimilarityIndex:
+    """会議のインデックスを返す（なければ空のインデックスを作る。内容は sync で合わせる）"""
+    with _indexes_lock:
+        index = _indexes.pop(meeting_id, None) or MinutesSimilarityIndex()
+        _indexes[meeting_id] = index
+        while len(_indexes) > MINUTES_SIMILARITY_MAX_MEETINGS:
+            _indexes.popitem(last=False)
+        return index
@@ -1,4 +1,4 @@
-from typing import Dict, List, Optional, TypedDict
+from typing import Any, Dict, List, Optional, TypedDict
 from typing_extensions import TypedDict
 from datetime import datetime
 from enum import Enum
@@ -35,6 +35,7 @@ class InterventionRequest(TypedDict):
     """介入リクエストを表す型"""
     status: InterventionStatus
     reason: str
+    trigger: Optional[str]  # 時間の兆候だけで介入した場合のきっかけ
     created_at: datetime
     updated_at: datetime
 
@@ -44,6 +45,9 @@ class MeetingInput(TypedDict):
     agenda: List[str]
     participants: List[str]
     comment_history: List[Message]
+    rolling_summary: Optional[str]  # 会議の要約（comment_history は要約以降の発言）
+    participation: Optional[Dict[str, Any]]  # 発言の統計（プロンプト用に集計済み）
+    agenda_progress: Optional[Dict[str, Any]]  # アジェンダの進み具合（プロンプト用に計算済み）
     start_at: str
     end_at: str
     intervention_request: Optional[InterventionRequest]
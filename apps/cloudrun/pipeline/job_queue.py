@@ -0,0 +1,369 @@
+import heapq
+import json
+from abc import ABC, abstractmethod
+import sqlite3
+import time
+from itertools import count
+from threading import Condition, Lock
+from typing import Any, Dict, List, Optional, Set, Tuple, TypedDict
+from uuid import uuid4
+
+
+class Job(TypedDict):
+    """バックグラウンドで処理するジョブ"""
+
+    id: str
+    type: str
+    payload: Dict[str, Any]
+    key: Optional[str]  # 同じキーのジョブは合流させ、同時には処理しない（会議IDなど）
+    attempts: int  # これまでに取り出された回数
+    enqueued_at: float  # time.time()
+
+
+class JobQueue(ABC):
+    """
+    ジョブキューのインターフェース。
+
+    - `put` でジョブを登録し、ワーカーは `get` で取り出して処理する。
+    - 処理に成功したら `ack`、失敗したら `fail` を呼ぶ。`fail` されたジョブは
+      `max_attempts` に達するまで再度取り出される。
+    - `key` 付きのジョブは、同じキーの未処理ジョブがあればそれに合流する
+      （新しいジョブは作らない）。また同じキーのジョブは同時に1つしか取り出されない。
+    - `delay` を指定すると、その秒数が経過するまで取り出されない。
+    - リースのあるキューでは、処理中に `heartbeat_interval` 秒ごとに `heartbeat` を呼んでリースを延長する。
+    """
+
+    coalesced = 0  # 既存のジョブに合流した put の回数
+    heartbeat_interval: Optional[float] = None  # None ならリースがなく heartbeat は不要
+
+    @abstractmethod
+    def put(
+        self,
+        job_type: str,
+        payload: Dict[str, Any],
+        delay: float = 0,
+        key: Optional[str] = None,
+    ) -> str:
+        ...
+
+    @abstractmethod
+    def get(self, timeout: Optional[float] = None) -> Optional[Job]:
+        ...
+
+    @abstractmethod
+    def ack(self, job: Job):
+        ...
+
+    @abstractmethod
+    def fail(self, job: Job, error: str):
+        ...
+
+    @abstractmethod
+    def depth(self) -> int:
+        """キューに残っているジョブ数（SQLiteでは処理中のジョブを含む）"""
+        ...
+
+    def heartbeat(self, job: Job):
+        """処理中のジョブのリースを延長する"""
+
+
+def _new_job(job_type: str, payload: Dict[str, Any], key: Optional[str]) -> Job:
+    return Job(
+        id=uuid4().hex,
+        type=job_type,
+        payload=payload,
+        key=key,
+        attempts=0,
+        enqueued_at=time.time(),
+    )
+
+
+class InMemoryJobQueue(JobQueue):
+    """プロセス内のキュー。プロセスが終了すると未処理のジョブは失われる"""
+
+    def __init__(self, max_attempts: int = 3):
+        self.max_attempts = max_attempts
+        self.coalesced = 0
+        # (取り出し可能になる時刻, 登録順, ジョブ)
+        self._heap: List[Tuple[float, int, Job]] = []
+        self._seq = count()
+        self._cond = Condition()
+        self._pending_by_key: Dict[str, Job] = {}
+        self._running_keys: Set[str] = set()
+
+    def _push(self, job: Job, available_at: float):
+        heapq.heappush(self._heap, (available_at, next(self._seq), job))
+        if job["key"] is not None:
+            self._pending_by_key[job["key"]] = job
+        self._cond.notify_all()
+
+    def put(
+        self,
+        job_type: str,
+        payload: Dict[str, Any],
+        delay: float = 0,
+        key: Optional[str] = None,
+    ) -> str:
+        with self._cond:
+            if key is not None and key in self._pending_by_key:
+                self.coalesced += 1
+                return self._pending_by_key[key]["id"]
+            job = _new_job(job_type, payload, key)
+            self._push(job, job["enqueued_at"] + delay)
+            return job["id"]
+
+    def _pop_available(self, now: float) -> Optional[Job]:
+        """取り出し可能なジョブのうち、同じキーが処理中でない最初のものを返す"""
+        blocked = []
+        found = None
+        while self._heap and self._heap[0][0] <= now:
+            item = heapq.heappop(self._heap)
+            if item[2]["key"] in self._running_keys:
+                blocked.append(item)
+                continue
+            found = item[2]
+            break
+        for item in blocked:
+            heapq.heappush(self._heap, item)
+        return found
+
+    def get(self, timeout: Optional[float] = None) -> Optional[Job]:
+        deadline = None if timeout is None else time.time() + timeout
+        with self._cond:
+            while True:
+                now = time.time()
+                job = self._pop_available(now)
+                if job is not None:
+                    if job["key"] is not None:
+                        del self._pending_by_key[job["key"]]
+                        self._running_keys.add(job["key"])
+                    job["attempts"] += 1
+                    return job
+                if deadline is not None and now >= deadline:
+                    return None
+                # 遅延中のジョブが取り出し可能になる時刻か、ack による通知まで待つ
+                wait_until = min(
+                    (at for at, _, _ in self._heap if at > now), default=None
+                )
+                if deadline is not None:
+                    wait_until = (
+                        deadline if wait_until is None else min(wait_until, deadline)
+                    )
+                self._cond.wait(None if wait_until is None else wait_until - now)
+
+    def _release(self, job: Job):
+        if job["key"] is not None:
+            self._running_keys.discard(job["key"])
+        self._cond.notify_all()
+
+    def ack(self, job: Job):
+        with self._cond:
+            self._release(job)
+
+    def fail(self, job: Job, error: str):
+        with self._cond:
+            self._release(job)
+            if job["attempts"] >= self.max_attempts:
+                print(f"❌ [ジョブ破棄] {job['type']} {job['id']}: {error}")
+            elif job["key"] is not None and job["key"] in self._pending_by_key:
+                # 同じキーの新しいジョブが待っているので、そちらに任せる
+                self.coalesced += 1
+            else:
+                self._push(job, time.time())
+
+    def depth(self) -> int:
+        with self._cond:
+            return len(self._heap)
+
+
+class SQLiteJobQueue(JobQueue):
+    """
+    SQLiteファイルに永続化するキュー。
+
+    - 取り出したジョブは `lease_seconds` の間だけ他のワーカーから見えなくなる。
+      その間に ack されなければ（プロセスのクラッシュなど）再度取り出される。
+      処理中はワーカーが `heartbeat` でリースを延長するため、長いジョブが二重に実行されることはない。
+    - リースが切れたジョブも `max_attempts` 回取り出されていれば再配信せず、
+      status を dead にして残す（ワーカーを落とすジョブが繰り返し配信されないように）。
+    - 1コンテナ内の複数プロセス（gunicornのワーカー）で同じファイルを共有でき、
+      キーによる合流・排他もプロセスをまたいで効く。
+    """
+
+    def __init__(
+        self,
+        path: str,
+        max_attempts: int = 3,
+        lease_seconds: float = 300,
+        poll_interval: float = 0.2,
+    ):
+        self.path = path
+        self.max_attempts = max_attempts
+        self.lease_seconds = lease_seconds
+        self.heartbeat_interval = lease_seconds / 3
+        self.poll_interval = poll_interval
+        self.coalesced = 0
+        self._lock = Lock()
+        self._conn = sqlite3.connect(
+            path, timeout=30, isolation_level=None, check_same_thread=False
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # status が running のジョブは available_at をリースの期限として使う
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                type TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                key TEXT,
+                status TEXT NOT NULL DEFAULT 'pending',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                enqueued_at REAL NOT NULL,
+                available_at REAL NOT NULL,
+                last_error TEXT
+            )
+            """)
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS jobs_available_at ON jobs (available_at)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_key ON jobs (key, status)")
+
+    def _transaction(self, fn):
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                result = fn()
+                self._conn.execute("COMMIT")
+                return result
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def _pending_id(self, key: Optional[str]) -> Optional[str]:
+        if key is None:
+            return None
+        row = self._conn.execute(
+            "SELECT id FROM jobs WHERE key = ? AND status = 'pending' LIMIT 1", (key,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def put(
+        self,
+        job_type: str,
+        payload: Dict[str, Any],
+        delay: float = 0,
+        key: Optional[str] = None,
+    ) -> str:
+        job = _new_job(job_type, payload, key)
+
+        def insert():
+            pending_id = self._pending_id(key)
+            if pending_id is not None:
+                self.coalesced += 1
+                return pending_id
+            self._conn.execute(
+                "INSERT INTO jobs (id, type, payload, key, enqueued_at, available_at)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    job["id"],
+                    job["type"],
+                    json.dumps(job["payload"], ensure_ascii=False),
+                    key,
+                    job["enqueued_at"],
+                    job["enqueued_at"] + delay,
+                ),
+            )
+            return job["id"]
+
+        return self._transaction(insert)
+
+    def _claim(self) -> Optional[Job]:
+        now = time.time()
+
+        def claim():
+            # リースが切れたまま max_attempts 回に達したジョブは再配信しない
+            dead = self._conn.execute(
+                "SELECT id, type FROM jobs WHERE status = 'running'"
+                " AND available_at <= ? AND attempts >= ?",
+                (now, self.max_attempts),
+            ).fetchall()
+            for job_id, job_type in dead:
+                print(f"❌ [ジョブ破棄] {job_type} {job_id}: lease expired")
+                self._conn.execute(
+                    "UPDATE jobs SET status = 'dead', last_error = 'lease expired'"
+                    " WHERE id = ?",
+                    (job_id,),
+                )
+            # 同じキーのジョブがリース中なら取り出さない
+            row = self._conn.execute(
+                "SELECT id, type, payload, key, attempts, enqueued_at FROM jobs"
+                " WHERE status != 'dead' AND available_at <= :now"
+                " AND (key IS NULL OR key NOT IN ("
+                "   SELECT key FROM jobs WHERE status = 'running'"
+                "   AND available_at > :now AND key IS NOT NULL))"
+                " ORDER BY available_at LIMIT 1",
+                {"now": now},
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute(
+                "UPDATE jobs SET status = 'running', attempts = attempts + 1,"
+                " available_at = ? WHERE id = ?",
+                (now + self.lease_seconds, row[0]),
+            )
+            return row
+
+        row = self._transaction(claim)
+        if row is None:
+            return None
+        return Job(
+            id=row[0],
+            type=row[1],
+            payload=json.loads(row[2]),
+            key=row[3],
+            attempts=row[4] + 1,
+            enqueued_at=row[5],
+        )
+
+    def get(self, timeout: Optional[float] = None) -> Optional[Job]:
+        deadline = None if timeout is None else time.time() + timeout
+        while True:
+            job = self._claim()
+            if job is not None:
+                return job
+            if deadline is not None and time.time() >= deadline:
+                return None
+            time.sleep(self.poll_interval)
+
+    def ack(self, job: Job):
+        with self._lock:
+            self._conn.execute("DELETE FROM jobs WHERE id = ?", (job["id"],))
+
+    def heartbeat(self, job: Job):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET available_at = ? WHERE id = ? AND status = 'running'",
+                (time.time() + self.lease_seconds, job["id"]),
+            )
+
+    def fail(self, job: Job, error: str):
+        def retry_or_drop():
+            if job["attempts"] >= self.max_attempts:
+                print(f"❌ [ジョブ破棄] {job['type']} {job['id']}: {error}")
+                self._conn.execute("DELETE FROM jobs WHERE id = ?", (job["id"],))
+            elif self._pending_id(job["key"]) is not None:
+                # 同じキーの新しいジョブが待っているので、そちらに任せる
+                self.coalesced += 1
+                self._conn.execute("DELETE FROM jobs WHERE id = ?", (job["id"],))
+            else:
+                self._conn.execute(
+                    "UPDATE jobs SET status = 'pending', available_at = ?,"
+                    " last_error = ? WHERE id = ?",
+                    (time.time(), error, job["id"]),
+                )
+
+        self._transaction(retry_or_drop)
+
+    def depth(self) -> int:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM jobs WHERE status != 'dead'"
+            ).fetchone()[0]
@@ -0,0 +1,82 @@
+import os
+from threading import Lock
+from typing import Any, Dict, Optional
+
+from agent.intervention_request_service import request_intervention
+from meeting.meeting_cache import request_scope
+from message.message import assign_message_seq
+from minutes.minutes import update_minutes
+from minutes.rolling_summary import update_rolling_summary
+from pipeline.job_queue import InMemoryJobQueue, JobQueue, SQLiteJobQueue
+from pipeline.worker import WorkerPool
+
+# キューの実装（memory: プロセス内 / sqlite: ローカルのSQLiteファイル）
+PIPELINE_QUEUE_BACKEND = os.getenv("PIPELINE_QUEUE_BACKEND", "memory")
+PIPELINE_SQLITE_PATH = os.getenv("PIPELINE_SQLITE_PATH", "/tmp/pipeline.sqlite3")
+PIPELINE_WORKERS = int(os.getenv("PIPELINE_WORKERS", 4))
+PIPELINE_MAX_ATTEMPTS = int(os.getenv("PIPELINE_MAX_ATTEMPTS", 3))
+# 同じ会議の発言がこの秒数以内に続いた場合は、1回の処理にまとめる
+PIPELINE_COALESCE_WINDOW_SECONDS = float(
+    os.getenv("PIPELINE_COALESCE_WINDOW_SECONDS", 2)
+)
+
+# 発言1件ごとの後処理（連番の採番・議事録の更新・介入判定・会議の要約の更新）
+PROCESS_MESSAGE_JOB = "process_message"
+
+
+def process_message(payload: Dict[str, Any]):
+    meeting_id = payload["meeting_id"]
+    # 合流した発言（と他のインスタンスに届いた発言）にまとめて連番を付けてから履歴を読む
+    assign_message_seq(meeting_id)
+    with request_scope():
+        minutes, _ = update_minutes(meeting_id)
+        # 議事録は update_minutes で読んだもの（更新後）を使い、読み直さない
+        request_intervention(meeting_id, minutes)
+        # 介入判定を待たせないよう最後に行う（要約以降の直近の発言は常にプロンプトに入る）
+        update_rolling_summary(meeting_id)
+
+
+def create_queue(backend: str = PIPELINE_QUEUE_BACKEND) -> JobQueue:
+    if backend == "sqlite":
+        return SQLiteJobQueue(PIPELINE_SQLITE_PATH, max_attempts=PIPELINE_MAX_ATTEMPTS)
+    if backend == "memory":
+        return InMemoryJobQueue(max_attempts=PIPELINE_MAX_ATTEMPTS)
+    raise ValueError(f"Unknown PIPELINE_QUEUE_BACKEND: {backend}")
+
+
+_pipeline: Optional[WorkerPool] = None
+_pipeline_lock = Lock()
+
+
+def get_pipeline() -> WorkerPool:
+    """
+    発言処理パイプラインを返す。
+
+    gunicornのfork後に各ワーカープロセスでスレッドを起動するため、初回利用時に生成する。
+    """
+    global _pipeline
+    with _pipeline_lock:
+        if _pipeline is None:
+            _pipeline = WorkerPool(
+                create_queue(),
+                {PROCESS_MESSAGE_JOB: process_message},
+                num_workers=PIPELINE_WORKERS,
+            )
+            _pipeline.start()
+    return _pipeline
+
+
+def enqueue_message_processing(meeting_id: str) -> str:
+    """
+    発言の後処理をキューに登録し、ジョブIDを返す。
+
+    同じ会議の未処理ジョブがあればそれに合流する。ジョブは実行時点の最新の
+    発言履歴を読むため、合流した発言もまとめて1回で評価される。
+    同じ会議のジョブは同時に1つしか処理されず、別の会議は並列に処理される。
+    """
+    return get_pipeline().queue.put(
+        PROCESS_MESSAGE_JOB,
+        {"meeting_id": meeting_id},
+        delay=PIPELINE_COALESCE_WINDOW_SECONDS,
+        key=meeting_id,
+    )
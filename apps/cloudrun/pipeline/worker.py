@@ -0,0 +1,132 @@
+import time
+from collections import deque
+from threading import Event, Lock, Thread
+from typing import Any, Callable, Dict, List, Optional
+
+from pipeline.job_queue import Job, JobQueue
+
+JobHandler = Callable[[Dict[str, Any]], None]
+
+
+class PipelineMetrics:
+    """ジョブの処理件数とレイテンシを集計する"""
+
+    def __init__(self, window: int = 1000):
+        self._lock = Lock()
+        self.succeeded = 0
+        self.failed = 0
+        # 直近 window 件の (キュー待ち時間, 処理時間)（秒）
+        self._latencies = deque(maxlen=window)
+
+    def record(self, wait_seconds: float, run_seconds: float, ok: bool):
+        with self._lock:
+            if ok:
+                self.succeeded += 1
+            else:
+                self.failed += 1
+            self._latencies.append((wait_seconds, run_seconds))
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            latencies = list(self._latencies)
+            succeeded, failed = self.succeeded, self.failed
+        waits = sorted(w for w, _ in latencies)
+        totals = sorted(w + r for w, r in latencies)
+        return {
+            "succeeded": succeeded,
+            "failed": failed,
+            "wait_seconds": _summary(waits),
+            "latency_seconds": _summary(totals),
+        }
+
+
+def _summary(values: List[float]) -> Dict[str, Optional[float]]:
+    if not values:
+        return {"avg": None, "p50": None, "p95": None, "max": None}
+    return {
+        "avg": round(sum(values) / len(values), 3),
+        "p50": round(values[len(values) // 2], 3),
+        "p95": round(values[min(len(values) - 1, int(len(values) * 0.95))], 3),
+        "max": round(values[-1], 3),
+    }
+
+
+class WorkerPool:
+    """キューからジョブを取り出し、種類ごとのハンドラで処理するワーカースレッド群"""
+
+    def __init__(
+        self,
+        queue: JobQueue,
+        handlers: Dict[str, JobHandler],
+        num_workers: int = 4,
+    ):
+        self.queue = queue
+        self.handlers = handlers
+        self.num_workers = num_workers
+        self.metrics = PipelineMetrics()
+        self._stop = Event()
+        self._threads: List[Thread] = []
+        self._lock = Lock()
+
+    def start(self):
+        """ワーカーを起動する（起動済みなら何もしない）"""
+        with self._lock:
+            if self._threads:
+                return
+            self._stop.clear()
+            for i in range(self.num_workers):
+                thread = Thread(
+                    target=self._run, name=f"pipeline-worker-{i}", daemon=True
+                )
+                thread.start()
+                self._threads.append(thread)
+
+    def stop(self, timeout: Optional[float] = None):
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def _run(self):
+        while not self._stop.is_set():
+            job = self.queue.get(timeout=1)
+            if job is not None:
+                self.process(job)
+
+    def _heartbeat(self, job: Job, done: Event):
+        while not done.wait(self.queue.heartbeat_interval):
+            try:
+                self.queue.heartbeat(job)
+            except Exception as e:
+                print(f"Error in heartbeat {job['type']} {job['id']}: {e}")
+
+    def process(self, job: Job):
+        """ジョブを1件処理し、結果をキューとメトリクスに反映する"""
+        started = time.time()
+        ok = False
+        done = Event()
+        if self.queue.heartbeat_interval is not None:
+            # 処理中はリースを延長し続け、他のワーカーに再配信されないようにする
+            Thread(
+                target=self._heartbeat, args=(job, done), name="pipeline-heartbeat", daemon=True
+            ).start()
+        try:
+            handler = self.handlers[job["type"]]
+            handler(job["payload"])
+            ok = True
+        except Exception as e:
+            print(f"Error in job {job['type']} {job['id']}: {e}")
+            self.queue.fail(job, str(e))
+        else:
+            self.queue.ack(job)
+        finally:
+            done.set()
+            self.metrics.record(started - job["enqueued_at"], time.time() - started, ok)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "queue_depth": self.queue.depth(),
+            "coalesced": self.queue.coalesced,
+            "workers": len(self._threads),
+            **self.metrics.snapshot(),
+        }
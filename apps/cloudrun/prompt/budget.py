@@ -0,0 +1,143 @@
+import os
+from collections import deque
+from threading import Lock
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# 呼び出し箇所ごとのプロンプトのトークン数の上限（推定値）
+PROMPT_TOKEN_BUDGETS = {
+    "minutes": int(os.getenv("PROMPT_TOKEN_BUDGET_MINUTES", 4000)),
+    "intervention_check": int(os.getenv("PROMPT_TOKEN_BUDGET_INTERVENTION_CHECK", 8000)),
+    "feedback_agenda": int(os.getenv("PROMPT_TOKEN_BUDGET_FEEDBACK_AGENDA", 2000)),
+    "feedback_summary": int(os.getenv("PROMPT_TOKEN_BUDGET_FEEDBACK_SUMMARY", 12000)),
+    "feedback_evaluation": int(os.getenv("PROMPT_TOKEN_BUDGET_FEEDBACK_EVALUATION", 12000)),
+    "feedback_facilitator": int(os.getenv("PROMPT_TOKEN_BUDGET_FEEDBACK_FACILITATOR", 12000)),
+    "rolling_summary": int(os.getenv("PROMPT_TOKEN_BUDGET_ROLLING_SUMMARY", 8000)),
+}
+
+# 予算に収まらず省略した古い発言の代わりに入れる注記
+OMITTED_NOTICE = "（古い発言 {} 件は省略）"
+
+_stats_lock = Lock()
+# site -> {"prompts", "tokens", "max_tokens", "dropped_lines"}
+_usage_stats: Dict[str, Dict[str, int]] = {}
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    トークン数をローカルで推定する（APIは呼ばない）。
+
+    ASCII文字は4文字で1トークン、それ以外（日本語など）は1文字1トークンとして数える。
+    実際のトークン数より多めに見積もる。
+    """
+    non_ascii = sum(1 for ch in text if ord(ch) > 0x7F)
+    ascii_chars = len(text) - non_ascii
+    return non_ascii + (ascii_chars + 3) // 4
+
+
+def fit_lines(lines: Iterable[str], max_tokens: int) -> Tuple[List[str], int, int]:
+    """
+    行を古い順に読み、新しい行から `max_tokens` に収まるだけを残す。
+
+    保持するのは収まる分の行だけなので、長い履歴でもメモリは上限分で済む。
+    (残した行, 省略した行数, 残した行のトークン数) を返す。
+    """
+    kept: "deque[Tuple[str, int]]" = deque()
+    tokens = 0
+    dropped = 0
+    for line in lines:
+        line_tokens = estimate_tokens(line) + 1  # 改行の分
+        kept.append((line, line_tokens))
+        tokens += line_tokens
+        while kept and tokens > max_tokens:
+            _, removed = kept.popleft()
+            tokens -= removed
+            dropped += 1
+    return [line for line, _ in kept], dropped, tokens
+
+
+class PromptBuilder:
+    """
+    セクションを順に並べてプロンプトを作る。
+
+    - `add` のセクションはそのまま入れる。
+    - `add_history` のセクションは、他のセクションを入れた残りの予算に収まるよう
+      新しい行から残し、省略した古い行は1行の注記にまとめる。
+    - `build` 時にセクションごとのトークン数（推定）を記録・出力する。
+    """
+
+    def __init__(self, site: str, budget: Optional[int] = None):
+        self.site = site
+        self.budget = budget if budget is not None else PROMPT_TOKEN_BUDGETS[site]
+        # (セクション名, 見出し, 本文 or 行のイテレータ, 履歴かどうか)
+        self._sections: List[Tuple[str, str, object, bool]] = []
+        self.usage: Dict[str, int] = {}
+        self.dropped_lines = 0
+
+    def add(self, name: str, text: str, heading: Optional[str] = None) -> "PromptBuilder":
+        self._sections.append((name, heading or "", text, False))
+        return self
+
+    def add_history(
+        self, name: str, lines: Iterable[str], heading: Optional[str] = None
+    ) -> "PromptBuilder":
+        self._sections.append((name, heading or "", lines, True))
+        return self
+
+    def build(self) -> str:
+        fixed_tokens = sum(
+            estimate_tokens(heading) + estimate_tokens(body)
+            for _, heading, body, is_history in self._sections
+            if not is_history
+        )
+        history_count = sum(1 for section in self._sections if section[3])
+        remaining = max(0, self.budget - fixed_tokens)
+
+        parts = []
+        for name, heading, body, is_history in self._sections:
+            if is_history:
+                body = self._fit_history(name, body, remaining // max(1, history_count))
+            else:
+                self.usage[name] = estimate_tokens(heading) + estimate_tokens(body)
+            parts.append(f"{heading}{body}")
+        prompt = "\n\n".join(parts)
+
+        total = sum(self.usage.values())
+        self._record(total)
+        print(
+            f"🧮 [プロンプト] {self.site}: "
+            + ", ".join(f"{name}={tokens}" for name, tokens in self.usage.items())
+            + f", total={total}/{self.budget}"
+            + (f", 省略={self.dropped_lines}行" if self.dropped_lines else "")
+        )
+        return prompt
+
+    def _fit_history(self, name: str, lines: Iterable[str], max_tokens: int) -> str:
+        # 省略の注記の分を空けておく
+        kept, dropped, tokens = fit_lines(
+            lines, max(0, max_tokens - estimate_tokens(OMITTED_NOTICE) - 2)
+        )
+        if dropped:
+            kept.insert(0, OMITTED_NOTICE.format(dropped))
+            tokens += estimate_tokens(kept[0]) + 1
+        self.dropped_lines += dropped
+        self.usage[name] = tokens
+        return "\n".join(kept) or "なし"
+
+    def _record(self, total: int):
+        with _stats_lock:
+            stats = _usage_stats.setdefault(
+                self.site, {"prompts": 0, "tokens": 0, "max_tokens": 0, "dropped_lines": 0}
+            )
+            stats["prompts"] += 1
+            stats["tokens"] += total
+            stats["max_tokens"] = max(stats["max_tokens"], total)
+            stats["dropped_lines"] += self.dropped_lines
+
+
+def prompt_usage_stats() -> Dict[str, Dict[str, int]]:
+    """呼び出し箇所ごとのプロンプトのトークン数（推定）の集計"""
+    with _stats_lock:
+        return {
+            site: {**stats, "budget": PROMPT_TOKEN_BUDGETS.get(site)}
+            for site, stats in _usage_stats.items()
+        }
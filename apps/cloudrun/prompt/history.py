@@ -0,0 +1,51 @@
+from typing import Iterable, Iterator, Optional, Union
+
+from prompt.budget import OMITTED_NOTICE, PromptBuilder, estimate_tokens, fit_lines
+from prompt.serializer import merged_turns, render_fields
+
+
+def comment_lines(comments: Union[str, Iterable[dict]]) -> Iterator[str]:
+    """発言履歴を1行1ターンのテキストとして1行ずつ返す（描画済みのテキストは行に分ける）"""
+    if isinstance(comments, str):
+        return iter(comments.splitlines())
+    return merged_turns(comments)
+
+
+def render_comment_history(
+    comments: Union[str, Iterable[dict]], max_tokens: Optional[int] = None
+) -> str:
+    """
+    発言履歴をプロンプト用のテキスト（1行1ターン）にする。
+
+    イテレータを渡すと1件ずつ読みながら書き出すため、発言の辞書を一度にメモリに載せない。
+    `max_tokens` を指定すると新しい発言から収まるだけを残し、古い発言は省略する。
+    """
+    lines = comment_lines(comments)
+    if max_tokens is None:
+        return "".join(f"{line}\n" for line in lines)
+    kept, dropped, _ = fit_lines(
+        lines, max(0, max_tokens - estimate_tokens(OMITTED_NOTICE) - 2)
+    )
+    if dropped:
+        kept.insert(0, OMITTED_NOTICE.format(dropped))
+    return "".join(f"{line}\n" for line in kept)
+
+
+def build_prompt(
+    site: str,
+    fields: dict,
+    comments: Union[str, Iterable[dict]],
+    summary: Optional[str] = None,
+) -> str:
+    """
+    会議の情報（`fields`）の後に、呼び出し箇所の予算に収めた発言履歴を続けたプロンプトを作る。
+
+    会議の要約（`summary`）がある場合は、`comments` を要約以降の発言として要約の後に続ける。
+    """
+    builder = PromptBuilder(site).add("会議情報", render_fields(fields))
+    if summary:
+        builder.add("これまでの要約", summary, heading="これまでの要約:\n")
+        heading = "これまでの要約以降の発言履歴:\n"
+    else:
+        heading = "発言履歴:\n"
+    return builder.add_history("発言履歴", comment_lines(comments), heading=heading).build()
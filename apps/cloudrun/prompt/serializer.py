@@ -0,0 +1,97 @@
+from typing import Any, Iterable, Iterator, List, Tuple
+
+from pydantic import BaseModel
+
+
+def _items(value: Any) -> List[Tuple[str, Any]]:
+    """
+    辞書・pydantic モデルの空でない項目を決まった順で返す。
+
+    モデルはフィールドの定義順、辞書（Firestoreから読んだものなど）はキーの順に並べる。
+    """
+    if isinstance(value, BaseModel):
+        items = [(key, getattr(value, key)) for key in type(value).model_fields]
+    else:
+        items = sorted(value.items())
+    return [(key, item) for key, item in items if not _is_empty(item)]
+
+
+def _is_mapping(value: Any) -> bool:
+    return isinstance(value, (dict, BaseModel))
+
+
+def _is_empty(value: Any) -> bool:
+    return value is None or value == "" or value == [] or value == {}
+
+
+def _scalar(value: Any) -> str:
+    return " ".join(str(value).split())  # 改行や連続した空白を1つにまとめる
+
+
+def _inline(value: Any) -> str:
+    """リストの要素を1行で表す（辞書・モデルは `キー: 値` を並べる）"""
+    if _is_mapping(value):
+        return ", ".join(f"{key}: {_inline(item)}" for key, item in _items(value))
+    if isinstance(value, (list, tuple)):
+        return ", ".join(_inline(item) for item in value if not _is_empty(item))
+    return _scalar(value)
+
+
+def render_fields(fields: dict) -> str:
+    """
+    プロンプトに入れる会議の情報を、キーの順に1項目ずつのテキストにする。
+
+    - str(dict) と違い、引用符・エスケープ・pydantic の repr・None の項目を含まない。
+    - 値が文字列のリストなら `キー: a, b`、辞書やモデルを含むなら箇条書きにする。
+    - 項目の順序が決まっているため、同じ内容なら必ず同じ文字列になる。
+    """
+    lines: List[str] = []
+    for key, value in fields.items():
+        if _is_empty(value):
+            continue
+        if _is_mapping(value):
+            lines.append(f"{key}:")
+            lines.extend(f"- {item_key}: {_inline(item)}" for item_key, item in _items(value))
+        elif isinstance(value, (list, tuple)) and any(
+            _is_mapping(item) or isinstance(item, (list, tuple)) for item in value
+        ):
+            lines.append(f"{key}:")
+            lines.extend(f"- {_inline(item)}" for item in value if not _is_empty(item))
+        else:
+            lines.append(f"{key}: {_inline(value)}")
+    return "\n".join(lines)
+
+
+def _time_of(speak_at: str) -> str:
+    """`YYYY-MM-DD HH:MM:SS` の発言時刻を `HH:MM` にする（会議は1日の中で行う前提）"""
+    parts = speak_at.split(" ")
+    if len(parts) == 2 and parts[1].count(":") == 2:
+        return parts[1][:5]
+    return speak_at
+
+
+def merged_turns(comments: Iterable[dict]) -> Iterator[str]:
+    """
+    発言を1行1ターンのテキストとして1行ずつ返す。
+
+    同じ発言者が続けて話した発言は、最初の発言の時刻の1行にまとめる。
+    models.Message 形式（content / meta.speak_at）の発言も受け付ける。
+    """
+    speaker = None
+    speak_at = ""
+    messages: List[str] = []
+    for comment in comments:
+        current = comment.get("speaker", "")
+        message = _scalar(comment.get("message", comment.get("content", "")))
+        if messages and current == speaker:
+            messages.append(message)
+            continue
+        if messages:
+            yield f"[{speak_at}] {speaker}: {' '.join(messages)}"
+        speaker = current
+        speak_at = _time_of(
+            comment.get("speak_at") or (comment.get("meta") or {}).get("speak_at", "")
+        )
+        messages = [message]
+    if messages:
+        yield f"[{speak_at}] {speaker}: {' '.join(messages)}"
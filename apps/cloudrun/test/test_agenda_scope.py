@@ -0,0 +1,102 @@
+import pytest
+
+import minutes.minutes as minutes
+from minutes.constants import MinutesFields
+
+
+def _existing(completed=(False, False, False)):
+    return {
+        MinutesFields.AGENDA: [
+            {"id": i + 1, "topic": topic, "duration": 10, "completed": done}
+            for i, (topic, done) in enumerate(zip(["現状共有", "予算の見直し", "次回の予定"], completed))
+        ],
+        MinutesFields.DECISIONS: [],
+        MinutesFields.ACTION_PLAN: [],
+    }
+
+
+@pytest.fixture
+def extractors(monkeypatch):
+    """抽出関数の代わりに、アジェンダの判定に渡したプロンプトを記録する"""
+    agenda_prompts = []
+
+    def fake_agenda(message):
+        agenda_prompts.append(message)
+        return {"completed_agenda_ids": ["1", "3"]}
+
+    monkeypatch.setattr(minutes, "MINUTES_EXTRACTION_MODE", "separate")
+    monkeypatch.setattr(minutes, "update_decision", lambda message: {})
+    monkeypatch.setattr(minutes, "update_action_plan", lambda message: {})
+    monkeypatch.setattr(minutes, "update_agenda", fake_agenda)
+    monkeypatch.setattr(minutes, "_agenda_check_stats", type(minutes._agenda_check_stats)())
+    return agenda_prompts
+
+
+def _history(text):
+    return [{"seq": 1, "speaker": "A", "message": text, "speak_at": "2025-01-01 10:00:00"}]
+
+
+def test_checks_only_active_and_next_item(extractors):
+    updates = minutes.should_update_minutes(
+        _history("現状はこれで共有できたので次に進みましょう"), _existing(), "m1"
+    )
+    prompt = extractors[0]
+    assert "現状共有 (ID: 1, 現在のアジェンダ)" in prompt
+    assert "予算の見直し (ID: 2, 次のアジェンダ)" in prompt
+    assert "次回の予定" not in prompt
+    # 対象外の項目（ID: 3）は完了にしない
+    assert updates["agenda_update"]["completed_agenda_ids"] == ["1"]
+
+
+def test_skips_when_message_cannot_close_an_item(extractors):
+    updates = minutes.should_update_minutes(
+        _history("先月の売上は前年よりも少し伸びていました"), _existing(), "m1"
+    )
+    assert extractors == []
+    assert updates.get("agenda_update", {}) == {}
+
+
+def test_skips_when_all_items_completed(extractors):
+    minutes.should_update_minutes(
+        _history("それでは次に進みましょう、以上です"), _existing((True, True, True)), "m1"
+    )
+    assert extractors == []
+    stats = minutes.agenda_check_stats()["m1"]
+    assert stats[minutes.AGENDA_SKIPPED_ALL_COMPLETED] == 1
+    assert stats["llm_calls_saved"] == 1
+
+
+def test_mentioning_next_topic_triggers_check(extractors):
+    minutes.should_update_minutes(_history("そろそろ予算の見直しについて話したいです"), _existing(), "m1")
+    assert len(extractors) == 1
+
+
+def test_extraction_timeout_counts_from_task_start(monkeypatch):
+    """スレッドの空きを待つ時間はタイムアウトに含めず、実行が始まってから超過した抽出だけを記録する"""
+    import threading
+    import time
+    from concurrent.futures import ThreadPoolExecutor
+
+    release = threading.Event()
+    monkeypatch.setattr(minutes, "MINUTES_EXTRACTION_CONCURRENT", True)
+    monkeypatch.setattr(minutes, "MINUTES_EXTRACTION_TIMEOUT_SECONDS", 0.3)
+    monkeypatch.setattr(minutes, "_extraction_executor", ThreadPoolExecutor(max_workers=1))
+    monkeypatch.setattr(minutes, "_extraction_timeouts", {})
+
+    def slow(message):
+        time.sleep(0.2)  # 単独ならタイムアウトしない
+        return {"ok": message}
+
+    def hang(message):
+        release.wait(5)
+        return {"ok": message}
+
+    # 1スレッドで順に実行するため、2件目は1件目の間待つが、タイムアウトにはならない
+    results = minutes.run_extractors({"first": (slow, "1"), "second": (slow, "2")})
+    assert results["first"] == {"ok": "1"} and results["second"] == {"ok": "2"}
+    assert results["timed_out"] == []
+
+    results = minutes.run_extractors({"hang": (hang, "3")})
+    release.set()
+    assert results["hang"] == {} and results["timed_out"] == ["hang"]
+    assert minutes.extraction_stats()["timeouts"] == {"hang": 1}
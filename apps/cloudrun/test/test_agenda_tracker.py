@@ -0,0 +1,54 @@
+from minutes.agenda_tracker import (
+    mark_agenda_completed,
+    meeting_progress,
+    parse_meeting_time,
+    progress_prompt_fields,
+)
+
+MEETING = {"start_date": "2025-01-01", "start_time": "10:00", "end_time": "11:00"}
+
+
+def _agenda():
+    return [
+        {"id": 1, "topic": "振り返り", "duration": 10, "completed": False},
+        {"id": 2, "topic": "予算", "duration": 20, "completed": False},
+        {"id": 3, "topic": "次回", "duration": 10, "completed": False},
+    ]
+
+
+def _at(hhmm: str):
+    return parse_meeting_time("2025-01-01", hhmm)
+
+
+def test_first_item_starts_at_meeting_start():
+    progress = meeting_progress(MEETING, _agenda(), now=_at("10:04"))
+    assert progress["active"]["id"] == 1
+    assert progress["active"]["elapsed_minutes"] == 4
+    assert progress["remaining_minutes"] == 56
+    assert progress["remaining_planned_minutes"] == 6 + 20 + 10
+
+
+def test_completion_records_times_and_starts_next_item():
+    agenda = _agenda()
+    assert mark_agenda_completed(agenda, ["1"], "2025-01-01 10:15:00")
+    assert agenda[0]["completed_at"] == "2025-01-01 10:15:00"
+    assert agenda[1]["started_at"] == "2025-01-01 10:15:00"
+    assert not mark_agenda_completed(agenda, ["1"], "2025-01-01 10:20:00")
+
+    progress = meeting_progress(MEETING, agenda, now=_at("10:45"))
+    assert progress["active"]["id"] == 2
+    assert progress["active"]["elapsed_minutes"] == 30
+    assert progress["unfinished"] == 2
+    assert progress["remaining_planned_minutes"] == 10
+
+
+def test_all_completed():
+    agenda = _agenda()
+    mark_agenda_completed(agenda, ["1", "2", "3"], "2025-01-01 10:30:00")
+    progress = meeting_progress(MEETING, agenda, now=_at("10:31"))
+    assert progress["active"] is None
+    assert progress_prompt_fields(progress) == {"アジェンダの進行": "すべてのアジェンダが完了"}
+
+
+def test_invalid_meeting_times():
+    assert meeting_progress({"start_date": "2025-01-01"}, _agenda()) is None
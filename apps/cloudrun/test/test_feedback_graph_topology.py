@@ -0,0 +1,95 @@
+import json
+import threading
+import time
+import agent.feedback_agent as feedback_agent
+import cache.llm_cache as llm_cache
+from agent.feedback_agent import AgendaItem, MeetingInput
+
+LLM_LATENCY_SECONDS = 0.05
+# 並列構成で summarize と evaluate が揃うのを待つ上限（揃わなければ同時に走っていない）
+BARRIER_TIMEOUT_SECONDS = 10
+
+class _Response:
+    def __init__(self, text: str):
+        self.text = text
+
+class _FakeModel:
+    """
+    システムプロンプトに応じて固定のJSONを返すGeminiモデルの代替。
+
+    呼び出しごとに (種類, 開始, 終了) を `calls` に記録する。`barrier` を渡すと、
+    要約と評価の呼び出しは両方が揃うまで待つ（同時に走っていなければタイムアウトする）。
+    """
+    model_name = "fake"
+
+    def __init__(self, system_instruction: str, calls: list, barrier=None):
+        self.system_instruction = system_instruction
+        self.calls = calls
+        self.barrier = barrier
+
+    def _kind(self) -> str:
+        if "要約する専門" in self.system_instruction:
+            return "summarize"
+        if "評価する専門" in self.system_instruction:
+            return "evaluate"
+        return "facilitate"
+
+    def generate_content(self, prompt, generation_config=None):
+        kind = self._kind()
+        started = time.perf_counter()
+        if self.barrier is not None and kind != "facilitate":
+            self.barrier.wait()
+        time.sleep(LLM_LATENCY_SECONDS)
+        self.calls.append((kind, started, time.perf_counter()))
+        if kind == "summarize":
+            return _Response(json.dumps({"要約": "要約結果"}))
+        if kind == "evaluate":
+            return _Response(json.dumps({"参加者の関与度": "高", "議論の具体性": "中", "議論の方向性": "良"}))
+        return _Response(json.dumps({"次の発言": "次に進みましょう"}))
+
+def _meeting_input() -> MeetingInput:
+    return MeetingInput(
+        purpose="プロダクトのアイデアを決める",
+        agenda=[AgendaItem(topic="アイデア出し", duration=10)],
+        participants=["A", "B"],
+        comment_history=[{"speaker": "A", "message": "アイデアを出しましょう"}]
+    )
+
+def _run(monkeypatch, topology: str, barrier=None):
+    # すべての呼び出しがモデルに届くよう、応答のキャッシュは使わない
+    monkeypatch.setattr(llm_cache, "LLM_CACHE_ENABLED", False)
+    calls = []
+    monkeypatch.setattr(
+        feedback_agent,
+        "init_gemini",
+        lambda system_instruction=None: _FakeModel(system_instruction, calls, barrier),
+    )
+    graph = feedback_agent.create_meeting_feedback_graph(topology)
+    monkeypatch.setattr(feedback_agent, "get_meeting_feedback_graph", lambda topology=None: graph)
+    result = feedback_agent.process_meeting_feedback(_meeting_input(), topology=topology)
+    return result, {kind: (started, ended) for kind, started, ended in calls}
+
+def _overlaps(a, b) -> bool:
+    return a[0] < b[1] and b[0] < a[1]
+
+def test_parallel_topology_joins_before_facilitate(monkeypatch):
+    """並列構成でも要約・評価の両方が揃った状態で facilitate が実行される"""
+    barrier = threading.Barrier(2, timeout=BARRIER_TIMEOUT_SECONDS)
+    result, calls = _run(monkeypatch, "parallel", barrier)
+
+    assert result.message == "次に進みましょう"
+    assert result.detail.summary == "要約結果"
+    assert result.detail.evaluation.engagement == "高"
+    # summarize と evaluate が同時に走り（バリアを通過できた）、両方が終わってから facilitate が始まる
+    assert not barrier.broken
+    assert _overlaps(calls["summarize"], calls["evaluate"])
+    assert calls["facilitate"][0] >= max(calls["summarize"][1], calls["evaluate"][1])
+
+def test_sequential_topology(monkeypatch):
+    """直列構成（比較用）でも同じ結果が得られる"""
+    result, calls = _run(monkeypatch, "sequential")
+
+    assert result.message == "次に進みましょう"
+    assert result.detail.summary == "要約結果"
+    assert result.detail.evaluation.direction == "良"
+    assert not _overlaps(calls["summarize"], calls["evaluate"])
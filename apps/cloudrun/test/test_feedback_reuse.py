@@ -0,0 +1,77 @@
+import pytest
+import agent.feedback_repository as feedback_repository
+import agent.feedback_service as feedback_service
+from cache.ttl_cache import TTLCache
+
+
+class FakeFeedback:
+    message = "議論を整理しましょう"
+
+    class detail:
+        summary = "要約"
+
+        class evaluation:
+            @staticmethod
+            def model_dump():
+                return {"score": 3}
+
+        @classmethod
+        def model_dump(cls):
+            return {"summary": cls.summary, "evaluation": cls.evaluation.model_dump()}
+
+
+@pytest.fixture
+def service(monkeypatch):
+    """Firestore・LLMの代わりに、履歴のバージョンと生成回数を記録する"""
+    state = {"version": 3, "generated": 0, "queried": 0}
+
+    def fake_process(meeting_input):
+        state["generated"] += 1
+        return FakeFeedback
+
+    class FakeFeedbacksRef:
+        def add(self, data):
+            pass
+
+        def where(self, filter=None):
+            state["queried"] += 1
+            return self
+
+        def limit(self, count):
+            return self
+
+        def get(self):
+            return []
+
+    monkeypatch.setattr(feedback_repository, "_latest_feedback", TTLCache(10, 60))
+    monkeypatch.setattr(feedback_repository, "_feedbacks_ref", lambda meeting_id: FakeFeedbacksRef())
+    monkeypatch.setattr(feedback_service, "get_meeting_data", lambda meeting_id: {
+        "start_date": "2025-01-01", "start_time": "10:00", "end_time": "11:00",
+        "agenda": [], "meeting_purpose": "目的", "participants": [],
+    })
+    monkeypatch.setattr(feedback_service, "get_history_version", lambda meeting_id: state["version"])
+    monkeypatch.setattr(feedback_service, "summary_and_recent_history", lambda meeting_id: ("", iter([])))
+    monkeypatch.setattr(feedback_service, "process_meeting_feedback", fake_process)
+    monkeypatch.setattr(feedback_service, "post_message", lambda *args, **kwargs: None)
+    monkeypatch.setattr(feedback_service, "get_participation_stats", lambda meeting_id, participants: {
+        "total_turns": 0, "total_chars": 0, "speakers": [], "transitions": {},
+    })
+    return state
+
+
+def test_reuses_feedback_until_history_changes(service):
+    first = feedback_service.generate_feedback("m1")
+    assert service["generated"] == 1
+    assert feedback_service.generate_feedback("m1") == first
+    assert service["generated"] == 1
+    assert service["queried"] == 1  # 2回目はプロセス内のキャッシュから返す
+
+    service["version"] = 4
+    feedback_service.generate_feedback("m1")
+    assert service["generated"] == 2
+
+
+def test_force_regenerates(service):
+    feedback_service.generate_feedback("m1")
+    feedback_service.generate_feedback("m1", force=True)
+    assert service["generated"] == 2
@@ -0,0 +1,59 @@
+import agent.intervention_gate as gate
+from minutes.agenda_tracker import meeting_progress, parse_meeting_time
+
+MEETING = {
+    "participants": ["A", "B", "C"],
+    "start_date": "2025-01-01",
+    "start_time": "10:00",
+    "end_time": "11:00",
+}
+AGENDA = [
+    {"id": 1, "topic": "前回の振り返り", "duration": 10, "completed": True, "completed_at": "2025-01-01 10:10:00"},
+    {"id": 2, "topic": "予算", "duration": 20, "completed": False, "started_at": "2025-01-01 10:10:00"},
+    {"id": 3, "topic": "次回の予定", "duration": 10, "completed": False},
+]
+
+
+def _progress(hhmm: str, agenda=AGENDA):
+    return meeting_progress(MEETING, agenda, now=parse_meeting_time("2025-01-01", hhmm))
+
+
+def _messages(speakers: str):
+    return [{"speaker": s, "message": "発言"} for s in speakers]
+
+
+def test_no_signal_for_balanced_meeting_on_schedule():
+    signals = gate.detect_signals(MEETING, _messages("ABCABCABCA"), _progress("10:15"))
+    assert signals == {}
+
+
+def test_speaker_imbalance():
+    signals = gate.detect_signals(MEETING, _messages("AAAAAAAABC"), _progress("10:15"))
+    assert set(signals) == {gate.SIGNAL_SPEAKER_IMBALANCE}
+
+
+def test_ping_pong_needs_three_participants():
+    messages = _messages("CABABABABAB")
+    assert gate.SIGNAL_PING_PONG in gate.detect_signals(MEETING, messages)
+    two_people = {**MEETING, "participants": ["A", "B"]}
+    assert gate.SIGNAL_PING_PONG not in gate.detect_signals(two_people, messages)
+
+
+def test_agenda_overrun_and_time_shortage():
+    # 予算は 10:10 に始まり予定20分。10:35 時点で25分経過、残り25分に対して次回の予定が10分
+    signals = gate.detect_signals(MEETING, [], _progress("10:35"))
+    assert set(signals) == {gate.SIGNAL_AGENDA_OVERRUN}
+    # 10:55 時点では残り5分に対して次回の予定が10分
+    signals = gate.detect_signals(MEETING, [], _progress("10:55"))
+    assert set(signals) == {gate.SIGNAL_AGENDA_OVERRUN, gate.SIGNAL_TIME_SHORTAGE}
+
+
+def test_no_time_signal_before_meeting_starts():
+    assert gate.detect_signals(MEETING, [], _progress("09:00")) == {}
+
+
+def test_time_signal_trigger_is_keyed_by_agenda_item():
+    trigger, reason = gate.time_signal_trigger(_progress("10:35"))
+    assert trigger == "agenda_overrun:2"
+    assert "予算" in reason
+    assert gate.time_signal_trigger(_progress("10:15")) == (None, None)
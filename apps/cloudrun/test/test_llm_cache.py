@@ -0,0 +1,50 @@
+import time
+import cache.llm_cache as llm_cache_module
+from cache.llm_cache import MemoryLLMCache, SQLiteLLMCache, cached_llm_call, llm_cache_key
+from cache.ttl_cache import MISSING
+
+
+def test_key_depends_on_every_part():
+    base = llm_cache_key("model", "system", {"temperature": 0.1}, "prompt")
+    assert base == llm_cache_key("model", "system", {"temperature": 0.1}, "prompt")
+    assert base != llm_cache_key("model", "system", {"temperature": 0.2}, "prompt")
+    assert base != llm_cache_key("model", "other", {"temperature": 0.1}, "prompt")
+    assert base != llm_cache_key("model", "system", {"temperature": 0.1}, "prompt", tools=["agenda"])
+
+
+def test_cached_call_generates_once_and_bypasses_high_temperature(monkeypatch):
+    monkeypatch.setattr(llm_cache_module, "llm_cache", MemoryLLMCache(10, 60))
+    monkeypatch.setattr(llm_cache_module, "LLM_CACHE_MAX_TEMPERATURE", 0.5)
+    calls = []
+
+    def generate():
+        calls.append(1)
+        return {"args": ["a"]}
+
+    first = cached_llm_call("k", generate, temperature=0.1)
+    first["args"].append("変更しても影響しない")
+    assert cached_llm_call("k", generate, temperature=0.1) == {"args": ["a"]}
+    assert len(calls) == 1
+
+    cached_llm_call("k", generate, temperature=0.7)
+    cached_llm_call("k", generate, bypass=True)
+    assert len(calls) == 3
+
+
+def test_sqlite_cache_expires_and_evicts_least_recently_used(tmp_path):
+    cache = SQLiteLLMCache(str(tmp_path / "llm.sqlite3"), max_size=2, ttl_seconds=60)
+    cache.set("a", "A")
+    time.sleep(0.01)
+    cache.set("b", "B")
+    time.sleep(0.01)
+    assert cache.get("a") == "A"  # a を最近使ったことにする
+    time.sleep(0.01)
+    cache.set("c", "C")
+
+    assert cache.get("b") is MISSING
+    assert cache.get("a") == "A"
+    assert cache.stats()["evictions"] == 1
+
+    expired = SQLiteLLMCache(str(tmp_path / "expired.sqlite3"), max_size=2, ttl_seconds=0)
+    expired.set("a", "A")
+    assert expired.get("a") is MISSING
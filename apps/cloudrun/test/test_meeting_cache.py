@@ -0,0 +1,60 @@
+import time
+import pytest
+import meeting.meeting_cache as meeting_cache
+from cache.ttl_cache import MISSING, TTLCache
+
+
+@pytest.fixture
+def fetch_calls(monkeypatch):
+    """Firestoreの代わりに呼び出し回数を記録する"""
+    calls = []
+
+    def fake_fetch(meeting_id):
+        calls.append(meeting_id)
+        return {"meeting_purpose": f"purpose-{meeting_id}", "participants": ["A"]}
+
+    monkeypatch.setattr(meeting_cache, "_fetch_meeting", fake_fetch)
+    monkeypatch.setattr(meeting_cache, "_process_cache", TTLCache(max_size=2, ttl_seconds=60))
+    return calls
+
+
+def test_ttl_cache_expires_and_evicts_lru():
+    cache = TTLCache(max_size=2, ttl_seconds=0.05)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)  # 最も使われていない b が追い出される
+    assert cache.get("b") is MISSING
+    time.sleep(0.06)
+    assert cache.get("a") is MISSING
+
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 2
+    assert stats["evictions"] == 1
+
+
+def test_request_scope_reads_meeting_once(fetch_calls):
+    """リクエスト内の2回目以降はFirestoreもプロセスキャッシュも参照しない"""
+    with meeting_cache.request_scope():
+        first = meeting_cache.get_meeting_data("m1")
+        first["meeting_purpose"] = "変更しても影響しない"
+        second = meeting_cache.get_meeting_data("m1")
+
+    assert fetch_calls == ["m1"]
+    assert second["meeting_purpose"] == "purpose-m1"
+    assert meeting_cache.meeting_cache_stats()["misses"] == 1
+
+
+def test_process_cache_is_shared_and_invalidated_on_write(fetch_calls):
+    """リクエストをまたいでプロセスキャッシュを使い、自分の書き込みで無効化する"""
+    with meeting_cache.request_scope():
+        meeting_cache.get_meeting_data("m1")
+    with meeting_cache.request_scope():
+        meeting_cache.get_meeting_data("m1")
+    assert fetch_calls == ["m1"]
+
+    with meeting_cache.request_scope():
+        meeting_cache.invalidate_meeting("m1")
+        meeting_cache.get_meeting_data("m1")
+    assert fetch_calls == ["m1", "m1"]
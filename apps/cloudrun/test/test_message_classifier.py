@@ -0,0 +1,98 @@
+import pytest
+
+import minutes.message_classifier as classifier_module
+import minutes.minutes as minutes
+from minutes.constants import MinutesFields
+from minutes.message_classifier import (
+    LABEL_ACTION,
+    LABEL_AGENDA,
+    LABEL_DECISION,
+    MessageClassifier,
+    NaiveBayesClassifier,
+    evaluate,
+)
+
+
+def test_rules():
+    classifier = MessageClassifier()
+    # 短くても決定を示す発言は抽出の対象にする（決定は議題の区切りにもなる）
+    assert classifier.classify("それで決定で") == {LABEL_DECISION, LABEL_AGENDA}
+    assert classifier.classify("A案で確定") == {LABEL_DECISION}
+    assert classifier.classify("資料は田中さんが来週までに作成します") == {LABEL_ACTION}
+    assert classifier.classify("この議題は以上です") == {LABEL_AGENDA}
+    assert classifier.classify("昨日の雨はすごかったですね、駅まで濡れてしまいました") == set()
+
+
+def test_naive_bayes_learns_from_outcomes():
+    records = [
+        {"message": "ロゴは青で確定", "outcomes": {LABEL_DECISION: True, LABEL_ACTION: None}},
+        {"message": "青のロゴで確定しよう", "outcomes": {LABEL_DECISION: True}},
+        {"message": "ロゴの色どうしましょうか", "outcomes": {LABEL_DECISION: False}},
+        {"message": "天気がいいですね", "outcomes": {LABEL_DECISION: False}},
+    ]
+    model = NaiveBayesClassifier.train(records)
+    # 抽出しなかった（None の）ラベルは学習しない
+    assert LABEL_ACTION not in model.docs
+    assert model.predict("デザインは青で確定") == {LABEL_DECISION}
+    restored = NaiveBayesClassifier.from_dict(model.to_dict())
+    assert restored.probability("天気", LABEL_DECISION) == model.probability("天気", LABEL_DECISION)
+
+    metrics = evaluate(MessageClassifier(model), records)
+    assert metrics[LABEL_DECISION]["recall"] == 1.0
+
+
+@pytest.fixture
+def extractors(monkeypatch):
+    """抽出関数の代わりに、呼ばれた抽出を記録する"""
+    called = []
+
+    def fake(name, result):
+        def extract(message):
+            called.append(name)
+            return result
+        return extract
+
+    monkeypatch.setattr(minutes, "MINUTES_EXTRACTION_MODE", "separate")
+    monkeypatch.setattr(minutes, "update_decision", fake("decision", {"add_decision": True, "add_decision_text": "決定"}))
+    monkeypatch.setattr(minutes, "update_action_plan", fake("action", {}))
+    monkeypatch.setattr(minutes, "update_agenda", fake("agenda", {}))
+    monkeypatch.setattr(classifier_module, "_stats", classifier_module._ClassifierStats())
+    monkeypatch.setattr(minutes, "_agenda_check_stats", type(minutes._agenda_check_stats)())
+    return called
+
+
+def _minutes():
+    return {
+        MinutesFields.AGENDA: [{"id": 1, "topic": "ロゴ", "duration": 10, "completed": False}],
+        MinutesFields.DECISIONS: [],
+        MinutesFields.ACTION_PLAN: [],
+    }
+
+
+def _history(text):
+    return [{"seq": 1, "speaker": "A", "message": text, "speak_at": "2025-01-01 10:00:00"}]
+
+
+def test_routes_only_to_matching_extractors(extractors):
+    updates = minutes.should_update_minutes(_history("A案で確定"), _minutes(), "m1")
+    assert extractors == ["decision"]
+    assert updates["actions_update"] == {}
+
+    stats = classifier_module.message_classifier_stats()
+    # アジェンダの完了判定の省略はアジェンダ側でだけ数える
+    assert stats["extractor_calls_saved"] == 1
+    assert minutes.agenda_check_stats()["m1"]["llm_calls_saved"] == 1
+    assert stats["labels"][LABEL_DECISION]["tp"] == 1
+
+
+def test_combined_mode_counts_skipped_extractors(extractors, monkeypatch):
+    monkeypatch.setattr(minutes, "MINUTES_EXTRACTION_MODE", "combined")
+    monkeypatch.setattr(minutes, "update_minutes_combined", lambda message: {"decisions_update": {}})
+    minutes.should_update_minutes(_history("A案で確定"), _minutes(), "m1")
+
+    assert classifier_module.message_classifier_stats()["extractor_calls_saved"] == 1
+
+
+def test_chit_chat_skips_all_extractors(extractors):
+    assert minutes.should_update_minutes(_history("昨日の雨はすごかったですね、駅まで濡れてしまいました"), _minutes(), "m1") == {}
+    assert extractors == []
@@ -0,0 +1,134 @@
+from datetime import datetime, timedelta
+
+import pytz
+from google.cloud import firestore
+
+import message.message as message_module
+from message.message import backfill_order, iter_message_history
+from message.message_store import MessageStore
+from message.participation import speaker_key
+
+
+def _message(seq: int) -> dict:
+    return {"seq": seq, "speak_at": f"2025-01-26 10:00:{seq:02d}", "speaker": "A", "message": f"発言{seq}"}
+
+
+def test_iter_pages_firestore_when_store_cannot_serve(monkeypatch):
+    """ストアに載っていない会議は、ストアに全体を読み込まずに cursor を進めながらページ単位で読む"""
+    pages = []
+
+    def fake_page(meeting_id, after, page_size):
+        pages.append(after)
+        start = (after or 0) + 1
+        return [_message(seq) for seq in range(start, min(start + page_size, 8))]
+
+    monkeypatch.setattr(message_module, "message_store", MessageStore(10, 5, keep_full_log=True))
+    monkeypatch.setattr(message_module, "_load_message_history", None)
+    monkeypatch.setattr(message_module, "_query_history_page", fake_page)
+
+    history = iter_message_history("m1", since=1, page_size=3)
+    assert pages == []  # 読み始めるまでFirestoreを読まない
+    assert [m["seq"] for m in history] == [2, 3, 4, 5, 6, 7]
+    assert pages == [1, 4, 7]
+    assert message_module.message_store.stats()["meetings"] == 0
+
+
+def test_iter_serves_copies_from_store(monkeypatch):
+    """ストアに揃っていればFirestoreを読まず、コピーを返す"""
+    store = MessageStore(10, 5, keep_full_log=True)
+    store.start_loading("m1")
+    store.finish_loading("m1", [(f"doc{seq}", _message(seq)) for seq in range(1, 4)], truncated=False)
+    monkeypatch.setattr(message_module, "message_store", store)
+    monkeypatch.setattr(message_module, "_query_history_page", None)
+
+    for message in iter_message_history("m1"):
+        message["message"] = "変更"
+    assert [m["message"] for m in store.get("m1", None)] == ["発言1", "発言2", "発言3"]
+
+
+def test_backfill_order_puts_legacy_messages_first():
+    """連番のない古い発言は speak_at の順に先頭に、まだ連番のない新しい発言は created_at の順に末尾に並べる"""
+    created = pytz.utc.localize(datetime(2025, 1, 26, 2, 0))
+    records = [
+        ("new2", {"seq": None, "created_at": created + timedelta(seconds=2)}),
+        ("seq2", {"seq": 2, "speak_at": "2025-01-26 10:00:00"}),
+        ("legacy2", {"speak_at": "2025-01-26 09:00:02"}),
+        ("new1", {"seq": None, "created_at": created + timedelta(seconds=1)}),
+        ("seq1", {"seq": 1, "speak_at": "2025-01-26 10:00:00"}),
+        ("legacy1", {"speak_at": "2025-01-26 09:00:01"}),
+    ]
+
+    assert [doc_id for doc_id, _ in backfill_order(records)] == [
+        "legacy1", "legacy2", "seq1", "seq2", "new1", "new2"
+    ]
+
+
+def test_assign_seq_runs_batches_and_writes_through_to_store(monkeypatch):
+    """連番はバッチごとに付け、付けた発言（AI以外）をストアにも反映する"""
+    store = MessageStore(10, 5, keep_full_log=True)
+    store.start_loading("m1")
+    store.finish_loading("m1", [("doc1", _message(1))], truncated=False)
+    batches = [
+        [("doc2", {**_message(2), "role": "human"}), ("doc3", {**_message(3), "role": "ai"})],
+        [("doc4", {**_message(4), "role": "human"})],
+    ]
+    monkeypatch.setattr(message_module, "message_store", store)
+    monkeypatch.setattr(message_module, "MESSAGE_SEQ_BATCH_SIZE", 2)
+    monkeypatch.setattr(message_module, "_assign_seq_batch", lambda transaction, meeting_id: batches.pop(0))
+
+    assert message_module.assign_message_seq("m1") == 3
+    assert batches == []
+    # AIの発言は保持しないが連番は進むので、飛びとはみなさない
+    assert [m["seq"] for m in store.get("m1", None)] == [1, 2, 4]
+
+
+class _FakeBatch:
+    def __init__(self, commits):
+        self.commits = commits
+        self.updates = []
+
+    def update(self, ref, data):
+        self.updates.append((ref, data))
+
+    def commit(self):
+        assert len(self.updates) <= 500  # Firestore の1回の書き込みの上限
+        self.commits.append(self.updates)
+
+
+def test_backfill_writes_long_meetings_in_chunks(monkeypatch):
+    """500件を超える古い発言も、チャンクごとのバッチで連番の大きい方から書き込み、統計は最後に1回だけ書く"""
+    records = [
+        (f"legacy{i}", {"speak_at": f"2025-01-26 09:{i // 60:02d}:{i % 60:02d}", "speaker": "A", "message": "発言"})
+        for i in range(650)
+    ] + [("new", {"seq": None, "speaker": "B", "message": "新しい発言"})]
+    commits = []
+    stats_updates = []
+    stats_ref = type("StatsRef", (), {"update": lambda self, data: stats_updates.append(data)})()
+    comments_ref = type("CommentsRef", (), {"document": lambda self, doc_id: doc_id})()
+    db = type("DB", (), {"batch": lambda self: _FakeBatch(commits), "transaction": lambda self: None})()
+
+    monkeypatch.setattr(message_module, "db_client", db)
+    monkeypatch.setattr(message_module, "MESSAGE_BACKFILL_CHUNK_SIZE", 300)
+    monkeypatch.setattr(message_module, "_start_backfill", lambda transaction, meeting_id: None)
+    monkeypatch.setattr(message_module, "_message_stats_ref", lambda meeting_id: stats_ref)
+    monkeypatch.setattr(message_module, "_comments_ref", lambda meeting_id: comments_ref)
+    monkeypatch.setattr(
+        message_module,
+        "_backfill_records",
+        lambda meeting_id: backfill_order([r for r in records if r[1].get("seq", 0) is not None]),
+    )
+
+    assert message_module.backfill_message_seq("m1") == (650, False)
+
+    assert [len(updates) for updates in commits] == [300, 300, 50]
+    written = [update for updates in commits for update in updates]
+    assert written[0] == ("legacy649", {"seq": 650, "role": "human"})
+    assert written[-1] == ("legacy0", {"seq": 1, "role": "human"})
+    # まだ連番のない発言は振り直さず、採番に任せる
+    assert "new" not in {doc_id for doc_id, _ in written}
+
+    assert len(stats_updates) == 1
+    stats = stats_updates[0]
+    assert stats["last_seq"] == 650 and stats["last_human_seq"] == 650
+    assert stats["participation"]["speakers"][speaker_key("A")]["turns"] == 650
+    assert stats["backfilling"] is firestore.DELETE_FIELD
@@ -0,0 +1,114 @@
+from message.message_store import MessageStore
+
+
+def _message(i: int) -> dict:
+    return {"speak_at": f"2025-01-26 10:00:{i:02d}", "speaker": "A", "message": f"発言{i}", "meta": None}
+
+
+def test_cold_meeting_misses_and_ignores_writes():
+    """未読み込みの会議は None を返し、書き込みは無視する（読み込み時にFirestoreから取る）"""
+    store = MessageStore(max_meetings=10, tail_size=5, keep_full_log=True)
+    store.append("m1", "doc0", _message(0))
+
+    assert store.get("m1", 10) is None
+    assert store.stats()["misses"] == 1
+
+
+def test_write_through_after_load_serves_from_memory():
+    """読み込み後は書き込みを反映し、Firestoreを読まずに返す"""
+    store = MessageStore(max_meetings=10, tail_size=5, keep_full_log=True)
+    store.start_loading("m1")
+    store.finish_loading("m1", [("doc0", _message(0))], truncated=False)
+    store.append("m1", "doc1", _message(1))
+    store.append("m1", "doc2", _message(2))
+
+    assert [m["message"] for m in store.get("m1", None)] == ["発言0", "発言1", "発言2"]
+    assert [m["message"] for m in store.get("m1", 2)] == ["発言1", "発言2"]
+
+
+def test_writes_during_load_are_merged_without_duplicates():
+    """Firestoreの読み込み中に書き込まれた発言も取りこぼさない"""
+    store = MessageStore(max_meetings=10, tail_size=5, keep_full_log=True)
+    store.start_loading("m1")
+    store.append("m1", "doc1", _message(1))  # クエリ結果に含まれる
+    store.append("m1", "doc2", _message(2))  # クエリ結果に含まれない
+    store.finish_loading("m1", [("doc0", _message(0)), ("doc1", _message(1))], truncated=False)
+
+    assert [m["message"] for m in store.get("m1", None)] == ["発言0", "発言1", "発言2"]
+
+
+def test_ring_buffer_serves_tail_only():
+    """リングバッファから溢れた後は、保持件数以内の取得だけに応える"""
+    store = MessageStore(max_meetings=10, tail_size=3, keep_full_log=False)
+    store.start_loading("m1")
+    store.finish_loading("m1", [], truncated=False)
+    for i in range(5):
+        store.append("m1", f"doc{i}", _message(i))
+
+    assert [m["message"] for m in store.get("m1", 3)] == ["発言2", "発言3", "発言4"]
+    assert store.get("m1", 4) is None
+    assert store.get("m1", None) is None
+
+
+def test_idle_meetings_are_evicted():
+    """保持する会議数を超えたら最も使われていない会議から追い出す"""
+    store = MessageStore(max_meetings=2, tail_size=3, keep_full_log=True)
+    for meeting_id in ["m1", "m2"]:
+        store.start_loading(meeting_id)
+        store.finish_loading(meeting_id, [], truncated=False)
+    store.get("m1", None)  # m1 を最近使ったことにする
+    store.start_loading("m3")
+    store.finish_loading("m3", [], truncated=False)
+
+    assert store.get("m2", None) is None
+    assert store.get("m1", None) == []
+    assert store.stats()["evictions"] == 1
+
+
+def _seq_message(seq: int) -> dict:
+    return {**_message(seq), "seq": seq}
+
+
+def _loaded_store(messages) -> MessageStore:
+    store = MessageStore(max_meetings=10, tail_size=3, keep_full_log=False)
+    store.start_loading("m1")
+    store.finish_loading("m1", [(f"doc{m['seq']}", m) for m in messages], truncated=False)
+    return store
+
+
+def test_since_returns_only_messages_after_cursor():
+    """cursor より後の発言だけを返し、保持範囲より前が必要なら None を返す"""
+    store = _loaded_store([])
+    for seq in range(1, 6):
+        store.append("m1", f"doc{seq}", _seq_message(seq))
+
+    assert [m["seq"] for m in store.get("m1", None, since=3)] == [4, 5]
+    assert [m["seq"] for m in store.get("m1", None, since=2)] == [3, 4, 5]
+    assert store.get("m1", None, since=1) is None
+
+
+def test_seq_gap_requires_delta_resync():
+    """連番の飛び（他のインスタンスへの書き込み）を検出したら差分を読み直すまで返さない"""
+    store = _loaded_store([_seq_message(1)])
+    store.append("m1", "doc2", _seq_message(2), keep=False)  # AIの発言は連番だけ進める
+    store.append("m1", "doc5", _seq_message(5))
+
+    assert store.get("m1", None) is None
+    since = store.resync_cursor("m1")
+    assert since == 2
+
+    store.merge("m1", since, [("doc3", _seq_message(3)), ("doc4", _seq_message(4)), ("doc5", _seq_message(5))])
+    assert [m["seq"] for m in store.get("m1", None, since=2)] == [3, 4, 5]
+    assert store.resync_cursor("m1") is None
+
+
+def test_gap_detected_during_resync_triggers_another_resync():
+    """差分の読み込み中にさらに飛びを検出した場合は、もう一度差分を読み直す"""
+    store = _loaded_store([_seq_message(1)])
+    store.append("m1", "doc3", _seq_message(3))
+    since = store.resync_cursor("m1")
+    store.append("m1", "doc5", _seq_message(5))  # 差分の読み込み中に書き込まれた
+    store.merge("m1", since, [("doc2", _seq_message(2)), ("doc3", _seq_message(3))])
+
+    assert store.get("m1", None, since=1) is None
+    assert store.resync_cursor("m1") == 3
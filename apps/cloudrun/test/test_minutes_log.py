@@ -0,0 +1,128 @@
+import pytest
+from google.api_core.exceptions import FailedPrecondition
+
+import minutes.minutes_log as minutes_log
+from minutes.constants import MinutesFields
+from minutes.minutes_ops import OP_ADD
+
+
+class FakeDocRef:
+    def __init__(self, data):
+        self.data = data
+        self.update_time = 1
+        self.conflict = False
+
+    def get(self, field_paths=None):
+        data, update_time = dict(self.data), self.update_time
+        return type("Snapshot", (), {"exists": True, "update_time": update_time, "to_dict": lambda self: data})()
+
+    def update(self, data, option=None):
+        if self.conflict:
+            raise FailedPrecondition("updated")
+        self.data.update(data)
+        self.update_time += 1
+
+
+class FakeOpDoc:
+    def __init__(self, op_id, op):
+        self.id, self.exists, self._op = op_id, op is not None, op
+
+    def to_dict(self):
+        return self._op
+
+
+class FakeOpsRef:
+    """操作ログ（created_at の順）の order_by / start_after / limit / get だけを持つ"""
+
+    def __init__(self, ops, start=0):
+        self.ops, self.start = ops, start
+
+    def order_by(self, field, direction=None):
+        return FakeOpsRef(self.ops[::-1]) if direction == "DESCENDING" else self
+
+    def limit(self, count):
+        return FakeOpsRef(self.ops[self.start:self.start + count])
+
+    def document(self, op_id):
+        op = dict(self.ops).get(op_id)
+        return type("OpRef", (), {"get": lambda ref: FakeOpDoc(op_id, op)})()
+
+    def start_after(self, cursor):
+        return FakeOpsRef(self.ops, [op_id for op_id, _ in self.ops].index(cursor.id) + 1)
+
+    def get(self):
+        return [FakeOpDoc(op_id, op) for op_id, op in self.ops[self.start:]]
+
+
+@pytest.fixture
+def stage(monkeypatch):
+    """Firestore の代わりに、スナップショットと操作ログをメモリに持つ"""
+    doc_ref = FakeDocRef({MinutesFields.DECISIONS: [], MinutesFields.VERSION: None, "rolling_summary": "要約"})
+    ops = [
+        ("op1", {"op": OP_ADD, "target": MinutesFields.DECISIONS, "id": "d1", "data": {"id": "d1", "text": "一"}}),
+        ("op2", {"op": OP_ADD, "target": MinutesFields.DECISIONS, "id": "d2", "data": {"id": "d2", "text": "二"}}),
+    ]
+
+    monkeypatch.setattr(minutes_log, "minutes_doc_ref", lambda meeting_id: doc_ref)
+    monkeypatch.setattr(minutes_log, "_ops_ref", lambda meeting_id: FakeOpsRef(ops))
+    return doc_ref, ops
+
+
+def test_compact_folds_tail_and_counts_io(stage):
+    doc_ref, _ = stage
+
+    io_counts = {"reads": 0, "writes": 0}
+    assert minutes_log.compact_minutes("m1", io_counts) == 2
+    assert io_counts == {"reads": 3, "writes": 1}  # スナップショット + tail の操作2件
+    assert [d["id"] for d in doc_ref.data[MinutesFields.DECISIONS]] == ["d1", "d2"]
+    assert doc_ref.data[MinutesFields.VERSION] == "op2"
+    # rolling_summary など他のフィールドは残す
+    assert doc_ref.data["rolling_summary"] == "要約"
+    # 取り込む操作がなければ書き込まない（スナップショット + version の操作 + 0件のクエリ）
+    io_counts = {"reads": 0, "writes": 0}
+    assert minutes_log.compact_minutes("m1", io_counts) == 0
+    assert io_counts == {"reads": 3, "writes": 0}
+
+
+def test_compact_gives_up_when_snapshot_changed(stage):
+    doc_ref, _ = stage
+    doc_ref.conflict = True  # 読んだ後に rolling_summary などが書き込まれた
+
+    io_counts = {"reads": 0, "writes": 0}
+
+    assert minutes_log.compact_minutes("m1", io_counts) == 0
+    assert io_counts["writes"] == 1
+    assert doc_ref.data[MinutesFields.VERSION] is None
+    # 取り込まなかった操作は読み取り時に適用される
+    io_counts = {"reads": 0, "writes": 0}
+    minutes, version, pending = minutes_log.read_minutes("m1", io_counts)
+    assert io_counts["reads"] == 3
+    assert [d["id"] for d in minutes[MinutesFields.DECISIONS]] == ["d1", "d2"]
+    assert version == "op2" and pending == 2
+
+
+class FakeTransaction:
+    def __init__(self):
+        self.writes = []
+
+    def get(self, query):
+        return query.get()
+
+    def set(self, ref, data, merge=False):
+        self.writes.append((data, merge))
+        if merge:
+            ref.data.update({field: data[field] for field in merge})
+        else:
+            ref.data = dict(data)
+
+
+def test_reset_keeps_rolling_summary(stage):
+    doc_ref, _ = stage
+    transaction = FakeTransaction()
+
+    minutes_log._reset.to_wrap(transaction, "m1", {MinutesFields.AGENDA: [{"id": 1, "topic": "議題"}]})
+
+    assert doc_ref.data["rolling_summary"] == "要約"
+    assert doc_ref.data[MinutesFields.AGENDA] == [{"id": 1, "topic": "議題"}]
+    assert doc_ref.data[MinutesFields.DECISIONS] == []
+    assert doc_ref.data[MinutesFields.VERSION] == "op2"
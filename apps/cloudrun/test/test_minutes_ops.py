@@ -0,0 +1,68 @@
+from minutes.constants import MinutesFields
+from minutes.minutes_ops import OP_ADD, OP_COMPLETE, OP_DELETE, OP_UPDATE, apply_ops, diff_ops
+
+
+def _minutes():
+    return {
+        MinutesFields.AGENDA: [
+            {"id": 1, "topic": "予算", "completed": False},
+            {"id": 2, "topic": "会場", "completed": False},
+        ],
+        MinutesFields.DECISIONS: [{"id": "d1", "text": "予算は100万円"}],
+        MinutesFields.ACTION_PLAN: [{"id": "a1", "task": "見積もりを取る", "assigned_to": None}],
+    }
+
+
+def test_diff_produces_one_op_per_changed_item():
+    old = _minutes()
+    new = _minutes()
+    new[MinutesFields.AGENDA][0].update({"completed": True, "completed_at": "2025-01-01 10:00:00"})
+    new[MinutesFields.DECISIONS].append({"id": "d2", "text": "会場は東京"})
+    new[MinutesFields.ACTION_PLAN][0]["assigned_to"] = "佐藤"
+    del new[MinutesFields.DECISIONS][0]
+
+    ops = diff_ops(old, new)
+
+    assert sorted((op["op"], op["target"], op["id"]) for op in ops) == sorted([
+        (OP_COMPLETE, MinutesFields.AGENDA, 1),
+        (OP_ADD, MinutesFields.DECISIONS, "d2"),
+        (OP_DELETE, MinutesFields.DECISIONS, "d1"),
+        (OP_UPDATE, MinutesFields.ACTION_PLAN, "a1"),
+    ])
+    # 更新は変わったフィールドだけを持つ
+    update = next(op for op in ops if op["op"] == OP_UPDATE)
+    assert update["data"] == {"assigned_to": "佐藤"}
+    assert apply_ops(old, ops) == new
+    assert diff_ops(new, new) == []
+
+
+def test_apply_is_idempotent_and_does_not_mutate_input():
+    base = _minutes()
+    ops = [
+        {"op": OP_ADD, "target": MinutesFields.DECISIONS, "id": "d2", "data": {"id": "d2", "text": "会場は東京"}},
+        {"op": OP_DELETE, "target": MinutesFields.DECISIONS, "id": "d1", "data": {}},
+        {"op": OP_UPDATE, "target": MinutesFields.DECISIONS, "id": "d2", "data": {"text": "会場は大阪"}},
+    ]
+
+    once = apply_ops(base, ops)
+    twice = apply_ops(once, ops)
+
+    assert once == twice
+    assert once[MinutesFields.DECISIONS] == [{"id": "d2", "text": "会場は大阪"}]
+    assert base == _minutes()
+
+
+def test_concurrent_diffs_from_same_base_both_apply():
+    """同じ議事録から別々に計算した変更を、どちらも失わずに適用できる"""
+    base = _minutes()
+    first = _minutes()
+    first[MinutesFields.DECISIONS].append({"id": "d2", "text": "会場は東京"})
+    second = _minutes()
+    second[MinutesFields.ACTION_PLAN][0]["assigned_to"] = "佐藤"
+    second[MinutesFields.ACTION_PLAN].append({"id": "a2", "task": "会場を予約する"})
+
+    merged = apply_ops(base, diff_ops(base, first) + diff_ops(base, second))
+
+    assert [d["id"] for d in merged[MinutesFields.DECISIONS]] == ["d1", "d2"]
+    assert merged[MinutesFields.ACTION_PLAN][0]["assigned_to"] == "佐藤"
+    assert [a["id"] for a in merged[MinutesFields.ACTION_PLAN]] == ["a1", "a2"]
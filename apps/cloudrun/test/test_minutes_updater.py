@@ -0,0 +1,113 @@
+from minutes.constants import MinutesFields
+from minutes.minutes_updater import apply_minutes_updates
+
+
+def _minutes():
+    return {
+        MinutesFields.AGENDA: [
+            {"id": 1, "topic": "現状共有", "duration": 10, "completed": False},
+            {"id": 2, "topic": "課題の議論", "duration": 10, "completed": False},
+        ],
+        MinutesFields.DECISIONS: [{"id": "decision_1", "text": "リリースは来週"}],
+        MinutesFields.ACTION_PLAN: [
+            {"id": "action_1", "task": "仕様書を書く", "assigned_to": "A", "due_date": "未設定"}
+        ],
+    }
+
+
+def test_no_updates_means_no_changed_fields():
+    """判定結果が空なら変更なし（書き込み不要）"""
+    existing = _minutes()
+    new_minutes, changed = apply_minutes_updates(existing, {})
+
+    assert changed == set()
+    assert new_minutes == existing
+
+
+def test_not_found_and_duplicate_do_not_mark_changes():
+    """存在しないIDの更新・削除や重複追加では書き込みが発生しない"""
+    updates = {
+        "decisions_update": {
+            "add_decision": True,
+            "add_decision_text": "リリースは来週",
+            "update_decision": True,
+            "decision_id": "decision_unknown",
+            "new_decision_text": "変更",
+            "delete_decision": True,
+            "decision_id_to_delete": "decision_unknown",
+        },
+        "actions_update": {
+            "update_action_plan": True,
+            "action_id": "action_1",
+            "new_action_text": "仕様書を書く",
+        },
+        "agenda_update": {"completed_agenda_ids": []},
+    }
+    _, changed = apply_minutes_updates(_minutes(), updates)
+
+    assert changed == set()
+
+
+def test_changes_are_computed_in_memory_without_mutating_input():
+    """複数の変更をまとめて計算し、元の議事録は変更しない"""
+    existing = _minutes()
+    updates = {
+        "decisions_update": {"add_decision": True, "add_decision_text": "予算は100万円"},
+        "actions_update": {"delete_action_plan": True, "action_id_to_delete": "action_1"},
+        "agenda_update": {"completed_agenda_ids": ["1"]},
+    }
+    new_minutes, changed = apply_minutes_updates(existing, updates)
+
+    assert changed == {MinutesFields.DECISIONS, MinutesFields.ACTION_PLAN, MinutesFields.AGENDA}
+    assert [d["text"] for d in new_minutes[MinutesFields.DECISIONS]] == ["リリースは来週", "予算は100万円"]
+    assert new_minutes[MinutesFields.ACTION_PLAN] == []
+    assert new_minutes[MinutesFields.AGENDA][0]["completed"] is True
+    assert existing == _minutes()
+
+
+def test_paraphrased_decision_is_skipped():
+    """既存の決定事項の言い換えは追加しない"""
+    updates = {
+        "decisions_update": {"add_decision": True, "add_decision_text": "リリースは来週。"},
+    }
+    _, changed = apply_minutes_updates(_minutes(), updates)
+
+    assert changed == set()
+
+
+def test_paraphrased_action_fills_missing_due_date():
+    """似たアクションプランは追加せず、未設定だった期限だけを補う"""
+    updates = {
+        "actions_update": {
+            "add_action_plan": True,
+            "add_action_plan_text": "仕様書を書く。",
+            "add_assigned_to": "B",
+            "add_due_date": "金曜日",
+        },
+    }
+    new_minutes, changed = apply_minutes_updates(_minutes(), updates)
+
+    assert changed == {MinutesFields.ACTION_PLAN}
+    assert new_minutes[MinutesFields.ACTION_PLAN] == [
+        {"id": "action_1", "task": "仕様書を書く", "assigned_to": "A", "due_date": "金曜日"}
+    ]
+
+
+def test_paraphrased_action_fills_empty_assignee():
+    """空文字や None の担当者・期限も未設定として補う"""
+    existing = _minutes()
+    existing[MinutesFields.ACTION_PLAN][0].update({"assigned_to": "", "due_date": None})
+    updates = {
+        "actions_update": {
+            "add_action_plan": True,
+            "add_action_plan_text": "仕様書を書く。",
+            "add_assigned_to": "B",
+            "add_due_date": "",
+        },
+    }
+    new_minutes, changed = apply_minutes_updates(existing, updates)
+
+    assert changed == {MinutesFields.ACTION_PLAN}
+    assert new_minutes[MinutesFields.ACTION_PLAN] == [
+        {"id": "action_1", "task": "仕様書を書く", "assigned_to": "B", "due_date": None}
+    ]
@@ -0,0 +1,87 @@
+from datetime import datetime, timedelta
+
+import pytz
+
+from message.participation import (
+    apply_deltas,
+    participation_deltas,
+    participation_prompt_fields,
+    speaker_key,
+    summarize_participation,
+)
+
+NOW = pytz.timezone("Asia/Tokyo").localize(datetime(2025, 1, 1, 10, 10))
+
+
+def _messages(rows, start_seq=1):
+    return [
+        {"seq": seq, "speaker": speaker, "message": text, "speak_at": speak_at}
+        for seq, (speaker, text, speak_at) in enumerate(rows, start=start_seq)
+    ]
+
+
+def _replay(*batches):
+    """発言のまとまりごとに差分を計算して反映する"""
+    state = None
+    seq = 1
+    for rows in batches:
+        deltas = participation_deltas(_messages(rows, seq), (state or {}).get("last_speaker"))
+        state = apply_deltas(state, deltas)
+        seq += len(rows)
+    return state
+
+
+def test_counts_turns_chars_and_transitions_across_batches():
+    state = _replay(
+        [("A", "こんにちは", "2025-01-01 10:00:00"), ("B", "はい", "2025-01-01 10:01:00")],
+        [("A", "では", "2025-01-01 10:02:00"), ("C", "質問です", "2025-01-01 10:05:00")],
+    )
+
+    summary = summarize_participation(state, ["A", "B", "C", "D"], now=NOW)
+    rows = {row["speaker"]: row for row in summary["speakers"]}
+    assert [row["speaker"] for row in summary["speakers"]] == ["A", "B", "C", "D"]
+    assert summary["total_turns"] == 4
+    assert rows["A"]["turns"] == 2 and rows["A"]["chars"] == 7
+    assert rows["A"]["silence_seconds"] == 8 * 60
+    assert rows["D"]["turns"] == 0 and rows["D"]["silence_seconds"] is None
+    # バッチをまたいだ受け渡し（B→A）も数える
+    assert summary["transitions"] == {"A": {"B": 1, "C": 1}, "B": {"A": 1}}
+
+
+def test_deltas_only_touch_speakers_in_the_batch():
+    state = _replay([("A", "一", "2025-01-01 10:00:00"), ("B", "二", "2025-01-01 10:01:00")])
+    deltas = participation_deltas(_messages([("B", "三", "2025-01-01 10:02:00")], 3), state["last_speaker"])
+
+    assert list(deltas["speakers"]) == [speaker_key("B")]
+    assert deltas["transitions"] == {speaker_key("B"): {speaker_key("B"): 1}}
+    # 反映しても元の統計は変わらない
+    apply_deltas(state, deltas)
+    assert state["speakers"][speaker_key("B")]["turns"] == 1
+
+
+def test_prompt_fields():
+    state = _replay([
+        ("A", "こんにちは", "2025-01-01 10:00:00"),
+        ("B", "はい", "2025-01-01 10:01:00"),
+    ])
+    fields = participation_prompt_fields(summarize_participation(state, now=NOW))
+    assert fields["発言の統計"]["A"] == "発言1回（50%）・5文字（71%）・最後の発言から5〜15分"
+    # 経過時間は区切りにまとめるため、同じ区切りの間はプロンプトが変わらない
+    later = participation_prompt_fields(summarize_participation(state, now=NOW + timedelta(minutes=3)))
+    assert later == fields
+    assert fields["発言の受け渡し"] == ["A→B 1回"]
+    assert participation_prompt_fields(summarize_participation(None)) == {}
+
+
+def test_increments_write_only_changed_fields():
+    from google.cloud import firestore
+    from message.message import _participation_increments
+
+    deltas = participation_deltas(_messages([("A", "一", "2025-01-01 10:00:00")]), None)
+    increments = _participation_increments(deltas)
+
+    row = increments["speakers"][speaker_key("A")]
+    assert isinstance(row["turns"], firestore.Increment) and row["turns"].value == 1
+    assert isinstance(row["first_seq"], firestore.Minimum)
+    # 受け渡しがなければ transitions は書かない（空のマップで既存の値を消さない）
+    assert "transitions" not in increments
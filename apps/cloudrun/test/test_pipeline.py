@@ -0,0 +1,147 @@
+import os
+import time
+import pytest
+from pipeline.job_queue import InMemoryJobQueue, SQLiteJobQueue
+from pipeline.worker import WorkerPool
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def queue(request, tmp_path):
+    if request.param == "memory":
+        return InMemoryJobQueue(max_attempts=2)
+    return SQLiteJobQueue(os.path.join(tmp_path, "jobs.sqlite3"), max_attempts=2, poll_interval=0.01)
+
+
+def test_put_get_ack(queue):
+    """登録したジョブを取り出して完了できる"""
+    job_id = queue.put("process_message", {"meeting_id": "m1"})
+    assert queue.depth() == 1
+
+    job = queue.get(timeout=1)
+    assert job["id"] == job_id
+    assert job["payload"] == {"meeting_id": "m1"}
+    assert job["attempts"] == 1
+
+    queue.ack(job)
+    assert queue.depth() == 0
+    assert queue.get(timeout=0.05) is None
+
+
+def test_failed_job_is_retried_until_max_attempts(queue):
+    """失敗したジョブは max_attempts 回まで再度取り出される"""
+    queue.put("process_message", {"meeting_id": "m1"})
+
+    job = queue.get(timeout=1)
+    queue.fail(job, "error")
+    job = queue.get(timeout=1)
+    assert job["attempts"] == 2
+    queue.fail(job, "error")
+
+    assert queue.get(timeout=0.05) is None
+    assert queue.depth() == 0
+
+
+def test_sqlite_queue_survives_restart_and_expired_lease(tmp_path):
+    """SQLiteキューは再起動後もジョブを保持し、ackされなかったジョブを再配信する"""
+    path = os.path.join(tmp_path, "jobs.sqlite3")
+    queue = SQLiteJobQueue(path, lease_seconds=0.1, poll_interval=0.01)
+    queue.put("process_message", {"meeting_id": "m1"})
+    assert queue.get(timeout=1) is not None  # 取り出したままクラッシュした想定
+
+    restarted = SQLiteJobQueue(path, lease_seconds=0.1, poll_interval=0.01)
+    job = restarted.get(timeout=1)
+    assert job["payload"] == {"meeting_id": "m1"}
+    assert job["attempts"] == 2
+
+
+def test_worker_pool_processes_jobs_and_reports_stats(queue):
+    """ワーカーがジョブを処理し、キュー長とレイテンシを集計する"""
+    processed = []
+
+    def fail_once(payload):
+        if payload["meeting_id"] == "bad" and "bad" not in processed:
+            processed.append("bad")
+            raise RuntimeError("temporary error")
+        processed.append(payload["meeting_id"])
+
+    pool = WorkerPool(queue, {"process_message": fail_once}, num_workers=2)
+    pool.start()
+    try:
+        for meeting_id in ["m1", "m2", "bad"]:
+            queue.put("process_message", {"meeting_id": meeting_id})
+
+        deadline = time.time() + 5
+        while len(processed) < 4 and time.time() < deadline:
+            time.sleep(0.01)
+    finally:
+        pool.stop(timeout=2)
+
+    assert sorted(processed) == ["bad", "bad", "m1", "m2"]
+    stats = pool.stats()
+    assert stats["queue_depth"] == 0
+    assert stats["succeeded"] == 3
+    assert stats["failed"] == 1
+    assert stats["latency_seconds"]["max"] is not None
+
+
+def test_jobs_with_same_key_are_coalesced(queue):
+    """同じキーの未処理ジョブには合流し、別のキーは別のジョブになる"""
+    first = queue.put("process_message", {"meeting_id": "m1"}, delay=0.05, key="m1")
+    second = queue.put("process_message", {"meeting_id": "m1"}, delay=0.05, key="m1")
+    other = queue.put("process_message", {"meeting_id": "m2"}, delay=0.05, key="m2")
+
+    assert first == second
+    assert other != first
+    assert queue.coalesced == 1
+    assert queue.depth() == 2
+    # 遅延中は取り出されない
+    assert queue.get(timeout=0) is None
+    assert queue.get(timeout=1) is not None
+
+
+def test_same_key_is_not_processed_concurrently(queue):
+    """同じキーのジョブは前のジョブが終わるまで取り出されない"""
+    queue.put("process_message", {"meeting_id": "m1"}, key="m1")
+    running = queue.get(timeout=1)
+    # 処理中に届いた発言は新しいジョブになる
+    queue.put("process_message", {"meeting_id": "m1"}, key="m1")
+    queue.put("process_message", {"meeting_id": "m2"}, key="m2")
+
+    other = queue.get(timeout=1)
+    assert other["key"] == "m2"
+    assert queue.get(timeout=0.05) is None
+
+    queue.ack(running)
+    next_job = queue.get(timeout=1)
+    assert next_job["key"] == "m1"
+    assert next_job["id"] != running["id"]
+
+
+def test_sqlite_queue_dead_letters_expired_job_at_max_attempts(tmp_path):
+    """リースが切れたジョブも max_attempts 回取り出されていれば再配信しない"""
+    queue = SQLiteJobQueue(os.path.join(tmp_path, "jobs.sqlite3"), max_attempts=2, lease_seconds=0.05, poll_interval=0.01)
+    queue.put("process_message", {"meeting_id": "m1"})
+    assert queue.get(timeout=1)["attempts"] == 1  # 取り出したままワーカーが落ちた想定
+    assert queue.get(timeout=1)["attempts"] == 2
+
+    assert queue.get(timeout=0.2) is None
+    assert queue.depth() == 0
+
+
+def test_heartbeat_keeps_long_job_leased(tmp_path):
+    """処理中はリースが延長され、リースより長いジョブも二重に取り出されない"""
+    queue = SQLiteJobQueue(os.path.join(tmp_path, "jobs.sqlite3"), lease_seconds=0.1, poll_interval=0.01)
+    queue.put("process_message", {"meeting_id": "m1"})
+    redelivered = []
+
+    def handler(payload):
+        deadline = time.time() + 0.4
+        while time.time() < deadline:
+            job = queue.get(timeout=0.05)
+            if job is not None:
+                redelivered.append(job)
+
+    WorkerPool(queue, {"process_message": handler}, num_workers=1).process(queue.get(timeout=1))
+
+    assert redelivered == []
+    assert queue.depth() == 0
@@ -0,0 +1,33 @@
+from prompt.budget import PromptBuilder, estimate_tokens, fit_lines
+from prompt.history import render_comment_history
+
+
+def test_estimate_tokens_counts_non_ascii_per_char():
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("abcd") == 1
+    assert estimate_tokens("会議") == 2
+
+
+def test_fit_lines_keeps_newest_lines():
+    lines = [f"発言{i:02d}" for i in range(10)]  # 1行あたり 2 + 1 + 改行1 = 4トークン
+    kept, dropped, tokens = fit_lines(iter(lines), 13)
+
+    assert kept == ["発言07", "発言08", "発言09"]
+    assert dropped == 7
+    assert tokens == 12
+
+
+def test_builder_fits_history_into_remaining_budget():
+    """固定のセクションを入れた残りに収まるよう古い発言を省略し、使用量を記録する"""
+    comments = [{"speak_at": "", "speaker": "A", "message": "あ" * 10} for _ in range(50)]
+    builder = PromptBuilder("minutes", budget=100)
+    prompt = (
+        builder.add("最新の発言", "い" * 20, heading="## 最新の発言:\n")
+        .add_history("過去の会話履歴", render_comment_history(comments).splitlines())
+        .build()
+    )
+
+    assert builder.dropped_lines > 0
+    assert prompt.split("\n\n")[1].startswith("（古い発言")
+    assert sum(builder.usage.values()) <= 100
+    assert estimate_tokens(prompt) <= 100 + 2 * len(builder.usage)
@@ -0,0 +1,42 @@
+from agent.feedback_agent import AgendaItem
+from prompt.serializer import merged_turns, render_fields
+
+
+def test_render_fields_is_compact_and_deterministic():
+    """None の項目や repr を含まず、辞書のキーの順序によらず同じ文字列になる"""
+    first = render_fields(
+        {
+            "目的": "方針を決める",
+            "アジェンダ": [{"topic": "現状共有", "duration": 10}],
+            "参加者": ["A", "B"],
+            "評価結果": None,
+        }
+    )
+    second = render_fields(
+        {
+            "目的": "方針を決める",
+            "アジェンダ": [{"duration": 10, "topic": "現状共有"}],
+            "参加者": ["A", "B"],
+        }
+    )
+
+    assert first == second
+    assert first == "目的: 方針を決める\nアジェンダ:\n- duration: 10, topic: 現状共有\n参加者: A, B"
+    assert render_fields({"アジェンダ": [AgendaItem(topic="現状共有", duration=10)]}) == (
+        "アジェンダ:\n- topic: 現状共有, duration: 10"
+    )
+
+
+def test_merged_turns_joins_consecutive_messages_by_same_speaker():
+    comments = [
+        {"speak_at": "2025-01-26 10:00:05", "speaker": "A", "message": "まず", "meta": None},
+        {"speak_at": "2025-01-26 10:00:20", "speaker": "A", "message": "現状を\n共有します"},
+        {"speak_at": "2025-01-26 10:01:00", "speaker": "B", "message": "はい"},
+        {"speaker": "A", "content": "続けます", "meta": {"speak_at": "2025-01-26 10:02:00"}},
+    ]
+
+    assert list(merged_turns(comments)) == [
+        "[10:00] A: まず 現状を 共有します",
+        "[10:01] B: はい",
+        "[10:02] A: 続けます",
+    ]
@@ -0,0 +1,62 @@
+import pytest
+import minutes.rolling_summary as rolling_summary
+from cache.ttl_cache import TTLCache
+
+
+class FakeDocRef:
+    def __init__(self):
+        self.writes = []
+
+    def get(self, field_paths=None):
+        return type("Snapshot", (), {"exists": False, "to_dict": lambda self: None})()
+
+    def set(self, data, merge=False):
+        self.writes.append(data)
+
+
+@pytest.fixture
+def stage(monkeypatch):
+    """Firestore・LLMの代わりに、発言の連番と取り込んだ件数を記録する"""
+    doc_ref = FakeDocRef()
+    messages = []
+    folded = []
+
+    def fake_history(meeting_id, since=None):
+        return [m for m in messages if m["seq"] > (since or 0)]
+
+    def fake_fold(summary, new_messages):
+        folded.append([m["seq"] for m in new_messages])
+        return f"{summary}+{len(new_messages)}"
+
+    monkeypatch.setattr(rolling_summary, "minutes_doc_ref", lambda meeting_id: doc_ref)
+    monkeypatch.setattr(rolling_summary, "get_message_history", fake_history)
+    monkeypatch.setattr(rolling_summary, "fold_into_summary", fake_fold)
+    monkeypatch.setattr(rolling_summary, "_summary_cache", TTLCache(10, 60))
+    monkeypatch.setattr(rolling_summary, "ROLLING_SUMMARY_MIN_NEW_MESSAGES", 5)
+    monkeypatch.setattr(rolling_summary, "ROLLING_SUMMARY_KEEP_RECENT", 3)
+
+    def post(count):
+        start = len(messages) + 1
+        messages.extend({"seq": seq, "speaker": "A", "message": f"発言{seq}"} for seq in range(start, start + count))
+
+    return post, folded, doc_ref
+
+
+def test_folds_only_new_messages_and_keeps_recent_tail(stage):
+    post, folded, doc_ref = stage
+
+    post(7)
+    assert rolling_summary.update_rolling_summary("m1") is False  # 5 + 3 件に満たない
+
+    post(1)
+    assert rolling_summary.update_rolling_summary("m1") is True
+    assert folded == [[1, 2, 3, 4, 5]]  # 直近3件は発言のまま残す
+    assert rolling_summary.get_rolling_summary("m1") == {"text": "+5", "last_seq": 5}
+
+    post(4)
+    assert rolling_summary.update_rolling_summary("m1") is False
+    post(1)
+    assert rolling_summary.update_rolling_summary("m1") is True
+    assert folded[-1] == [6, 7, 8, 9, 10]  # 前回の要約以降の発言だけを取り込む
+    assert doc_ref.writes[-1]["rolling_summary"]["last_seq"] == 10
+    assert rolling_summary.get_rolling_summary("m1")["text"] == "+5+5"
@@ -0,0 +1,64 @@
+import pytest
+
+from minutes.constants import MinutesFields
+from minutes.similarity_index import MinutesSimilarityIndex, NgramIndex
+
+
+def test_finds_paraphrase_but_not_unrelated_text():
+    index = NgramIndex()
+    index.add("d1", "リリースは来週の金曜日に行う")
+    index.add("d2", "デザインは青を基調とする")
+
+    assert index.find_duplicate("リリースは来週金曜日に行う")[0] == "d1"
+    assert index.find_duplicate("会場は東京にする") is None
+
+
+@pytest.mark.parametrize(
+    "existing, new",
+    [
+        ("予算は100万円とする", "予算は200万円とする"),
+        ("リリース日は3月1日", "リリース日は4月1日"),
+        ("A案を採用する", "B案を採用する"),
+        ("Aさんが資料を作成する", "Bさんが資料を作成する"),
+        ("田中さんが資料を作成する", "佐藤さんが資料を作成する"),
+    ],
+)
+def test_texts_differing_in_key_facts_are_not_duplicates(existing, new):
+    """数字・名前・選択肢だけが違う文は、類似度が高くても別の項目として扱う"""
+    index = NgramIndex()
+    index.add("d1", existing)
+
+    assert index.find_duplicate(new) is None
+
+
+def test_duplicate_skips_closer_item_with_different_key_facts():
+    index = NgramIndex()
+    index.add("d1", "予算は100万円とする")
+    index.add("d2", "予算は２００万円とする")
+
+    # 全角・半角の違いは同じ数字として扱う
+    assert index.find_duplicate("予算は200万円とする。")[0] == "d2"
+
+
+def test_remove_moves_last_row():
+    index = NgramIndex(dim=64)
+    for i in range(10):  # 初期容量（8行）を超えて広げる
+        index.add(f"d{i}", f"決定事項{i}番目の内容")
+    index.remove("d2")
+
+    assert len(index) == 9 and "d2" not in index
+    # 空いた行に移した項目も検索できる
+    item_id, score = index.most_similar("決定事項9番目の内容")
+    assert item_id == "d9" and score > 0.99
+
+
+def test_sync_follows_minutes():
+    index = MinutesSimilarityIndex()
+    index.sync({MinutesFields.DECISIONS: [{"id": "d1", "text": "予算は100万円"}]})
+    index.sync({
+        MinutesFields.DECISIONS: [{"id": "d2", "text": "会場は東京"}],
+        MinutesFields.ACTION_PLAN: [{"id": "a1", "task": "見積もりを取る"}],
+    })
+
+    assert "d1" not in index.decisions and "d2" in index.decisions
+    assert "a1" in index.actions
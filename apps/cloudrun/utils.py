@@ -1,7 +1,20 @@
 from datetime import datetime
+from typing import Optional
+
 import pytz
 
 def get_jst_timestamp():
     """日本標準時（JST）の現在時刻を取得し、フォーマット"""
     tz_japan = pytz.timezone("Asia/Tokyo")
     return datetime.now(tz_japan).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def count_io(io_counts: Optional[dict], reads: int = 0, writes: int = 0):
+    """
+    Firestoreの読み取り・書き込み回数（課金されるドキュメント数）を `io_counts` に加える。
+
+    クエリは結果が0件でも1回の読み取りになる。`io_counts` が None なら数えない。
+    """
+    if io_counts is not None:
+        io_counts["reads"] = io_counts.get("reads", 0) + reads
+        io_counts["writes"] = io_counts.get("writes", 0) + writes
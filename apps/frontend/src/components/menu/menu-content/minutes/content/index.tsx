@@ -1,6 +1,6 @@
-import { useRef, useState, useEffect } from "react"
+import { useRef, useState, useEffect, useMemo } from "react"
 import { db } from "@/firebase"
-import { doc, onSnapshot } from "firebase/firestore"
+import { collection, doc, getDoc, onSnapshot, orderBy, query, startAfter } from "firebase/firestore"
 import { useSelector } from "react-redux"
 import { RootState } from "@/store"
 import styles from "./index.module.scss"
@@ -24,14 +24,59 @@ interface ActionPlanItem {
   due_date: string
 }
 
+interface Minutes {
+  agenda: AgendaItem[]
+  decisions: DecisionItem[]
+  action_plan: ActionPlanItem[]
+}
+
+type MinutesTarget = keyof Minutes
+
+// 議事録の操作ログ（meetings/<id>/minutes_ops）の1件
+interface MinutesOp {
+  id: string
+  op: "add" | "update" | "delete" | "complete"
+  target: MinutesTarget
+  item_id: string | number
+  data: Record<string, any>
+}
+
+const EMPTY_MINUTES: Minutes = { agenda: [], decisions: [], action_plan: [] }
+
+// スナップショット（all_minutes）に、それより後の操作を適用する（バックエンドの apply_ops と同じ）
+const applyMinutesOps = (minutes: Minutes, ops: MinutesOp[]): Minutes => {
+  const result: Record<MinutesTarget, any[]> = {
+    agenda: [...minutes.agenda],
+    decisions: [...minutes.decisions],
+    action_plan: [...minutes.action_plan],
+  }
+  for (const op of ops) {
+    const items = result[op.target]
+    if (!items) continue
+    const position = items.findIndex((item) => item.id === op.item_id)
+    if (op.op === "add") {
+      if (position < 0) items.push({ ...op.data })
+    } else if (op.op === "update" || op.op === "complete") {
+      if (position >= 0) {
+        items[position] = { ...items[position], ...op.data }
+        if (op.op === "complete") items[position].completed = true
+      }
+    } else if (op.op === "delete") {
+      if (position >= 0) items.splice(position, 1)
+    }
+  }
+  return result as Minutes
+}
+
 let lastScrollTop = 0
 
 const Content = () => {
   const contentRef = useRef<HTMLElement>(null)
   const [humanScroll, setHumanScroll] = useState(false)
-  const [agenda, setAgenda] = useState<AgendaItem[]>([])
-  const [decisions, setDecisions] = useState<DecisionItem[]>([])
-  const [actionPlan, setActionPlan] = useState<ActionPlanItem[]>([])
+  const [snapshot, setSnapshot] = useState<Minutes>(EMPTY_MINUTES)
+  // スナップショットに取り込み済みの最後の操作のID（スナップショットを読むまでは undefined）
+  const [version, setVersion] = useState<string | null | undefined>(undefined)
+  const [ops, setOps] = useState<MinutesOp[]>([])
   const meetingId = useSelector((state: RootState) => state.global.meetingId)
 
   useEffect(() => {
@@ -44,15 +89,59 @@ const Content = () => {
     const unsubscribe = onSnapshot(minutesDocRef, (docSnapshot) => {
       if (docSnapshot.exists()) {
         const data = docSnapshot.data()
-        setAgenda(data.agenda || [])
-        setDecisions(data.decisions || [])
-        setActionPlan(data.action_plan || [])
+        setSnapshot({
+          agenda: data.agenda || [],
+          decisions: data.decisions || [],
+          action_plan: data.action_plan || [],
+        })
+        setVersion(data.version || null)
+      } else {
+        setVersion(null)
       }
     })
 
     return () => unsubscribe()
   }, [meetingId])
 
+  // スナップショットは一定数の操作ごとにしか作り直されないため、それより後の操作だけを購読して適用する
+  // （バックエンドの minutes_log._ops_after と同じ）
+  useEffect(() => {
+    if (!meetingId || version === undefined) return
+    // 前のスナップショットより後の操作は新しいスナップショットに取り込まれているので捨てる
+    setOps([])
+    const opsRef = collection(db, "meetings", meetingId, "minutes_ops")
+    let unsubscribe = () => {}
+    let cancelled = false
+
+    const subscribe = async () => {
+      let opsQuery = query(opsRef, orderBy("created_at"))
+      if (version) {
+        const cursor = await getDoc(doc(opsRef, version))
+        if (cursor.exists()) opsQuery = query(opsRef, orderBy("created_at"), startAfter(cursor))
+      }
+      if (cancelled) return
+      unsubscribe = onSnapshot(opsQuery, (querySnapshot) => {
+        setOps(
+          querySnapshot.docs.map((opDoc) => {
+            const data = opDoc.data()
+            return { id: opDoc.id, op: data.op, target: data.target, item_id: data.id, data: data.data || {} }
+          }),
+        )
+      })
+    }
+    subscribe()
+
+    return () => {
+      cancelled = true
+      unsubscribe()
+    }
+  }, [meetingId, version])
+
+  const { agenda, decisions, action_plan: actionPlan } = useMemo(
+    () => applyMinutesOps(snapshot, ops),
+    [snapshot, ops],
+  )
+
   const onScroll = (e: any) => {
     const scrollTop = contentRef.current?.scrollTop ?? 0
     if (scrollTop < lastScrollTop) {